@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Item, Reserva, Notificacao, EmailSubscription
+from .models import Item, Reserva, Notificacao, EmailSubscription, EmailOutbox
 
 @admin.register(Item)
 class ItemAdmin(admin.ModelAdmin):
@@ -23,9 +23,17 @@ class NotificacaoAdmin(admin.ModelAdmin):
 
 @admin.register(EmailSubscription)
 class EmailSubscriptionAdmin(admin.ModelAdmin):
-    list_display = ['email', 'subscribed', 'created_at']
+    list_display = ['email', 'subscribed', 'tentativas', 'created_at', 'inscrito_em']
     list_filter = ['subscribed', 'created_at']
     search_fields = ['email']
-    readonly_fields = ['subscription_arn', 'created_at']
+    readonly_fields = ['subscription_arn', 'created_at', 'inscrito_em', 'ultimo_erro']
     date_hierarchy = 'created_at'
 
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['email', 'assunto', 'status', 'tentativas', 'proxima_tentativa', 'created_at', 'enviado_em']
+    list_filter = ['status', 'topico']
+    search_fields = ['email', 'assunto']
+    readonly_fields = ['created_at', 'enviado_em', 'ultimo_erro']
+    date_hierarchy = 'created_at'
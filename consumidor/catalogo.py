@@ -0,0 +1,28 @@
+"""
+Versão global do catálogo, usada como chave do cache da página de produtos.
+
+A página renderizada fica no cache sob a versão atual; qualquer alteração de
+estoque incrementa a versão (signals de Item aqui no Django e SQL direto nas
+Lambdas de venda e entrega), então a próxima visita renderiza de novo e as
+entradas antigas simplesmente expiram. Ler a versão custa uma consulta por
+chave primária, no lugar de carregar e renderizar o catálogo inteiro.
+"""
+
+from django.db.models import F
+
+from .models import CatalogoVersao
+
+VERSAO_ID = 1
+
+
+def versao_catalogo():
+    """Retorna a versão atual do catálogo."""
+    versao = CatalogoVersao.objects.filter(pk=VERSAO_ID).values_list('versao', flat=True).first()
+    return versao if versao is not None else 0
+
+
+def incrementar_versao():
+    """Incrementa a versão do catálogo (na transação corrente, se houver)."""
+    atualizadas = CatalogoVersao.objects.filter(pk=VERSAO_ID).update(versao=F('versao') + 1)
+    if not atualizadas:
+        CatalogoVersao.objects.get_or_create(pk=VERSAO_ID)
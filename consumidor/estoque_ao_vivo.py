@@ -0,0 +1,159 @@
+"""
+Estoque ao vivo por Server-Sent Events.
+
+Um único monitor por processo consulta a versão do catálogo a cada
+ESTOQUE_SSE_INTERVALO segundos (uma query por chave primária) e, só quando
+ela muda, relê o estoque dos itens e calcula o que mudou. As diferenças são
+entregues a todos os clientes conectados, então o custo no banco não cresce
+com o número de conexões.
+
+Cada cliente tem um buffer próprio que guarda só o estado mais recente de
+cada item (`{item_id: delta}`): um cliente lento nunca acumula mais do que um
+registro por item, e nunca recebe um estado velho depois de um novo.
+
+As conexões são corrotinas no event loop do worker ASGI, sem thread por
+cliente; o monitor roda enquanto houver pelo menos um cliente conectado.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .catalogo import versao_catalogo
+from .models import Item
+
+
+def formatar_evento(nome, dados):
+    """Serializa um evento no formato text/event-stream."""
+    return f'event: {nome}\ndata: {json.dumps(dados, separators=(",", ":"))}\n\n'
+
+
+class Assinante:
+    """Conexão SSE de um cliente: mudanças pendentes coalescidas por item."""
+
+    def __init__(self):
+        self.pendentes = {}
+        self.evento = asyncio.Event()
+
+    def publicar(self, deltas):
+        for delta in deltas:
+            self.pendentes[delta['item_id']] = delta
+        self.evento.set()
+
+    def retirar(self):
+        deltas = list(self.pendentes.values())
+        self.pendentes.clear()
+        self.evento.clear()
+        return deltas
+
+
+class MonitorEstoque:
+    """Consulta única e compartilhada do estoque para todos os clientes do processo."""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.assinantes = set()
+        self.snapshot = {}
+        self.versao = None
+        self.consultas = 0
+        self._tarefa = None
+        self._loop = None
+        self._pronto = None
+
+    def _ler_snapshot(self):
+        versao = versao_catalogo()
+        if versao == self.versao:
+            return versao, None
+        itens = Item.objects.values_list('id', 'quantidade_estoque', 'disponivel')
+        return versao, {
+            item_id: {'item_id': item_id, 'quantidade_estoque': quantidade, 'disponivel': disponivel}
+            for item_id, quantidade, disponivel in itens
+        }
+
+    async def verificar(self):
+        """
+        Relê o estoque se a versão do catálogo mudou e avisa os assinantes.
+
+        Returns:
+            list: deltas publicados nesta verificação
+        """
+        versao, snapshot = await sync_to_async(self._ler_snapshot)()
+        self.consultas += 1
+        if snapshot is None:
+            return []
+
+        deltas = [estado for item_id, estado in snapshot.items() if self.snapshot.get(item_id) != estado]
+        # Itens removidos aparecem como esgotados
+        deltas += [
+            {'item_id': item_id, 'quantidade_estoque': 0, 'disponivel': False}
+            for item_id in self.snapshot.keys() - snapshot.keys()
+        ]
+        primeira_leitura = self.versao is None
+        self.versao, self.snapshot = versao, snapshot
+        if deltas and not primeira_leitura:
+            for assinante in self.assinantes:
+                assinante.publicar(deltas)
+        return deltas
+
+    async def _executar(self):
+        try:
+            while self.assinantes:
+                try:
+                    await self.verificar()
+                except Exception as e:
+                    print(f"⚠️ Erro ao consultar estoque para SSE: {e}")
+                finally:
+                    self._pronto.set()
+                await asyncio.sleep(self.intervalo)
+        finally:
+            self._tarefa = None
+
+    async def assinar(self):
+        """Registra um cliente e garante que o monitor está rodando com um snapshot carregado."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Novo event loop (ex.: reinício do worker ou testes): estado do loop antigo não vale
+            self._loop, self._tarefa, self._pronto = loop, None, asyncio.Event()
+            self.versao, self.snapshot = None, {}
+
+        assinante = Assinante()
+        self.assinantes.add(assinante)
+        if self._tarefa is None:
+            self._tarefa = loop.create_task(self._executar())
+        await self._pronto.wait()
+        return assinante
+
+    def cancelar(self, assinante):
+        self.assinantes.discard(assinante)
+
+    def estatisticas(self):
+        return {
+            'conexoes': len(self.assinantes),
+            'itens': len(self.snapshot),
+            'versao_catalogo': self.versao,
+            'consultas': self.consultas,
+        }
+
+
+monitor = MonitorEstoque(settings.ESTOQUE_SSE_INTERVALO)
+
+
+async def eventos_estoque(assinante):
+    """
+    Gera o stream SSE de um cliente: o estoque atual ao conectar e depois
+    apenas as mudanças, com comentários de keep-alive para proxies.
+    """
+    try:
+        yield 'retry: 3000\n\n'
+        yield formatar_evento('snapshot', list(monitor.snapshot.values()))
+        while True:
+            try:
+                await asyncio.wait_for(assinante.evento.wait(), settings.ESTOQUE_SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ': ping\n\n'
+                continue
+            yield formatar_evento('estoque', assinante.retirar())
+    finally:
+        monitor.cancelar(assinante)
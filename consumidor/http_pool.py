@@ -0,0 +1,135 @@
+"""
+Sessão HTTP compartilhada para as chamadas às Function URLs das Lambdas.
+
+Todas as funções de `lambda_integration` usam a mesma `requests.Session` do
+processo, com pool de conexões keep-alive por host, então o handshake
+TCP + TLS com a Function URL só acontece na primeira chamada (ou quando a
+conexão ociosa é fechada pelo servidor).
+
+Configuração por variáveis de ambiente:
+    LAMBDA_HTTP_POOL_HOSTS    quantos hosts distintos manter em cache (padrão 10)
+    LAMBDA_HTTP_POOL_MAXSIZE  conexões mantidas por host (padrão 10)
+    LAMBDA_TIMEOUT_<ENDPOINT> "connect,read" em segundos, ex.: LAMBDA_TIMEOUT_VENDA_PRODUTOS="2,8"
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_HOSTS = int(os.getenv('LAMBDA_HTTP_POOL_HOSTS', '10'))
+POOL_MAXSIZE = int(os.getenv('LAMBDA_HTTP_POOL_MAXSIZE', '10'))
+
+# Timeouts (connect, read) por endpoint. O connect é curto porque, com
+# keep-alive, só é pago quando o pool precisa abrir uma conexão nova.
+TIMEOUTS_PADRAO = {
+    'subscribe_email': (3.05, 10),
+    'verifica_disponivel': (3.05, 10),
+    'venda_produtos': (3.05, 10),
+    'entrega_produto': (3.05, 30),
+}
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_adapter = None
+
+_chamadas = {}  # endpoint -> {'chamadas': int, 'erros': int, 'tempo_total_s': float}
+
+
+def timeout_para(endpoint):
+    """Retorna o timeout (connect, read) do endpoint, considerando LAMBDA_TIMEOUT_<ENDPOINT>."""
+    valor = os.getenv(f'LAMBDA_TIMEOUT_{endpoint.upper()}')
+    if valor:
+        connect, _, read = valor.partition(',')
+        return (float(connect), float(read or connect))
+    return TIMEOUTS_PADRAO.get(endpoint, (3.05, 10))
+
+
+def obter_sessao():
+    """
+    Retorna a sessão HTTP do processo.
+
+    Uma nova sessão é criada após um fork (ex.: workers do gunicorn), pois
+    conexões abertas não podem ser compartilhadas entre processos.
+    """
+    global _session, _session_pid, _adapter
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({'Content-Type': 'application/json'})
+                _session, _session_pid, _adapter = session, pid, adapter
+                _chamadas.clear()
+    return _session
+
+
+def post(endpoint, url, payload):
+    """
+    Faz um POST JSON para a Function URL reaproveitando conexões do pool.
+
+    Args:
+        endpoint: nome lógico do endpoint (define o timeout e as estatísticas)
+        url: Function URL da Lambda
+        payload: corpo JSON
+
+    Returns:
+        requests.Response
+    """
+    session = obter_sessao()
+    inicio = time.perf_counter()
+    erro = False
+    try:
+        return session.post(url, json=payload, timeout=timeout_para(endpoint))
+    except requests.exceptions.RequestException:
+        erro = True
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        with _lock:
+            dados = _chamadas.setdefault(endpoint, {'chamadas': 0, 'erros': 0, 'tempo_total_s': 0.0})
+            dados['chamadas'] += 1
+            dados['erros'] += int(erro)
+            dados['tempo_total_s'] += duracao
+
+
+def estatisticas_conexoes():
+    """
+    Estatísticas de reuso de conexões do processo atual.
+
+    Returns:
+        dict: por host, requisições feitas, conexões abertas e reusos; por
+        endpoint, chamadas, erros e latência média.
+    """
+    hosts = {}
+    if _adapter is not None and _session_pid == os.getpid():
+        pools = _adapter.poolmanager.pools
+        for chave in pools.keys():
+            pool = pools.get(chave)
+            if pool is None:
+                continue
+            requisicoes = pool.num_requests
+            conexoes = pool.num_connections
+            hosts[f'{pool.scheme}://{pool.host}:{pool.port}'] = {
+                'requisicoes': requisicoes,
+                'conexoes_novas': conexoes,
+                'reusos': max(requisicoes - conexoes, 0),
+                'taxa_reuso': round((requisicoes - conexoes) / requisicoes, 3) if requisicoes else 0.0,
+            }
+
+    with _lock:
+        endpoints = {
+            nome: {
+                'chamadas': dados['chamadas'],
+                'erros': dados['erros'],
+                'latencia_media_ms': round(dados['tempo_total_s'] * 1000 / dados['chamadas'], 1),
+            }
+            for nome, dados in _chamadas.items() if dados['chamadas']
+        }
+    return {'hosts': hosts, 'endpoints': endpoints}
@@ -0,0 +1,84 @@
+"""
+Derivados das imagens dos quitutes (miniaturas em WebP e JPEG).
+
+As imagens originais em media/produtos/ têm centenas de KB, e a lista de
+quitutes as mostra em cards de 192 px de altura. Para cada original são
+gerados derivados em LARGURAS (limitados à largura do original, sem
+ampliar), em WebP e em JPEG progressivo, em media/produtos/derivados/.
+
+Os nomes dos derivados dependem só do nome do original e da largura, então
+o template tag `imagem_responsiva` monta o srcset sem consultar o storage:
+basta a largura do original, guardada no Item junto com a altura.
+
+Os derivados são gerados no `Item.save()` quando a imagem muda e, para os
+itens já existentes, pelo comando `python manage.py gerar_derivados`.
+"""
+
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Larguras dos derivados: card da lista em 1x/2x e página de detalhe em 1x/2x
+LARGURAS = (320, 480, 672, 960, 1344)
+PASTA_DERIVADOS = 'produtos/derivados'
+# extensão -> (formato do Pillow, opções de gravação, tipo MIME)
+FORMATOS = {
+    'webp': ('WEBP', {'quality': 78, 'method': 4}, 'image/webp'),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}, 'image/jpeg'),
+}
+
+
+def larguras_derivadas(largura_original):
+    """Larguras geradas para um original (nunca maiores que ele)."""
+    return sorted({min(largura, largura_original) for largura in LARGURAS})
+
+
+def nome_derivado(nome_original, largura, extensao):
+    """Caminho do derivado no storage, ex.: produtos/derivados/brioche-320w.webp."""
+    base = os.path.splitext(os.path.basename(nome_original))[0]
+    return f'{PASTA_DERIVADOS}/{base}-{largura}w.{extensao}'
+
+
+def gerar_derivados(nome_original, storage=None):
+    """
+    Gera todos os derivados de uma imagem, substituindo os que já existirem.
+
+    Args:
+        nome_original: caminho da imagem original no storage
+        storage: storage dos arquivos (padrão: default_storage)
+
+    Returns:
+        tuple: (largura, altura) do original, já com a rotação do EXIF aplicada
+    """
+    storage = storage or default_storage
+    with storage.open(nome_original, 'rb') as arquivo, Image.open(arquivo) as original:
+        imagem = ImageOps.exif_transpose(original)
+        if imagem.mode != 'RGB':
+            imagem = imagem.convert('RGB')
+        largura, altura = imagem.size
+
+        # Da maior para a menor, reduzindo sempre a partir do derivado anterior
+        fonte = imagem
+        for largura_derivado in reversed(larguras_derivadas(largura)):
+            if largura_derivado != fonte.width:
+                tamanho = (largura_derivado, max(round(altura * largura_derivado / largura), 1))
+                fonte = fonte.resize(tamanho, Image.Resampling.LANCZOS)
+            for extensao, (formato, opcoes, _) in FORMATOS.items():
+                buffer = BytesIO()
+                fonte.save(buffer, formato, **opcoes)
+                destino = nome_derivado(nome_original, largura_derivado, extensao)
+                if storage.exists(destino):
+                    storage.delete(destino)
+                storage.save(destino, ContentFile(buffer.getvalue()))
+    return largura, altura
+
+
+def srcset(nome_original, largura_original, extensao):
+    """Valor do atributo srcset com todos os derivados de um formato."""
+    return ', '.join(
+        f'{default_storage.url(nome_derivado(nome_original, largura, extensao))} {largura}w'
+        for largura in larguras_derivadas(largura_original)
+    )
@@ -0,0 +1,253 @@
+"""
+Cache em memória dos emails já inscritos no SNS.
+
+A homepage recebe o email de todo cliente que volta ao site, e quase todos já
+estão inscritos. Em vez de consultar `EmailSubscription` a cada envio, cada
+processo mantém um LRU limitado (INSCRITOS_CACHE_MAX emails) com os emails
+inscritos: um acerto dispensa o banco e a Lambda subscribe_email.
+
+O cache guarda apenas emails confirmados como inscritos, então um erro nele só
+custa a consulta ao banco de sempre, nunca deixa de inscrever alguém. É
+aquecido com as inscrições mais recentes na primeira consulta do processo e
+atualizado pelos signals de `EmailSubscription`.
+
+Emails novos não esperam a Lambda: a view só grava a inscrição pendente
+(`registrar_inscricao`) e redireciona, e o worker
+`python manage.py inscrever_emails` drena a fila com `processar_lote`, com
+concorrência limitada e backoff exponencial entre as tentativas. Com
+USE_SQS_TRIGGER o worker só entrega o email ao buffer do SQS: a inscrição
+continua pendente até a Lambda gravá-la como inscrita, e volta a ser enviada
+se isso não acontecer em ESPERA_LAMBDA_SEGUNDOS (mensagem perdida no buffer).
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .lambda_integration import subscribe_email_to_sns
+from .models import EmailSubscription
+from .outbox import calcular_backoff
+
+# Tempo durante o qual um lote reivindicado fica invisível para outros workers
+LEASE_SEGUNDOS = 60
+# Prazo para a Lambda concluir uma inscrição enviada pelo SQS antes do reenvio
+ESPERA_LAMBDA_SEGUNDOS = 300
+# Inscrições recentes usadas no cálculo do atraso (lag) de inscrição
+AMOSTRA_LAG = 500
+
+
+class CacheInscritos:
+    """LRU de emails inscritos, seguro para várias threads."""
+
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self._emails = OrderedDict()
+        self._lock = threading.Lock()
+        self.aquecido = False
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self):
+        return len(self._emails)
+
+    def contem(self, email):
+        """Indica se o email está no cache, marcando-o como usado recentemente."""
+        if not self.aquecido:
+            self.aquecer()
+        with self._lock:
+            if email in self._emails:
+                self._emails.move_to_end(email)
+                self.acertos += 1
+                return True
+            self.falhas += 1
+            return False
+
+    async def acontem(self, email):
+        """Versão de `contem` para views assíncronas (o aquecimento consulta o banco)."""
+        if not self.aquecido:
+            await sync_to_async(self.aquecer)()
+        return self.contem(email)
+
+    def adicionar(self, email):
+        with self._lock:
+            self._emails[email] = None
+            self._emails.move_to_end(email)
+            while len(self._emails) > self.capacidade:
+                self._emails.popitem(last=False)
+
+    def remover(self, email):
+        with self._lock:
+            self._emails.pop(email, None)
+
+    def aquecer(self):
+        """Carrega as inscrições mais recentes do banco, até a capacidade do cache."""
+        emails = list(
+            EmailSubscription.objects.filter(subscribed=True)
+            .order_by('-created_at')
+            .values_list('email', flat=True)[:self.capacidade]
+        )
+        with self._lock:
+            # Do mais antigo para o mais recente, para que os recentes saiam por último
+            for email in reversed(emails):
+                self._emails[email] = None
+            self.aquecido = True
+        print(f"📇 Cache de inscritos aquecido com {len(emails)} emails")
+
+    def limpar(self):
+        with self._lock:
+            self._emails.clear()
+            self.aquecido = False
+            self.acertos = self.falhas = 0
+
+    def estatisticas(self):
+        return {
+            'emails': len(self._emails),
+            'capacidade': self.capacidade,
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+        }
+
+
+inscritos = CacheInscritos(settings.INSCRITOS_CACHE_MAX)
+
+
+def registrar_inscricao(email):
+    """
+    Grava a inscrição pendente do email, sem chamar a Lambda.
+
+    Returns:
+        EmailSubscription: inscrição existente ou criada
+    """
+    subscription, created = EmailSubscription.objects.get_or_create(
+        email=email,
+        defaults={'subscribed': False}
+    )
+    if subscription.subscribed:
+        inscritos.adicionar(email)
+    elif created:
+        print(f"📥 Inscrição de {email} na fila")
+    return subscription
+
+
+async def aregistrar_inscricao(email):
+    """Versão assíncrona de `registrar_inscricao`, para as views ASGI."""
+    subscription, created = await EmailSubscription.objects.aget_or_create(
+        email=email,
+        defaults={'subscribed': False}
+    )
+    if subscription.subscribed:
+        inscritos.adicionar(email)
+    elif created:
+        print(f"📥 Inscrição de {email} na fila")
+    return subscription
+
+
+def reivindicar_pendentes(tamanho):
+    """
+    Reserva até `tamanho` inscrições pendentes para este worker.
+
+    Mesmo esquema da outbox: SKIP LOCKED no MySQL e lease de LEASE_SEGUNDOS
+    na próxima tentativa, que devolve as linhas à fila se o worker morrer.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailSubscription.objects
+            .select_for_update(skip_locked=True)
+            .filter(subscribed=False, proxima_tentativa__lte=agora)
+            .order_by('proxima_tentativa', 'id')
+            .values_list('id', flat=True)[:tamanho]
+        )
+        if not ids:
+            return []
+        EmailSubscription.objects.filter(id__in=ids).update(
+            proxima_tentativa=agora + timedelta(seconds=LEASE_SEGUNDOS)
+        )
+    return list(EmailSubscription.objects.filter(id__in=ids).order_by('id'))
+
+
+def processar_lote(tamanho=50, concorrencia=8):
+    """
+    Reivindica um lote de inscrições pendentes e chama a Lambda para cada uma.
+
+    Inscrições que falham voltam para a fila com backoff exponencial
+    (limitado a 15 minutos), sem limite de tentativas. As enviadas pelo SQS
+    continuam pendentes, aguardando a Lambda.
+
+    Returns:
+        dict: contagem de inscritos, enviados ao SQS e reagendados no lote
+    """
+    pendentes = reivindicar_pendentes(tamanho)
+    resultado = {'inscritos': 0, 'enviados': 0, 'reagendados': 0}
+    if not pendentes:
+        return resultado
+
+    def tentar(subscription):
+        try:
+            return subscription, subscribe_email_to_sns(subscription.email)
+        except Exception as e:
+            return subscription, {'success': False, 'message': str(e)}
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(tentar, pendentes))
+
+    agora = timezone.now()
+    for subscription, retorno in resultados:
+        tentativas = subscription.tentativas + 1
+        if retorno.get('success') and retorno.get('aguardando_lambda'):
+            # A Lambda grava subscribed e o ARN; se a mensagem se perder,
+            # a inscrição volta para a fila depois do prazo
+            EmailSubscription.objects.filter(id=subscription.id, subscribed=False).update(
+                tentativas=tentativas,
+                proxima_tentativa=agora + max(timedelta(seconds=ESPERA_LAMBDA_SEGUNDOS), calcular_backoff(tentativas)),
+                ultimo_erro=''
+            )
+            resultado['enviados'] += 1
+        elif retorno.get('success'):
+            campos = {'subscribed': True, 'inscrito_em': agora, 'tentativas': tentativas, 'ultimo_erro': ''}
+            if retorno.get('subscription_arn'):
+                campos['subscription_arn'] = retorno['subscription_arn']
+            EmailSubscription.objects.filter(id=subscription.id).update(**campos)
+            resultado['inscritos'] += 1
+        else:
+            print(f"⚠️ Falha ao inscrever {subscription.email}: {retorno.get('message')}")
+            EmailSubscription.objects.filter(id=subscription.id).update(
+                tentativas=tentativas,
+                proxima_tentativa=agora + calcular_backoff(tentativas),
+                ultimo_erro=retorno.get('message') or ''
+            )
+            resultado['reagendados'] += 1
+    return resultado
+
+
+def estatisticas_fila():
+    """
+    Profundidade da fila de inscrições e atraso entre o pedido e a inscrição.
+
+    `lag_*_s` vem das últimas AMOSTRA_LAG inscrições concluídas;
+    `mais_antiga_s` é a idade da inscrição pendente mais antiga.
+    """
+    agora = timezone.now()
+    fila = EmailSubscription.objects.filter(subscribed=False).aggregate(
+        pendentes=Count('id'), mais_antiga=Min('created_at')
+    )
+    concluidas = (
+        EmailSubscription.objects.filter(subscribed=True, inscrito_em__isnull=False)
+        .order_by('-inscrito_em')
+        .values_list('created_at', 'inscrito_em')[:AMOSTRA_LAG]
+    )
+    lags = sorted((inscrito_em - criada).total_seconds() for criada, inscrito_em in concluidas)
+    return {
+        'pendentes': fila['pendentes'],
+        'mais_antiga_s': round((agora - fila['mais_antiga']).total_seconds(), 1) if fila['mais_antiga'] else None,
+        'lag_p50_s': round(lags[len(lags) // 2], 2) if lags else None,
+        'lag_p95_s': round(lags[min(int(len(lags) * 0.95), len(lags) - 1)], 2) if lags else None,
+        'amostra_lag': len(lags),
+    }
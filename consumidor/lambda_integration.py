@@ -4,7 +4,10 @@ Integração com AWS Lambda Functions
 import os
 import json
 import requests
-import boto3
+from urllib3.exceptions import NewConnectionError
+
+from .http_pool import post
+from .sqs_buffer import obter_buffer
 
 SUBSCRIBE_EMAIL_URL = os.getenv('SUBSCRIBE_EMAIL_URL', '')
 SUBSCRIBE_EMAIL_QUEUE_URL = os.getenv('SUBSCRIBE_EMAIL_QUEUE_URL', '')
@@ -14,6 +17,32 @@ ENTREGA_PRODUTO_URL = os.getenv('ENTREGA_PRODUTO_URL', '')
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
 USE_SQS_TRIGGER = os.getenv('USE_SQS_TRIGGER', 'false').lower() == 'true'
 
+# Falhas em que a Lambda com certeza não processou a venda: a URL não está
+# configurada, a conexão nem foi aberta ou a Function URL recusou a chamada
+# por throttling (429). As demais ('indeterminada': timeout de leitura,
+# conexão caída no meio, erro 5xx) podem ter acontecido depois do commit.
+FALHAS_SEM_EFEITO = {'configuracao', 'conexao', 'recusada'}
+
+
+def classificar_erro(erro):
+    """Classifica uma exceção da chamada HTTP como 'conexao' ou 'indeterminada'."""
+    if isinstance(erro, requests.exceptions.ConnectTimeout):
+        return 'conexao'
+    if isinstance(erro, requests.exceptions.ConnectionError):
+        motivo = erro.args[0] if erro.args else None
+        if isinstance(getattr(motivo, 'reason', motivo), NewConnectionError):
+            return 'conexao'
+    return 'indeterminada'
+
+
+def classificar_status(status_code):
+    """Classifica uma resposta sem sucesso; recusas de negócio (4xx) não são falhas."""
+    if status_code == 429:
+        return 'recusada'
+    if status_code >= 500:
+        return 'indeterminada'
+    return None
+
 
 def subscribe_email_to_sns(email):
     """
@@ -23,7 +52,8 @@ def subscribe_email_to_sns(email):
         email: Email do usuário a ser inscrito
         
     Returns:
-        dict: {'success': bool, 'message': str}
+        dict: {'success': bool, 'message': str, 'subscription_arn': str}
+        (via SQS, 'aguardando_lambda': True no lugar do ARN)
     """
     if USE_SQS_TRIGGER:
         return subscribe_via_sqs(email)
@@ -34,12 +64,15 @@ def subscribe_email_to_sns(email):
 def subscribe_via_sqs(email):
     """
     Envia mensagem para fila SQS que ativará o trigger da Lambda
-    
+
+    O sucesso só indica que a mensagem entrou no lote do buffer: quem marca a
+    inscrição como feita (com o ARN) é a própria Lambda, ao processar a fila.
+
     Args:
         email: Email do usuário a ser inscrito
-        
+
     Returns:
-        dict: {'success': bool, 'message': str}
+        dict: {'success': bool, 'message': str, 'aguardando_lambda': bool}
     """
     if not SUBSCRIBE_EMAIL_QUEUE_URL:
         print("⚠️ SUBSCRIBE_EMAIL_QUEUE_URL não configurada no .env")
@@ -49,21 +82,24 @@ def subscribe_via_sqs(email):
         }
     
     try:
-        sqs = boto3.client('sqs', region_name=AWS_REGION)
-        
+        # Mensagens são agrupadas e enviadas com send_message_batch (ver sqs_buffer.py)
+        buffer = obter_buffer(SUBSCRIBE_EMAIL_QUEUE_URL, AWS_REGION)
+
         message_body = json.dumps({'email': email})
-        
-        response = sqs.send_message(
-            QueueUrl=SUBSCRIBE_EMAIL_QUEUE_URL,
-            MessageBody=message_body
-        )
-        
-        print(f"✅ Mensagem enviada para SQS: {response.get('MessageId')}")
-        
+
+        if not buffer.enviar(message_body):
+            print(f"⚠️ Buffer SQS cheio, email {email} não enfileirado")
+            return {
+                'success': False,
+                'message': 'Fila de envio para o SQS cheia, tente novamente'
+            }
+
+        print(f"✅ Email {email} adicionado ao lote do SQS")
+
         return {
             'success': True,
             'message': 'Email enviado para processamento via SQS',
-            'message_id': response.get('MessageId')
+            'aguardando_lambda': True
         }
         
     except Exception as e:
@@ -95,12 +131,7 @@ def subscribe_via_http(email):
         # Function URL recebe payload direto (não precisa wrapper 'body')
         payload = {'email': email}
         
-        response = requests.post(
-            SUBSCRIBE_EMAIL_URL,
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
-        )
+        response = post('subscribe_email', SUBSCRIBE_EMAIL_URL, payload)
         
         if response.status_code == 200:
             data = response.json()
@@ -116,7 +147,7 @@ def subscribe_via_http(email):
             }
             
     except requests.exceptions.Timeout:
-        print(f"❌ Timeout ao chamar Lambda subscribe_email")
+        print("❌ Timeout ao chamar Lambda subscribe_email")
         return {
             'success': False,
             'message': 'Timeout na chamada da Lambda'
@@ -161,12 +192,7 @@ def verifica_disponivel(produto_id, email):
             'email': email
         }
         
-        response = requests.post(
-            VERIFICA_DISPONIVEL_URL,
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
-        )
+        response = post('verifica_disponivel', VERIFICA_DISPONIVEL_URL, payload)
         
         data = response.json()
         
@@ -212,13 +238,15 @@ def processar_venda(produto_id, quantidade, email):
         email: Email do cliente
         
     Returns:
-        dict: {'success': bool, 'message': str}
+        dict: {'success': bool, 'message': str}; em caso de falha da chamada,
+        'falha' diz se a venda pode ter sido gravada (ver FALHAS_SEM_EFEITO)
     """
     if not VENDA_PRODUTOS_URL:
         print("⚠️ VENDA_PRODUTOS_URL não configurada no .env")
         return {
             'success': False,
-            'message': 'Lambda URL não configurada'
+            'message': 'Lambda URL não configurada',
+            'falha': 'configuracao'
         }
     
     try:
@@ -231,12 +259,7 @@ def processar_venda(produto_id, quantidade, email):
         
         print(f"📤 Enviando para Lambda venda_produtos: {payload}")
         
-        response = requests.post(
-            VENDA_PRODUTOS_URL,
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=10
-        )
+        response = post('venda_produtos', VENDA_PRODUTOS_URL, payload)
         
         print(f"📥 Resposta Lambda (status {response.status_code}): {response.text}")
         
@@ -254,14 +277,74 @@ def processar_venda(produto_id, quantidade, email):
         else:
             return {
                 'success': False,
-                'message': data.get('message', f'Erro HTTP {response.status_code}')
+                'message': data.get('message', f'Erro HTTP {response.status_code}'),
+                'produto': data.get('produto'),
+                'falha': classificar_status(response.status_code)
             }
             
     except Exception as e:
         print(f"❌ Erro ao chamar Lambda venda_produtos: {e}")
         return {
             'success': False,
-            'message': str(e)
+            'message': str(e),
+            'falha': classificar_erro(e)
+        }
+
+
+def processar_checkout(itens, email):
+    """
+    Chama Lambda venda_produtos com todos os itens do carrinho de uma vez.
+
+    A Lambda vende tudo ou nada em uma única transação.
+
+    Args:
+        itens: lista de {'produto_id': int, 'quantidade': int}
+        email: Email do cliente
+
+    Returns:
+        dict: {'success': bool, 'message': str, 'itens': list, 'falha': str}
+    """
+    if not VENDA_PRODUTOS_URL:
+        print("⚠️ VENDA_PRODUTOS_URL não configurada no .env")
+        return {
+            'success': False,
+            'message': 'Lambda URL não configurada',
+            'falha': 'configuracao'
+        }
+
+    try:
+        payload = {
+            'itens': itens,
+            'email': email
+        }
+
+        print(f"📤 Enviando pedido para Lambda venda_produtos: {payload}")
+
+        response = post('venda_produtos', VENDA_PRODUTOS_URL, payload)
+
+        print(f"📥 Resposta Lambda (status {response.status_code}): {response.text}")
+
+        data = response.json()
+
+        if response.status_code == 200:
+            return {
+                'success': True,
+                'message': data.get('message'),
+                'itens': data.get('itens', [])
+            }
+        else:
+            return {
+                'success': False,
+                'message': data.get('message', f'Erro HTTP {response.status_code}'),
+                'falha': classificar_status(response.status_code)
+            }
+
+    except Exception as e:
+        print(f"❌ Erro ao chamar Lambda venda_produtos: {e}")
+        return {
+            'success': False,
+            'message': str(e),
+            'falha': classificar_erro(e)
         }
 
 
@@ -283,12 +366,7 @@ def entregar_produtos():
         # Function URL recebe payload direto (vazio para esta Lambda)
         payload = {}
         
-        response = requests.post(
-            ENTREGA_PRODUTO_URL,
-            json=payload,
-            headers={'Content-Type': 'application/json'},
-            timeout=30
-        )
+        response = post('entrega_produto', ENTREGA_PRODUTO_URL, payload)
         
         data = response.json()
         
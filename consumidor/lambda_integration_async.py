@@ -0,0 +1,103 @@
+"""
+Integração assíncrona (asyncio) com as AWS Lambda Functions.
+
+Versão não bloqueante de `lambda_integration` para as views assíncronas:
+enquanto uma chamada à Function URL está em andamento, o worker
+ASGI continua atendendo outras requisições. Os retornos seguem exatamente o
+formato das funções síncronas.
+"""
+
+import asyncio
+import weakref
+
+import httpx
+
+from . import lambda_integration as sync
+from .http_pool import POOL_MAXSIZE, timeout_para
+
+# Um cliente httpx por event loop (um AsyncClient não pode ser usado em outro loop)
+_clientes = weakref.WeakKeyDictionary()
+
+
+def obter_cliente():
+    """Retorna o httpx.AsyncClient (com pool keep-alive) do event loop atual."""
+    loop = asyncio.get_running_loop()
+    cliente = _clientes.get(loop)
+    if cliente is None:
+        cliente = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=None,
+                max_keepalive_connections=POOL_MAXSIZE * 10,
+            ),
+            headers={'Content-Type': 'application/json'},
+        )
+        _clientes[loop] = cliente
+    return cliente
+
+
+async def post_async(endpoint, url, payload):
+    """POST JSON não bloqueante para a Function URL, com os timeouts de `http_pool`."""
+    connect, read = timeout_para(endpoint)
+    return await obter_cliente().post(
+        url,
+        json=payload,
+        timeout=httpx.Timeout(read, connect=connect),
+    )
+
+
+def classificar_erro_async(erro):
+    """Versão de `classificar_erro` para as exceções do httpx."""
+    if isinstance(erro, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+        return 'conexao'
+    return 'indeterminada'
+
+
+async def processar_venda_async(produto_id, quantidade, email):
+    """Versão assíncrona de `processar_venda`."""
+    if not sync.VENDA_PRODUTOS_URL:
+        print("⚠️ VENDA_PRODUTOS_URL não configurada no .env")
+        return {
+            'success': False,
+            'message': 'Lambda URL não configurada',
+            'falha': 'configuracao'
+        }
+
+    try:
+        payload = {
+            'produto_id': produto_id,
+            'quantidade': quantidade,
+            'email': email
+        }
+
+        print(f"📤 Enviando para Lambda venda_produtos: {payload}")
+
+        response = await post_async('venda_produtos', sync.VENDA_PRODUTOS_URL, payload)
+
+        print(f"📥 Resposta Lambda (status {response.status_code}): {response.text}")
+
+        data = response.json()
+
+        if response.status_code == 200:
+            return {
+                'success': True,
+                'message': data.get('message'),
+                'produto': data.get('produto'),
+                'quantidade_vendida': data.get('quantidade_vendida'),
+                'estoque_restante': data.get('estoque_restante'),
+                'disponivel': data.get('disponivel')
+            }
+        else:
+            return {
+                'success': False,
+                'message': data.get('message', f'Erro HTTP {response.status_code}'),
+                'produto': data.get('produto'),
+                'falha': sync.classificar_status(response.status_code)
+            }
+
+    except Exception as e:
+        print(f"❌ Erro ao chamar Lambda venda_produtos: {e}")
+        return {
+            'success': False,
+            'message': str(e),
+            'falha': classificar_erro_async(e)
+        }
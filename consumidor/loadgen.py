@@ -0,0 +1,309 @@
+"""
+Gerador de carga assíncrono com jornadas reais de clientes.
+
+Cada cliente virtual percorre o fluxo do site como um navegador: informa o
+email na homepage, abre a lista de quitutes, abre o detalhe de um item e
+faz a reserva, sempre com o token CSRF do cookie. As chegadas seguem um
+processo de Poisson com a taxa configurada e a escolha do item segue uma
+distribuição de Zipf (poucos itens "quentes" recebem a maior parte das
+reservas). Em paralelo, um administrador aciona a entrega de produtos em
+intervalos fixos para reabastecer o estoque.
+
+O resultado traz, por etapa da jornada, vazão, taxa de erro e latências
+p50/p95/p99, em JSON para comparar execuções. Usado pelo comando
+`python manage.py gerar_carga`.
+"""
+
+import asyncio
+import random
+import re
+import time
+import uuid
+
+import httpx
+
+ETAPAS = ('homepage', 'email', 'lista', 'detalhe', 'reserva', 'entrega')
+
+_LINK_ITEM = re.compile(r'href="([^"]*?/(\d+)/)"')
+
+
+def percentil(valores, p):
+    """Percentil por posição (valores já ordenados)."""
+    if not valores:
+        return None
+    return valores[min(int(len(valores) * p), len(valores) - 1)]
+
+
+class Metricas:
+    """Latências e contagens por etapa da jornada."""
+
+    def __init__(self):
+        self.latencias = {etapa: [] for etapa in ETAPAS}
+        self.erros = {etapa: 0 for etapa in ETAPAS}
+        self.status = {etapa: {} for etapa in ETAPAS}
+        self.reservas = {'confirmadas': 0, 'recusadas': 0}
+        self.jornadas = {'iniciadas': 0, 'concluidas': 0, 'interrompidas': 0, 'descartadas': 0}
+
+    def registrar(self, etapa, inicio, status=None, erro=False):
+        self.latencias[etapa].append((time.perf_counter() - inicio) * 1000)
+        chave = str(status) if status is not None else 'excecao'
+        self.status[etapa][chave] = self.status[etapa].get(chave, 0) + 1
+        if erro:
+            self.erros[etapa] += 1
+
+    def resumo(self, duracao):
+        etapas = {}
+        for etapa in ETAPAS:
+            latencias = sorted(self.latencias[etapa])
+            total = len(latencias)
+            if not total:
+                continue
+            etapas[etapa] = {
+                'requisicoes': total,
+                'vazao_rps': round(total / duracao, 2),
+                'erros': self.erros[etapa],
+                'taxa_erro': round(self.erros[etapa] / total, 4),
+                'status': self.status[etapa],
+                'latencia_ms': {
+                    'p50': round(percentil(latencias, 0.50), 1),
+                    'p95': round(percentil(latencias, 0.95), 1),
+                    'p99': round(percentil(latencias, 0.99), 1),
+                    'max': round(latencias[-1], 1),
+                },
+            }
+        return {
+            'duracao_s': round(duracao, 2),
+            'jornadas': dict(self.jornadas, por_segundo=round(self.jornadas['concluidas'] / duracao, 2)),
+            'reservas': self.reservas,
+            'etapas': etapas,
+        }
+
+
+class EscolhaZipf:
+    """Escolhe itens com probabilidade proporcional a 1 / posição ** expoente."""
+
+    def __init__(self, itens, expoente, aleatorio):
+        self.itens = list(itens)
+        aleatorio.shuffle(self.itens)  # quais itens são "quentes" muda com a semente
+        self.pesos = [1 / (posicao ** expoente) for posicao in range(1, len(self.itens) + 1)]
+        self.aleatorio = aleatorio
+
+    def escolher(self):
+        return self.aleatorio.choices(self.itens, weights=self.pesos, k=1)[0]
+
+
+class TransporteCompartilhado(httpx.AsyncBaseTransport):
+    """
+    Pool de conexões único para todos os clientes virtuais.
+
+    Cada jornada tem o seu AsyncClient (cookies de sessão e CSRF próprios),
+    mas fechar o cliente não deve fechar o pool dos outros.
+    """
+
+    def __init__(self, transporte):
+        self._transporte = transporte
+
+    async def handle_async_request(self, request):
+        return await self._transporte.handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+class GeradorCarga:
+    """
+    Dispara jornadas de clientes contra um servidor Django em execução.
+
+    Args:
+        url_base: endereço do site, ex.: http://localhost:8000
+        taxa: jornadas iniciadas por segundo (média do processo de Poisson)
+        duracao: segundos gerando novas jornadas
+        zipf: expoente da distribuição de popularidade dos itens (0 = uniforme)
+        max_jornadas: jornadas simultâneas; chegadas além disso são descartadas
+        intervalo_entrega: segundos entre reabastecimentos (0 desliga)
+        admin: (usuário, senha) para logar no admin antes das entregas, opcional
+    """
+
+    def __init__(self, url_base, taxa=5.0, duracao=60.0, zipf=1.1, max_jornadas=200,
+                 intervalo_entrega=30.0, admin=None, quantidade_max=2, timeout=30.0, semente=None):
+        self.url_base = url_base.rstrip('/')
+        self.taxa = taxa
+        self.duracao = duracao
+        self.zipf = zipf
+        self.max_jornadas = max_jornadas
+        self.intervalo_entrega = intervalo_entrega
+        self.admin = admin
+        self.quantidade_max = quantidade_max
+        self.timeout = timeout
+        self.aleatorio = random.Random(semente)
+        self.metricas = Metricas()
+        self._limites = httpx.Limits(max_connections=None, max_keepalive_connections=max_jornadas)
+        self._escolha = None
+
+    def _cliente(self, transporte):
+        return httpx.AsyncClient(
+            base_url=self.url_base,
+            timeout=self.timeout,
+            follow_redirects=False,
+            transport=transporte,
+        )
+
+    async def _requisitar(self, cliente, etapa, metodo, url, **kwargs):
+        """Faz a requisição e registra latência e status. Returns: response ou None."""
+        inicio = time.perf_counter()
+        try:
+            response = await cliente.request(metodo, url, **kwargs)
+        except httpx.HTTPError:
+            self.metricas.registrar(etapa, inicio, erro=True)
+            return None
+        self.metricas.registrar(etapa, inicio, response.status_code, erro=response.status_code >= 400)
+        return response
+
+    @staticmethod
+    def _csrf(cliente, url):
+        """Token CSRF do cookie, enviado no formulário e no cabeçalho Referer exigido em HTTPS."""
+        return {
+            'data': {'csrfmiddlewaretoken': cliente.cookies.get('csrftoken', '')},
+            'headers': {'Referer': str(cliente.base_url.join(url))},
+        }
+
+    async def descobrir_itens(self, transporte):
+        """Entra no site uma vez para listar os itens do catálogo."""
+        async with self._cliente(transporte) as cliente:
+            await cliente.get('/')
+            csrf = self._csrf(cliente, '/')
+            await cliente.post('/', data={**csrf['data'], 'email': 'carga-setup@example.com'}, headers=csrf['headers'])
+            response = await cliente.get('/quitutes/')
+        itens = sorted({int(item_id) for _, item_id in _LINK_ITEM.findall(response.text)})
+        if not itens:
+            raise RuntimeError('Nenhum item encontrado em /quitutes/: rode uma entrega de produtos antes da carga')
+        return itens
+
+    async def jornada(self, transporte, numero):
+        """Uma visita completa: homepage, email, lista, detalhe e reserva."""
+        m = self.metricas
+        m.jornadas['iniciadas'] += 1
+        email = f'carga-{numero}-{uuid.uuid4().hex[:8]}@example.com'
+        async with self._cliente(transporte) as cliente:
+            passos = [
+                ('homepage', 'GET', '/', {}),
+                ('email', 'POST', '/', None),
+                ('lista', 'GET', '/quitutes/', {}),
+            ]
+            for etapa, metodo, url, kwargs in passos:
+                if kwargs is None:
+                    csrf = self._csrf(cliente, url)
+                    kwargs = {'data': {**csrf['data'], 'email': email}, 'headers': csrf['headers']}
+                response = await self._requisitar(cliente, etapa, metodo, url, **kwargs)
+                if response is None or response.status_code >= 400:
+                    m.jornadas['interrompidas'] += 1
+                    return
+
+            item_id = self._escolha.escolher()
+            url_detalhe = f'/quitutes/{item_id}/'
+            response = await self._requisitar(cliente, 'detalhe', 'GET', url_detalhe)
+            if response is None or response.status_code >= 400:
+                m.jornadas['interrompidas'] += 1
+                return
+
+            csrf = self._csrf(cliente, url_detalhe)
+            dados = {
+                **csrf['data'],
+                'nome_cliente': f'Cliente {numero}',
+                'quantidade': self.aleatorio.randint(1, self.quantidade_max),
+            }
+            response = await self._requisitar(
+                cliente, 'reserva', 'POST', f'/quitutes/{item_id}/reserve/', data=dados, headers=csrf['headers']
+            )
+            if response is None or response.status_code >= 400:
+                m.jornadas['interrompidas'] += 1
+                return
+            # A página de erro de reserva (ex.: sem estoque) também responde 200
+            if 'Reserva Confirmada' in response.text:
+                m.reservas['confirmadas'] += 1
+            else:
+                m.reservas['recusadas'] += 1
+            m.jornadas['concluidas'] += 1
+
+    async def reabastecer(self, transporte, parar):
+        """Aciona a entrega de produtos (EntregarProdutosView) a cada intervalo_entrega segundos."""
+        async with self._cliente(transporte) as cliente:
+            if self.admin:
+                await cliente.get('/admin/login/')
+                csrf = self._csrf(cliente, '/admin/login/')
+                usuario, senha = self.admin
+                await cliente.post(
+                    '/admin/login/?next=/admin/',
+                    data={**csrf['data'], 'username': usuario, 'password': senha},
+                    headers=csrf['headers'],
+                )
+            url = '/quitutes/admin/entregar-produtos/'
+            while not parar.is_set():
+                try:
+                    await asyncio.wait_for(parar.wait(), timeout=self.intervalo_entrega)
+                    return
+                except asyncio.TimeoutError:
+                    pass
+                await cliente.get(url)
+                csrf = self._csrf(cliente, url)
+                await self._requisitar(cliente, 'entrega', 'POST', url, data=csrf['data'], headers=csrf['headers'])
+
+    async def executar(self):
+        """Gera a carga pelo tempo configurado e devolve o resumo das métricas."""
+        pool = httpx.AsyncHTTPTransport(limits=self._limites)
+        transporte = TransporteCompartilhado(pool)
+        try:
+            self._escolha = EscolhaZipf(await self.descobrir_itens(transporte), self.zipf, self.aleatorio)
+
+            parar = asyncio.Event()
+            tarefas = set()
+            vagas = asyncio.Semaphore(self.max_jornadas)
+            reabastecimento = (
+                asyncio.create_task(self.reabastecer(transporte, parar)) if self.intervalo_entrega > 0 else None
+            )
+
+            async def limitar(numero):
+                try:
+                    await self.jornada(transporte, numero)
+                finally:
+                    vagas.release()
+
+            inicio = time.perf_counter()
+            fim = inicio + self.duracao
+            proxima = inicio
+            numero = 0
+            while True:
+                # Intervalos exponenciais entre chegadas = processo de Poisson
+                proxima += self.aleatorio.expovariate(self.taxa)
+                if proxima >= fim:
+                    break
+                await asyncio.sleep(max(proxima - time.perf_counter(), 0))
+                if vagas.locked():
+                    self.metricas.jornadas['descartadas'] += 1
+                    continue
+                await vagas.acquire()
+                numero += 1
+                tarefa = asyncio.create_task(limitar(numero))
+                tarefas.add(tarefa)
+                tarefa.add_done_callback(tarefas.discard)
+
+            if tarefas:
+                await asyncio.gather(*tarefas, return_exceptions=True)
+            parar.set()
+            if reabastecimento:
+                await reabastecimento
+            duracao = time.perf_counter() - inicio
+        finally:
+            await pool.aclose()
+
+        resultado = self.metricas.resumo(duracao)
+        resultado['configuracao'] = {
+            'url_base': self.url_base,
+            'taxa_jornadas_s': self.taxa,
+            'duracao_s': self.duracao,
+            'zipf': self.zipf,
+            'max_jornadas': self.max_jornadas,
+            'intervalo_entrega_s': self.intervalo_entrega,
+            'itens': len(self._escolha.itens),
+        }
+        return resultado
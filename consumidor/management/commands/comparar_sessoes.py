@@ -0,0 +1,98 @@
+"""
+Compara as queries por página em cada modo de sessão do comprador.
+
+Percorre o fluxo do cliente (homepage, lista, detalhe, carrinho) com o Client
+de testes do Django, uma vez para cada CUSTOMER_SESSION_MODE, contando as
+queries e medindo o tempo de cada página no banco configurado. A homepage usa
+um email já inscrito, então nenhuma Lambda é chamada.
+
+Os dados criados (item, inscrição e sessões no banco) são removidos ao final.
+
+Uso:
+    python manage.py comparar_sessoes
+    python manage.py comparar_sessoes --repeticoes 200
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from consumidor.models import EmailSubscription, Item
+from consumidor.sessao_cliente import ENGINES
+
+EMAIL_BENCHMARK = 'comparar-sessoes@benchmark.local'
+
+
+class Command(BaseCommand):
+    help = 'Mostra quantas queries cada modo de sessão do comprador economiza por página.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=50,
+                            help='Requisições medidas por página (padrão 50).')
+
+    def handle(self, *args, **options):
+        repeticoes = options['repeticoes']
+        item = Item.objects.create(nome='comparar-sessoes', quantidade_estoque=1000)
+        EmailSubscription.objects.get_or_create(email=EMAIL_BENCHMARK, defaults={'subscribed': True})
+        chaves_banco = []
+        try:
+            paginas = [
+                ('homepage (POST email)', 'post', reverse('homepage'), {'email': EMAIL_BENCHMARK}),
+                ('lista de quitutes', 'get', reverse('item_list'), None),
+                ('detalhe do quitute', 'get', reverse('item_detail', args=[item.pk]), None),
+                ('adicionar ao carrinho', 'post', reverse('carrinho_adicionar', args=[item.pk]), {'quantidade': 1}),
+                ('carrinho', 'get', reverse('carrinho'), None),
+            ]
+            resultados = {}
+            for modo in ENGINES:
+                with override_settings(CUSTOMER_SESSION_MODE=modo):
+                    cliente = Client()
+                    resultados[modo] = self.medir(cliente, paginas, repeticoes)
+                    chave = cliente.cookies.get(settings.CUSTOMER_SESSION_COOKIE_NAME)
+                    if modo == 'db' and chave:
+                        chaves_banco.append(chave.value)
+        finally:
+            Session.objects.filter(session_key__in=chaves_banco).delete()
+            EmailSubscription.objects.filter(email=EMAIL_BENCHMARK).delete()
+            item.delete()
+
+        self.relatorio(paginas, resultados, repeticoes)
+
+    def medir(self, cliente, paginas, repeticoes):
+        """Returns: {página: (queries por requisição, tempo médio em ms)}."""
+        medidas = {}
+        for nome, metodo, url, dados in paginas:
+            getattr(cliente, metodo)(url, dados)  # aquece cache e sessão
+            inicio = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                for _ in range(repeticoes):
+                    response = getattr(cliente, metodo)(url, dados)
+            decorrido = time.perf_counter() - inicio
+            if response.status_code >= 400 or (metodo == 'get' and response.status_code != 200):
+                self.stderr.write(f'⚠️ {nome}: status {response.status_code}')
+            medidas[nome] = (len(queries) / repeticoes, decorrido / repeticoes * 1000)
+        return medidas
+
+    def relatorio(self, paginas, resultados, repeticoes):
+        modos = list(resultados)
+        self.stdout.write(f'📊 Queries por requisição (média de {repeticoes}) e tempo médio, banco {connection.vendor}')
+        cabecalho = f"{'página':<24}" + ''.join(f'{modo:>18}' for modo in modos) + f"{'economia':>12}"
+        self.stdout.write(cabecalho)
+        self.stdout.write('-' * len(cabecalho))
+        total_economia = 0
+        for nome, *_ in paginas:
+            colunas = ''.join(
+                f'{resultados[modo][nome][0]:>6.1f} q {resultados[modo][nome][1]:>6.1f} ms' for modo in modos
+            )
+            economia = resultados['db'][nome][0] - resultados['cookie'][nome][0]
+            total_economia += economia
+            self.stdout.write(f'{nome:<24}{colunas}{economia:>10.1f} q')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ O modo cookie evita {total_economia:.1f} queries por jornada em relação à sessão no banco'
+        ))
@@ -0,0 +1,78 @@
+"""
+Gera carga com jornadas reais de clientes contra um servidor em execução.
+
+Uso:
+    python manage.py gerar_carga --url http://localhost:8000 --taxa 10 --duracao 60
+    python manage.py gerar_carga --taxa 50 --zipf 1.3 --entrega-a-cada 15 --saida carga.json
+    python manage.py gerar_carga --admin admin:senha
+"""
+
+import asyncio
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from consumidor.loadgen import GeradorCarga
+
+
+class Command(BaseCommand):
+    help = 'Simula clientes (homepage, lista, detalhe, reserva) e mede vazão, erros e latências por etapa.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000',
+                            help='Endereço do servidor Django.')
+        parser.add_argument('--taxa', type=float, default=5.0,
+                            help='Jornadas iniciadas por segundo (chegadas de Poisson).')
+        parser.add_argument('--duracao', type=float, default=60.0,
+                            help='Segundos gerando novas jornadas.')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Concentração das reservas nos itens mais populares (0 = uniforme).')
+        parser.add_argument('--max-jornadas', type=int, default=200,
+                            help='Jornadas simultâneas; chegadas além disso são descartadas.')
+        parser.add_argument('--entrega-a-cada', type=float, default=30.0,
+                            help='Segundos entre reabastecimentos pelo admin (0 desliga).')
+        parser.add_argument('--admin', metavar='USUARIO:SENHA',
+                            help='Credenciais do admin usadas antes das entregas.')
+        parser.add_argument('--quantidade-max', type=int, default=2,
+                            help='Quantidade máxima por reserva.')
+        parser.add_argument('--timeout', type=float, default=30.0,
+                            help='Timeout de cada requisição, em segundos.')
+        parser.add_argument('--semente', type=int,
+                            help='Semente do gerador aleatório, para repetir a mesma carga.')
+        parser.add_argument('--saida', help='Arquivo onde gravar o JSON do resultado.')
+
+    def handle(self, *args, **options):
+        if options['taxa'] <= 0 or options['duracao'] <= 0:
+            raise CommandError('--taxa e --duracao devem ser maiores que zero.')
+
+        admin = None
+        if options['admin']:
+            usuario, _, senha = options['admin'].partition(':')
+            admin = (usuario, senha)
+
+        gerador = GeradorCarga(
+            options['url'],
+            taxa=options['taxa'],
+            duracao=options['duracao'],
+            zipf=options['zipf'],
+            max_jornadas=options['max_jornadas'],
+            intervalo_entrega=options['entrega_a_cada'],
+            admin=admin,
+            quantidade_max=options['quantidade_max'],
+            timeout=options['timeout'],
+            semente=options['semente'],
+        )
+        self.stderr.write(
+            f"🚦 Gerando {options['taxa']} jornadas/s por {options['duracao']}s contra {options['url']}..."
+        )
+        try:
+            resultado = asyncio.run(gerador.executar())
+        except RuntimeError as e:
+            raise CommandError(str(e))
+
+        saida = json.dumps(resultado, indent=2, ensure_ascii=False)
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                arquivo.write(saida)
+            self.stderr.write(f"📄 Resultado gravado em {options['saida']}")
+        self.stdout.write(saida)
@@ -0,0 +1,66 @@
+"""
+Gera os derivados (WebP/JPEG por largura) das imagens dos quitutes já cadastrados.
+
+A redução e a compressão das imagens usam CPU, então cada imagem é processada
+em um processo separado (ProcessPoolExecutor). Os processos só leem e gravam
+arquivos; as dimensões são gravadas no banco pelo processo principal, ao
+final, junto com um único incremento da versão do catálogo.
+
+Uso:
+    python manage.py gerar_derivados
+    python manage.py gerar_derivados --todos --processos 4
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+
+from consumidor.catalogo import incrementar_versao
+from consumidor.imagens import gerar_derivados
+from consumidor.models import Item
+
+
+class Command(BaseCommand):
+    help = 'Gera miniaturas WebP/JPEG das imagens dos quitutes em paralelo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true',
+                            help='Gera de novo também os itens que já têm derivados.')
+        parser.add_argument('--processos', type=int, default=os.cpu_count() or 1,
+                            help='Processos em paralelo (padrão: número de CPUs).')
+
+    def handle(self, *args, **options):
+        itens = Item.objects.exclude(imagem='').exclude(imagem__isnull=True)
+        if not options['todos']:
+            itens = itens.filter(imagem_largura__isnull=True)
+        pendentes = list(itens.values_list('pk', 'imagem'))
+        if not pendentes:
+            self.stdout.write('Nenhuma imagem pendente')
+            return
+
+        self.stdout.write(f"🖼️ Gerando derivados de {len(pendentes)} imagens com {options['processos']} processos")
+        inicio = time.perf_counter()
+        atualizados, erros = [], 0
+        # django.setup nos processos filhos, para o caso de o sistema usar spawn
+        with ProcessPoolExecutor(max_workers=options['processos'], initializer=django.setup) as executor:
+            futuros = {executor.submit(gerar_derivados, nome): (pk, nome) for pk, nome in pendentes}
+            for futuro in as_completed(futuros):
+                pk, nome = futuros[futuro]
+                try:
+                    largura, altura = futuro.result()
+                except Exception as e:
+                    erros += 1
+                    self.stderr.write(f'⚠️ {nome}: {e}')
+                    continue
+                atualizados.append(Item(pk=pk, imagem_largura=largura, imagem_altura=altura))
+
+        if atualizados:
+            Item.objects.bulk_update(atualizados, ['imagem_largura', 'imagem_altura'], batch_size=500)
+            # bulk_update não dispara signals: as páginas em cache passam a usar o srcset
+            incrementar_versao()
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(atualizados)} imagens processadas em {time.perf_counter() - inicio:.1f}s ({erros} erros)'
+        ))
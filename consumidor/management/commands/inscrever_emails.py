@@ -0,0 +1,51 @@
+"""
+Worker que inscreve no SNS os emails registrados pela homepage.
+
+Uso:
+    python manage.py inscrever_emails
+    python manage.py inscrever_emails --lote 100 --concorrencia 16
+    python manage.py inscrever_emails --uma-vez
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from consumidor.inscricoes import estatisticas_fila, processar_lote
+
+
+class Command(BaseCommand):
+    help = 'Chama a Lambda subscribe_email para as inscrições pendentes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50,
+                            help='Quantidade máxima de inscrições reivindicadas por lote.')
+        parser.add_argument('--concorrencia', type=int, default=8,
+                            help='Chamadas simultâneas à Lambda.')
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos de espera quando a fila está vazia.')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Esvazia a fila uma vez e termina.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('📨 Worker de inscrições iniciado')
+        try:
+            while True:
+                resultado = processar_lote(
+                    tamanho=options['lote'],
+                    concorrencia=options['concorrencia'],
+                )
+                if sum(resultado.values()):
+                    fila = estatisticas_fila()
+                    self.stdout.write(
+                        f"📧 Lote processado: {resultado['inscritos']} inscritos, "
+                        f"{resultado['enviados']} enviados ao SQS, {resultado['reagendados']} reagendados | fila: {fila['pendentes']} pendentes, "
+                        f"lag p95 {fila['lag_p95_s']} s"
+                    )
+                    continue
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Worker de inscrições encerrado')
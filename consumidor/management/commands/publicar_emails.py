@@ -0,0 +1,53 @@
+"""
+Worker que publica no SNS os emails gravados na outbox.
+
+Uso:
+    python manage.py publicar_emails
+    python manage.py publicar_emails --lote 100 --concorrencia 16
+    python manage.py publicar_emails --uma-vez
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from consumidor.outbox import publicar_lote
+
+
+class Command(BaseCommand):
+    help = 'Publica no SNS, em lotes, os emails pendentes da outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=50,
+                            help='Quantidade máxima de emails reivindicados por lote.')
+        parser.add_argument('--concorrencia', type=int, default=8,
+                            help='Publicações simultâneas no SNS.')
+        parser.add_argument('--max-tentativas', type=int, default=5,
+                            help='Tentativas antes de marcar o email como falho.')
+        parser.add_argument('--intervalo', type=float, default=1.0,
+                            help='Segundos de espera quando a outbox está vazia.')
+        parser.add_argument('--uma-vez', action='store_true',
+                            help='Esvazia a outbox uma vez e termina.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('📬 Worker da outbox de emails iniciado')
+        try:
+            while True:
+                resultado = publicar_lote(
+                    tamanho=options['lote'],
+                    concorrencia=options['concorrencia'],
+                    max_tentativas=options['max_tentativas'],
+                )
+                processados = sum(resultado.values())
+                if processados:
+                    self.stdout.write(
+                        f"📧 Lote publicado: {resultado['enviados']} enviados, "
+                        f"{resultado['reagendados']} reagendados, {resultado['falhas']} falhas"
+                    )
+                    continue
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Worker da outbox encerrado')
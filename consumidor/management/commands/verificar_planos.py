@@ -0,0 +1,217 @@
+"""
+Verifica com EXPLAIN se as consultas mais frequentes usam índice.
+
+Cada consulta conhecida do sistema (views, admin, Lambdas) passa por EXPLAIN no
+banco configurado e o plano de execução é inspecionado. O comando falha se
+alguma delas cair em varredura completa da tabela:
+    SQLite      "SCAN <tabela>" sem índice
+    MySQL       access_type "ALL"
+    PostgreSQL  "Seq Scan"
+
+Com tabelas quase vazias o otimizador do MySQL prefere varrer a tabela, então
+use --popular para gerar dados sintéticos antes da verificação (removidos ao
+final).
+
+Uso:
+    python manage.py verificar_planos
+    python manage.py verificar_planos --popular 20000
+    python manage.py verificar_planos --verbose
+"""
+
+import json
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from consumidor.models import EmailOutbox, EmailSubscription, Item, Notificacao, Reserva
+
+MARCADOR_SEED = 'planos-seed'
+
+
+def consultas_quentes():
+    """
+    Consultas conhecidas do sistema, como (nome, sql, parâmetros).
+
+    O SQL é o mesmo executado pelas Lambdas e pelas views, com comparações
+    explícitas nos campos booleanos (o ORM gera `WHERE NOT campo`, que o
+    SQLite não consegue resolver por índice).
+    """
+    agora = timezone.now()
+    email = f'c1@{MARCADOR_SEED}.local'
+    item_ids = (list(Item.objects.order_by('-id').values_list('id', flat=True)[:3]) + [1, 2, 3])[:3]
+    return [
+        ('lista de espera FIFO de um produto (envia_email_interessados)',
+         """
+         SELECT id, email_cliente, quantidade, data_criacao FROM consumidor_notificacao
+         WHERE item_id = %s AND notificado = %s ORDER BY data_criacao, id LIMIT 500
+         """, [item_ids[0], False]),
+        ('interessados por produto reabastecido (simulador_vendedor)',
+         """
+         SELECT item_id, COUNT(*) FROM consumidor_notificacao
+         WHERE notificado = %s AND item_id IN (%s, %s, %s) GROUP BY item_id
+         """, [False, *item_ids]),
+        ('reservas de um cliente',
+         """
+         SELECT id, item_id, quantidade, data_reserva FROM consumidor_reserva
+         WHERE email_cliente = %s ORDER BY data_reserva DESC
+         """, [email]),
+        ('reservas por data (date_hierarchy do admin)',
+         """
+         SELECT id, email_cliente, data_reserva FROM consumidor_reserva
+         WHERE data_reserva >= %s AND data_reserva < %s
+         """, [agora - timedelta(days=1), agora]),
+        ('produtos esgotados',
+         "SELECT id, nome FROM consumidor_item WHERE disponivel = %s", [False]),
+        ('inscrição de um email (homepage)',
+         "SELECT id, subscribed FROM consumidor_emailsubscription WHERE email = %s", [email]),
+        ('inscrições pendentes (admin)',
+         """
+         SELECT id, email FROM consumidor_emailsubscription
+         WHERE subscribed = %s ORDER BY created_at DESC
+         """, [False]),
+        ('inscrições pendentes da fila (inscrever_emails)',
+         """
+         SELECT id FROM consumidor_emailsubscription
+         WHERE subscribed = %s AND proxima_tentativa <= %s ORDER BY proxima_tentativa, id LIMIT 50
+         """, [False, agora]),
+        ('emails pendentes da outbox (publicar_emails)',
+         """
+         SELECT id FROM consumidor_emailoutbox
+         WHERE status = %s AND proxima_tentativa <= %s ORDER BY proxima_tentativa, id LIMIT 50
+         """, [EmailOutbox.STATUS_PENDENTE, agora]),
+    ]
+
+
+def varreduras_completas(sql, params):
+    """
+    Executa o EXPLAIN da consulta e identifica as tabelas varridas por completo.
+
+    Returns:
+        tuple: (texto do plano, lista de tabelas com full scan)
+    """
+    vendor = connection.vendor
+    if vendor not in ('sqlite', 'mysql', 'postgresql'):
+        raise CommandError(f'Banco {vendor} não suportado pelo verificador de planos.')
+
+    prefixo = connection.ops.explain_query_prefix('json' if vendor == 'mysql' else None)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefixo} {sql}', params)
+        linhas = cursor.fetchall()
+
+    if vendor == 'mysql':
+        plano = linhas[0][0]
+        tabelas = []
+
+        def percorrer(no):
+            if isinstance(no, dict):
+                if no.get('access_type') == 'ALL':
+                    tabelas.append(no.get('table_name', '?'))
+                for valor in no.values():
+                    percorrer(valor)
+            elif isinstance(no, list):
+                for valor in no:
+                    percorrer(valor)
+
+        percorrer(json.loads(plano))
+        return plano, tabelas
+
+    plano = '\n'.join(str(linha[-1]) for linha in linhas)
+    if vendor == 'sqlite':
+        # "SCAN tabela" sem "USING (COVERING) INDEX" é leitura da tabela inteira
+        return plano, re.findall(r'SCAN (\w+)(?!\w| USING)', plano)
+    return plano, re.findall(r'Seq Scan on (\w+)', plano)
+
+
+class Command(BaseCommand):
+    help = 'Falha se alguma consulta frequente for executada com varredura completa da tabela.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--popular', type=int, default=0, metavar='N',
+                            help='Gera N linhas sintéticas por tabela antes de verificar.')
+        parser.add_argument('--verbose', action='store_true',
+                            help='Mostra o plano completo de cada consulta.')
+
+    def handle(self, *args, **options):
+        if options['popular']:
+            self.popular(options['popular'])
+        try:
+            falhas = self.verificar(options['verbose'])
+        finally:
+            if options['popular']:
+                self.limpar()
+
+        if falhas:
+            raise CommandError(
+                f'{len(falhas)} consulta(s) com varredura completa: ' + '; '.join(falhas)
+            )
+        self.stdout.write(self.style.SUCCESS('✅ Todas as consultas frequentes usam índice'))
+
+    def verificar(self, verbose):
+        falhas = []
+        for nome, sql, params in consultas_quentes():
+            plano, tabelas = varreduras_completas(sql, params)
+            if tabelas:
+                falhas.append(f"{nome} ({', '.join(tabelas)})")
+                self.stdout.write(self.style.ERROR(f'❌ {nome}: full scan em {", ".join(tabelas)}'))
+            else:
+                self.stdout.write(f'✅ {nome}')
+            if verbose or tabelas:
+                self.stdout.write(f'   {plano}')
+        return falhas
+
+    def popular(self, quantidade):
+        """Cria dados sintéticos e atualiza as estatísticas do otimizador."""
+        self.stdout.write(f'🌱 Gerando {quantidade} linhas sintéticas por tabela...')
+        agora = timezone.now()
+        Item.objects.bulk_create(
+            [Item(nome=f'{MARCADOR_SEED} {i}', quantidade_estoque=i % 5, disponivel=i % 5 > 0)
+             for i in range(max(quantidade // 100, 10))],
+            batch_size=1000
+        )
+        # O MySQL não devolve as chaves do bulk_create
+        itens = list(Item.objects.filter(nome__startswith=MARCADOR_SEED))
+        Notificacao.objects.bulk_create(
+            [Notificacao(email_cliente=f'c{i}@{MARCADOR_SEED}.local', item=itens[i % len(itens)],
+                         quantidade=1 + i % 3, notificado=i % 4 == 0)
+             for i in range(quantidade)],
+            batch_size=1000
+        )
+        Reserva.objects.bulk_create(
+            [Reserva(email_cliente=f'c{i % 1000}@{MARCADOR_SEED}.local', item=itens[i % len(itens)],
+                     quantidade=1, confirmado=True)
+             for i in range(quantidade)],
+            batch_size=1000
+        )
+        EmailSubscription.objects.bulk_create(
+            [EmailSubscription(email=f'c{i}@{MARCADOR_SEED}.local', subscribed=i % 10 > 0)
+             for i in range(quantidade)],
+            batch_size=1000
+        )
+        EmailOutbox.objects.bulk_create(
+            [EmailOutbox(email=f'c{i}@{MARCADOR_SEED}.local', assunto=MARCADOR_SEED, mensagem='',
+                         status=EmailOutbox.STATUS_ENVIADO if i % 10 else EmailOutbox.STATUS_PENDENTE,
+                         proxima_tentativa=agora)
+             for i in range(quantidade)],
+            batch_size=1000
+        )
+
+        tabelas = [modelo._meta.db_table for modelo in (Item, Notificacao, Reserva, EmailSubscription, EmailOutbox)]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute('ANALYZE TABLE ' + ', '.join(tabelas))
+                cursor.fetchall()
+            elif connection.vendor in ('sqlite', 'postgresql'):
+                for tabela in tabelas:
+                    cursor.execute(f'ANALYZE {tabela}')
+
+    def limpar(self):
+        """Remove os dados sintéticos criados por --popular."""
+        sufixo = f'@{MARCADOR_SEED}.local'
+        EmailOutbox.objects.filter(email__endswith=sufixo).delete()
+        EmailSubscription.objects.filter(email__endswith=sufixo).delete()
+        # Reservas e notificações saem junto com os itens (on_delete=CASCADE)
+        Item.objects.filter(nome__startswith=MARCADOR_SEED).delete()
+        self.stdout.write('🧹 Dados sintéticos removidos')
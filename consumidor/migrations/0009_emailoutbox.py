@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consumidor", "0008_alter_notificacao_unique_together_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EmailOutbox",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("email", models.EmailField(max_length=254)),
+                ("topico", models.CharField(default="EnviaEmail", max_length=256)),
+                ("assunto", models.CharField(max_length=100)),
+                ("mensagem", models.TextField()),
+                ("status", models.CharField(choices=[("pendente", "Pendente"), ("enviado", "Enviado"), ("falhou", "Falhou")], default="pendente", max_length=10)),
+                ("tentativas", models.PositiveIntegerField(default=0)),
+                ("proxima_tentativa", models.DateTimeField(default=django.utils.timezone.now)),
+                ("ultimo_erro", models.TextField(blank=True, default="")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("enviado_em", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["status", "proxima_tentativa"], name="outbox_pendentes_idx")],
+            },
+        ),
+    ]
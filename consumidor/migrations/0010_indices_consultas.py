@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consumidor", "0009_emailoutbox"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="emailsubscription",
+            index=models.Index(fields=["subscribed", "created_at"], name="subscription_status_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="item",
+            index=models.Index(fields=["disponivel"], name="item_disponivel_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notificacao",
+            index=models.Index(fields=["item", "notificado", "data_criacao"], name="notificacao_fila_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reserva",
+            index=models.Index(fields=["email_cliente", "data_reserva"], name="reserva_email_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="reserva",
+            index=models.Index(fields=["data_reserva"], name="reserva_data_idx"),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:37
+
+from django.db import migrations, models
+
+
+def criar_versao_inicial(apps, schema_editor):
+    CatalogoVersao = apps.get_model("consumidor", "CatalogoVersao")
+    CatalogoVersao.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consumidor", "0010_indices_consultas"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CatalogoVersao",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("versao", models.BigIntegerField(default=1)),
+                ("atualizado_em", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(criar_versao_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consumidor", "0011_catalogoversao"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="emailsubscription",
+            name="inscrito_em",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="emailsubscription",
+            name="proxima_tentativa",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="emailsubscription",
+            name="tentativas",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="emailsubscription",
+            name="ultimo_erro",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddIndex(
+            model_name="emailsubscription",
+            index=models.Index(fields=["subscribed", "proxima_tentativa"], name="subscription_fila_idx"),
+        ),
+    ]
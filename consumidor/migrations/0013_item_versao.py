@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consumidor", "0012_emailsubscription_fila"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="versao",
+            field=models.PositiveBigIntegerField(db_default=1, default=1, editable=False),
+        ),
+    ]
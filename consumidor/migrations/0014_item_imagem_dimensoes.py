@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("consumidor", "0013_item_versao"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="item",
+            name="imagem_altura",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="item",
+            name="imagem_largura",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
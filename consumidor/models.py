@@ -1,14 +1,76 @@
 from django.db import models
+from django.utils import timezone
 
 class Item(models.Model):
     nome = models.CharField(max_length=200)
     quantidade_estoque = models.IntegerField(default=0)
     disponivel = models.BooleanField(default=True)
     imagem = models.ImageField(upload_to='produtos/', null=True, blank=True)
+    # Preenchidas por consumidor/imagens.py ao gerar os derivados. Não usa
+    # width_field/height_field: com eles o Django abriria a imagem a cada
+    # Item carregado sem dimensões.
+    imagem_largura = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagem_altura = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    # Incrementada a cada alteração do item: pelo save() aqui e pelo SQL das
+    # Lambdas de venda e entrega. O default no banco cobre os INSERTs das Lambdas.
+    versao = models.PositiveBigIntegerField(default=1, db_default=1, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['disponivel'], name='item_disponivel_idx'),
+        ]
 
     def __str__(self):
         return self.nome
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Nome da imagem gravada, para o save() saber se ela foi trocada
+        if 'imagem' in instancia.__dict__:
+            instancia._imagem_salva = instancia.__dict__['imagem']
+        return instancia
+
+    def save(self, *args, **kwargs):
+        """Grava o item incrementando a versão no próprio UPDATE (sem perder incrementos concorrentes).
+
+        Se a imagem mudou, gera os derivados (consumidor/imagens.py) antes de
+        gravar, para que as dimensões entrem no mesmo INSERT/UPDATE.
+        """
+        update_fields = kwargs.get('update_fields')
+        if 'imagem' in self.__dict__ and (update_fields is None or 'imagem' in update_fields):
+            if self._preparar_imagem() and update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'imagem_largura', 'imagem_altura'}
+        if not self._state.adding:
+            self.versao = models.F('versao') + 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'versao'}
+        super().save(*args, **kwargs)
+        if not isinstance(self.versao, int):
+            # Volta a ser um campo adiado: o valor novo só é lido do banco se
+            # alguém acessar item.versao, sem uma consulta extra a cada save()
+            del self.__dict__['versao']
+        if 'imagem' in self.__dict__:
+            self._imagem_salva = self.imagem.name
+
+    def _preparar_imagem(self):
+        """Gera os derivados se a imagem mudou; True se as dimensões mudaram."""
+        from .imagens import gerar_derivados
+
+        if (self.imagem.name or None) == (getattr(self, '_imagem_salva', None) or None):
+            return False
+        largura = altura = None
+        if self.imagem:
+            if not self.imagem._committed:
+                # Grava o upload agora (o que o pre_save do campo faria) para ler do storage
+                self.imagem.save(self.imagem.name, self.imagem.file, save=False)
+            try:
+                largura, altura = gerar_derivados(self.imagem.name)
+            except Exception as e:
+                print(f"⚠️ Erro ao gerar derivados de {self.imagem.name}: {e}")
+        self.imagem_largura, self.imagem_altura = largura, altura
+        return True
+
 class Reserva(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='reservas')
     nome_cliente = models.CharField(max_length=200, blank=True, null=True)
@@ -17,6 +79,14 @@ class Reserva(models.Model):
     confirmado = models.BooleanField(default=False)
     data_reserva = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Busca por cliente no admin e histórico de reservas do email
+            models.Index(fields=['email_cliente', 'data_reserva'], name='reserva_email_idx'),
+            # date_hierarchy e filtro por data no admin
+            models.Index(fields=['data_reserva'], name='reserva_data_idx'),
+        ]
+
     def __str__(self):
         return f"{self.nome_cliente or self.email_cliente} - {self.item.nome} ({self.quantidade})"
 
@@ -27,6 +97,13 @@ class Notificacao(models.Model):
     notificado = models.BooleanField(default=False)
     data_criacao = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Fila de espera por produto em ordem de chegada (envia_email_interessados)
+            # e contagem de interessados por produto (simulador_vendedor)
+            models.Index(fields=['item', 'notificado', 'data_criacao'], name='notificacao_fila_idx'),
+        ]
+
     def __str__(self):
         return f"{self.email_cliente} - {self.item.nome} ({self.quantidade})"
 
@@ -34,12 +111,79 @@ class Notificacao(models.Model):
 class EmailSubscription(models.Model):
     """
     Rastreia emails inscritos no SNS para notificações
+
+    A homepage só grava a inscrição pendente; o comando `inscrever_emails`
+    chama a Lambda subscribe_email em segundo plano, com novas tentativas e
+    backoff, e marca `subscribed` quando o SNS confirma.
     """
     email = models.EmailField(unique=True)
     subscription_arn = models.CharField(max_length=255, null=True, blank=True)
     subscribed = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    tentativas = models.PositiveIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True, default='')
+    inscrito_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Filtro por status e date_hierarchy no admin
+            models.Index(fields=['subscribed', 'created_at'], name='subscription_status_idx'),
+            # Fila de inscrições pendentes (inscrever_emails)
+            models.Index(fields=['subscribed', 'proxima_tentativa'], name='subscription_fila_idx'),
+        ]
 
     def __str__(self):
         return f"{self.email} - {'Inscrito' if self.subscribed else 'Pendente'}"
 
+
+
+class EmailOutbox(models.Model):
+    """
+    Emails aguardando publicação no SNS (padrão outbox).
+
+    A view grava o email na mesma requisição e o comando `publicar_emails`
+    publica em lotes, com novas tentativas e backoff.
+    """
+    STATUS_PENDENTE = 'pendente'
+    STATUS_ENVIADO = 'enviado'
+    STATUS_FALHOU = 'falhou'
+    STATUS_CHOICES = [
+        (STATUS_PENDENTE, 'Pendente'),
+        (STATUS_ENVIADO, 'Enviado'),
+        (STATUS_FALHOU, 'Falhou'),
+    ]
+
+    email = models.EmailField()
+    topico = models.CharField(max_length=256, default='EnviaEmail')
+    assunto = models.CharField(max_length=100)  # limite do Subject no SNS
+    mensagem = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDENTE)
+    tentativas = models.PositiveIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'proxima_tentativa'], name='outbox_pendentes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.email} - {self.assunto} ({self.status})"
+
+
+class CatalogoVersao(models.Model):
+    """
+    Versão global do catálogo (linha única, id=1).
+
+    Incrementada a cada alteração de estoque: pelos signals de Item no Django
+    e diretamente no MySQL pelas Lambdas de venda e entrega. A página de
+    produtos é cacheada com a versão na chave, então nunca fica desatualizada.
+    """
+    versao = models.BigIntegerField(default=1)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catálogo v{self.versao}"
@@ -0,0 +1,149 @@
+"""
+Outbox de emails do aplicativo Consumidor.
+
+As views apenas gravam o email em `EmailOutbox` (uma única escrita no banco)
+e o worker `python manage.py publicar_emails` publica no SNS em lotes, com
+concorrência limitada, novas tentativas com backoff exponencial e marcação
+das linhas enviadas.
+"""
+
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import EmailOutbox
+from .sns_topic import obter_cliente_sns, resolver_topic_arn, invalidar_topico
+
+# Tempo durante o qual um lote reivindicado fica invisível para outros workers
+LEASE_SEGUNDOS = 120
+BACKOFF_BASE_SEGUNDOS = 5
+BACKOFF_MAX_SEGUNDOS = 15 * 60
+
+
+def enfileirar_email(email, assunto, mensagem, topico='EnviaEmail'):
+    """
+    Grava um email na outbox para publicação assíncrona.
+
+    Returns:
+        EmailOutbox: linha criada (status pendente)
+    """
+    return EmailOutbox.objects.create(
+        email=email,
+        topico=topico,
+        assunto=assunto[:100],
+        mensagem=mensagem,
+    )
+
+
+async def aenfileirar_email(email, assunto, mensagem, topico='EnviaEmail'):
+    """Versão assíncrona de `enfileirar_email`, para as views ASGI."""
+    return await EmailOutbox.objects.acreate(
+        email=email,
+        topico=topico,
+        assunto=assunto[:100],
+        mensagem=mensagem,
+    )
+
+
+def calcular_backoff(tentativas):
+    """Atraso até a próxima tentativa: exponencial com jitter, limitado a BACKOFF_MAX_SEGUNDOS."""
+    atraso = min(BACKOFF_BASE_SEGUNDOS * (2 ** max(tentativas - 1, 0)), BACKOFF_MAX_SEGUNDOS)
+    return timedelta(seconds=atraso * random.uniform(0.8, 1.2))
+
+
+def reivindicar_lote(tamanho):
+    """
+    Reserva até `tamanho` emails pendentes para este worker.
+
+    As linhas são travadas com SKIP LOCKED (no MySQL) e têm a próxima
+    tentativa empurrada por LEASE_SEGUNDOS, então outros workers não as
+    pegam enquanto o lote é publicado. Se o worker morrer, o lease expira e
+    os emails voltam para a fila.
+    """
+    agora = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=EmailOutbox.STATUS_PENDENTE, proxima_tentativa__lte=agora)
+            .order_by('proxima_tentativa', 'id')
+            .values_list('id', flat=True)[:tamanho]
+        )
+        if not ids:
+            return []
+        EmailOutbox.objects.filter(id__in=ids).update(
+            proxima_tentativa=agora + timedelta(seconds=LEASE_SEGUNDOS)
+        )
+    return list(EmailOutbox.objects.filter(id__in=ids).order_by('id'))
+
+
+def publicar_email(registro):
+    """Publica um registro da outbox no SNS. Levanta exceção em caso de falha."""
+    sns = obter_cliente_sns()
+    try:
+        return sns.publish(
+            TopicArn=resolver_topic_arn(registro.topico, sns),
+            Message=registro.mensagem,
+            Subject=registro.assunto
+        )
+    except Exception:
+        invalidar_topico(registro.topico)
+        raise
+
+
+def publicar_lote(tamanho=50, concorrencia=8, max_tentativas=5):
+    """
+    Reivindica e publica um lote de emails pendentes.
+
+    Returns:
+        dict: contagem de enviados, reagendados e falhas definitivas no lote
+    """
+    registros = reivindicar_lote(tamanho)
+    resultado = {'enviados': 0, 'reagendados': 0, 'falhas': 0}
+    if not registros:
+        return resultado
+
+    def tentar(registro):
+        try:
+            publicar_email(registro)
+            return registro, None
+        except Exception as e:
+            return registro, e
+
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        resultados = list(executor.map(tentar, registros))
+
+    agora = timezone.now()
+    enviados = [registro.id for registro, erro in resultados if erro is None]
+    if enviados:
+        EmailOutbox.objects.filter(id__in=enviados).update(
+            status=EmailOutbox.STATUS_ENVIADO,
+            enviado_em=agora,
+            tentativas=F('tentativas') + 1,
+            ultimo_erro=''
+        )
+        resultado['enviados'] = len(enviados)
+
+    for registro, erro in resultados:
+        if erro is None:
+            continue
+        tentativas = registro.tentativas + 1
+        print(f"❌ Erro ao publicar email {registro.id} para {registro.email}: {erro}")
+        if tentativas >= max_tentativas:
+            status = EmailOutbox.STATUS_FALHOU
+            resultado['falhas'] += 1
+        else:
+            status = EmailOutbox.STATUS_PENDENTE
+            resultado['reagendados'] += 1
+        EmailOutbox.objects.filter(id=registro.id).update(
+            status=status,
+            tentativas=tentativas,
+            proxima_tentativa=agora + calcular_backoff(tentativas),
+            ultimo_erro=str(erro)
+        )
+
+    return resultado
@@ -0,0 +1,97 @@
+"""
+Sessão do comprador, separada da sessão do admin.
+
+O fluxo do cliente só guarda o email informado na homepage e o carrinho, então
+não precisa da sessão no banco: com a sessão padrão do Django cada página do
+catálogo lê a tabela django_session, e cada login ou alteração do carrinho
+grava nela. Este middleware coloca em `request.sessao_cliente` uma sessão com
+cookie próprio, cujo armazenamento é escolhido por CUSTOMER_SESSION_MODE:
+
+    cookie  cookie assinado (HMAC com a SECRET_KEY); adulterações são descartadas
+    cache   cache do Django (LocMem por processo, ou Redis com REDIS_URL)
+    db      tabela django_session, como antes
+
+`request.session` continua com o SESSION_ENGINE do projeto (banco), usado
+pelo admin e pela autenticação dos administradores.
+"""
+
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date
+
+ENGINES = {
+    'cookie': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'db': 'django.contrib.sessions.backends.db',
+}
+
+
+def engine_cliente(modo=None):
+    """Retorna o módulo de sessão do Django para o modo configurado."""
+    modo = modo or settings.CUSTOMER_SESSION_MODE
+    if modo not in ENGINES:
+        raise ImproperlyConfigured(
+            f"CUSTOMER_SESSION_MODE inválido: {modo!r} (use {', '.join(ENGINES)})"
+        )
+    return import_module(ENGINES[modo])
+
+
+class SessaoClienteMiddleware(MiddlewareMixin):
+    """
+    Disponibiliza `request.sessao_cliente` e mantém o seu cookie.
+
+    Mesma lógica do SessionMiddleware do Django, com outro cookie
+    (CUSTOMER_SESSION_COOKIE_NAME) para não conflitar com a sessão do admin.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.SessionStore = engine_cliente().SessionStore
+
+    def process_request(self, request):
+        chave = request.COOKIES.get(settings.CUSTOMER_SESSION_COOKIE_NAME)
+        request.sessao_cliente = self.SessionStore(chave)
+
+    def process_response(self, request, response):
+        sessao = getattr(request, 'sessao_cliente', None)
+        if sessao is None:
+            return response
+
+        nome_cookie = settings.CUSTOMER_SESSION_COOKIE_NAME
+        if sessao.accessed:
+            patch_vary_headers(response, ('Cookie',))
+
+        if nome_cookie in request.COOKIES and sessao.is_empty():
+            # Sessão esvaziada, expirada ou com assinatura inválida
+            response.delete_cookie(
+                nome_cookie,
+                path=settings.SESSION_COOKIE_PATH,
+                domain=settings.SESSION_COOKIE_DOMAIN,
+                samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+
+        if not sessao.modified or sessao.is_empty() or response.status_code >= 500:
+            return response
+
+        sessao.save()
+        max_age = sessao.get_expiry_age()
+        response.set_cookie(
+            nome_cookie,
+            sessao.session_key,
+            max_age=max_age,
+            expires=http_date(time.time() + max_age),
+            domain=settings.SESSION_COOKIE_DOMAIN,
+            path=settings.SESSION_COOKIE_PATH,
+            secure=settings.SESSION_COOKIE_SECURE or None,
+            httponly=settings.SESSION_COOKIE_HTTPONLY or None,
+            samesite=settings.SESSION_COOKIE_SAMESITE,
+        )
+        patch_vary_headers(response, ('Cookie',))
+        return response
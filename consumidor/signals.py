@@ -0,0 +1,37 @@
+"""
+Signals do aplicativo Consumidor.
+
+Alterações de Item feitas pelo ORM (admin, shell, views) incrementam a versão
+do catálogo. Alterações feitas pelas Lambdas direto no MySQL incrementam a
+versão no próprio SQL delas.
+
+Alterações de EmailSubscription mantêm o cache de inscritos do processo.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalogo import incrementar_versao
+from .inscricoes import inscritos
+from .models import EmailSubscription, Item
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def item_alterado(sender, **kwargs):
+    """Invalida o cache do catálogo quando um item é criado, alterado ou removido."""
+    incrementar_versao()
+
+
+@receiver(post_save, sender=EmailSubscription)
+def inscricao_salva(sender, instance, **kwargs):
+    """Coloca no cache de inscritos os emails confirmados no SNS."""
+    if instance.subscribed:
+        inscritos.adicionar(instance.email)
+    else:
+        inscritos.remover(instance.email)
+
+
+@receiver(post_delete, sender=EmailSubscription)
+def inscricao_removida(sender, instance, **kwargs):
+    inscritos.remover(instance.email)
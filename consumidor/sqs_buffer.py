@@ -0,0 +1,216 @@
+"""
+Buffer de envio em lote para o SQS.
+
+Em vez de um `send_message` por email inscrito, as mensagens são acumuladas
+em memória e enviadas com `send_message_batch` (até 10 por chamada) quando o
+lote enche ou quando SQS_BATCH_INTERVALO segundos se passam desde a primeira
+mensagem pendente. A fila em memória é limitada, entradas recusadas pelo SQS
+são reenviadas individualmente e o buffer é esvaziado quando o processo termina.
+Enquanto os envios falham, a thread espera entre um lote e outro com backoff
+exponencial, em vez de reenviar na hora para um SQS que está recusando tudo.
+
+Há um buffer por fila (queue_url) em cada processo.
+
+Configuração por variáveis de ambiente:
+    SQS_BATCH_MAX_PENDENTES  mensagens aguardando envio (padrão 1000)
+    SQS_BATCH_INTERVALO      espera máxima de uma mensagem no buffer (padrão 0.5 s)
+    SQS_BATCH_BACKOFF        espera após o primeiro envio com falha (padrão 0.5 s),
+                             dobrando a cada falha seguida até BACKOFF_MAX
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+
+import boto3
+
+TAMANHO_MAX_LOTE = 10  # limite do send_message_batch
+
+MAX_PENDENTES = int(os.getenv('SQS_BATCH_MAX_PENDENTES', '1000'))
+INTERVALO = float(os.getenv('SQS_BATCH_INTERVALO', '0.5'))
+BACKOFF_BASE = float(os.getenv('SQS_BATCH_BACKOFF', '0.5'))
+BACKOFF_MAX = 30.0
+
+
+class BufferSQS:
+    """
+    Acumula mensagens para uma fila SQS e as envia em lotes numa thread de fundo.
+    """
+
+    def __init__(self, queue_url, cliente, max_pendentes=MAX_PENDENTES,
+                 intervalo=INTERVALO, max_tentativas=3, backoff=BACKOFF_BASE):
+        self.queue_url = queue_url
+        self.cliente = cliente
+        self.intervalo = intervalo
+        self.max_tentativas = max_tentativas
+        self.backoff = backoff
+        # Envios seguidos sem nenhuma mensagem aceita (zera no primeiro sucesso)
+        self.falhas_seguidas = 0
+        self._fila = queue.Queue(maxsize=max_pendentes)
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self.estatisticas = {
+            'enfileiradas': 0,
+            'recusadas_buffer_cheio': 0,
+            'enviadas': 0,
+            'chamadas_batch': 0,
+            'reenvios': 0,
+            'descartadas': 0,
+            'esperas_backoff': 0,
+        }
+        self._thread = threading.Thread(target=self._executar, name='sqs-buffer', daemon=True)
+        self._thread.start()
+
+    def _contar(self, chave, valor=1):
+        with self._lock:
+            self.estatisticas[chave] += valor
+
+    def enviar(self, corpo):
+        """
+        Coloca uma mensagem no buffer sem bloquear.
+
+        Returns:
+            bool: False se o buffer estiver cheio (a mensagem não foi aceita)
+        """
+        try:
+            self._fila.put_nowait((corpo, 0))
+        except queue.Full:
+            self._contar('recusadas_buffer_cheio')
+            return False
+        self._contar('enfileiradas')
+        return True
+
+    def _proximo_lote(self):
+        """Espera a primeira mensagem e junta as seguintes até encher o lote ou o prazo vencer."""
+        try:
+            lote = [self._fila.get(timeout=self.intervalo)]
+        except queue.Empty:
+            return []
+        prazo = time.monotonic() + self.intervalo
+        while len(lote) < TAMANHO_MAX_LOTE:
+            restante = prazo - time.monotonic()
+            try:
+                lote.append(self._fila.get(timeout=restante) if restante > 0 else self._fila.get_nowait())
+            except queue.Empty:
+                break
+        return lote
+
+    def _enviar_lote(self, lote):
+        entradas = [
+            {'Id': str(i), 'MessageBody': corpo}
+            for i, (corpo, _) in enumerate(lote)
+        ]
+        self._contar('chamadas_batch')
+        try:
+            response = self.cliente.send_message_batch(QueueUrl=self.queue_url, Entries=entradas)
+        except Exception as e:
+            print(f"❌ Erro ao enviar lote para SQS: {e}")
+            self.falhas_seguidas += 1
+            self._reenfileirar(lote)
+            return
+
+        enviadas = len(response.get('Successful', []))
+        self._contar('enviadas', enviadas)
+        self.falhas_seguidas = 0 if enviadas else self.falhas_seguidas + 1
+        falhas = response.get('Failed', [])
+        if falhas:
+            print(f"⚠️ {len(falhas)} mensagens recusadas pelo SQS no lote: {falhas}")
+            # Falhas do remetente (mensagem inválida) não adiantam ser reenviadas
+            reenviar = [lote[int(f['Id'])] for f in falhas if not f.get('SenderFault')]
+            self._contar('descartadas', len(falhas) - len(reenviar))
+            self._reenfileirar(reenviar)
+
+    def _reenfileirar(self, lote):
+        for corpo, tentativas in lote:
+            if tentativas + 1 >= self.max_tentativas:
+                print(f"❌ Mensagem descartada após {tentativas + 1} tentativas: {corpo}")
+                self._contar('descartadas')
+                continue
+            try:
+                self._fila.put_nowait((corpo, tentativas + 1))
+                self._contar('reenvios')
+            except queue.Full:
+                self._contar('descartadas')
+
+    def espera_backoff(self):
+        """Espera antes do próximo lote, em segundos (0 se o último envio deu certo)."""
+        if not self.falhas_seguidas:
+            return 0
+        return min(self.backoff * 2 ** (self.falhas_seguidas - 1), BACKOFF_MAX)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            lote = self._proximo_lote()
+            if lote:
+                self._enviar_lote(lote)
+                espera = self.espera_backoff()
+                if espera:
+                    self._contar('esperas_backoff')
+                    # Interrompida pelo fechar(), que esvazia o buffer em seguida
+                    self._parar.wait(espera)
+
+    def flush(self):
+        """Envia imediatamente tudo o que está no buffer (na thread de quem chamou)."""
+        while True:
+            lote = []
+            while len(lote) < TAMANHO_MAX_LOTE:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            if not lote:
+                return
+            self._enviar_lote(lote)
+
+    def fechar(self):
+        """Para a thread de fundo e esvazia o buffer."""
+        self._parar.set()
+        # Espera o lote em andamento (coleta + envio) antes de esvaziar o resto
+        self._thread.join(timeout=self.intervalo * 2 + 10)
+        self.flush()
+
+    def pendentes(self):
+        return self._fila.qsize()
+
+
+# queue_url -> buffer deste processo
+_buffers = {}
+_buffers_pid = None
+_buffers_lock = threading.Lock()
+
+
+def obter_buffer(queue_url, region_name):
+    """
+    Retorna o buffer SQS do processo para a fila, criando-o na primeira chamada.
+
+    Após um fork, novos buffers (e novas threads de envio) são criados.
+    """
+    global _buffers_pid
+    pid = os.getpid()
+    buffer = _buffers.get(queue_url) if _buffers_pid == pid else None
+    if buffer is None:
+        with _buffers_lock:
+            if _buffers_pid != pid:
+                _buffers.clear()
+                _buffers_pid = pid
+            buffer = _buffers.get(queue_url)
+            if buffer is None:
+                cliente = boto3.client('sqs', region_name=region_name)
+                buffer = _buffers[queue_url] = BufferSQS(queue_url, cliente)
+                atexit.register(buffer.fechar)
+    return buffer
+
+
+def estatisticas_buffer():
+    """Contadores dos buffers do processo atual, por fila (vazio se nunca foram usados)."""
+    if _buffers_pid != os.getpid():
+        return {}
+    resultado = {}
+    for queue_url, buffer in list(_buffers.items()):
+        with buffer._lock:
+            dados = dict(buffer.estatisticas)
+        dados['pendentes'] = buffer.pendentes()
+        resultado[queue_url] = dados
+    return resultado
@@ -0,0 +1,47 @@
+"""
+Template tags das imagens dos quitutes.
+
+Uso:
+    {% load imagens %}
+    {% imagem_responsiva item sizes="(min-width: 768px) 50vw, 100vw" classe="w-full h-48 object-cover" %}
+"""
+
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from ..imagens import larguras_derivadas, nome_derivado, srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def imagem_responsiva(item, sizes='100vw', classe='', carregamento='lazy'):
+    """
+    Renderiza a imagem do item como <picture> com srcset em WebP e JPEG.
+
+    O navegador escolhe o menor derivado que atende à largura de `sizes`.
+    Itens cujos derivados ainda não foram gerados (sem `imagem_largura`)
+    usam a imagem original. Use carregamento="eager" para imagens que
+    aparecem logo no topo da página.
+    """
+    if not item.imagem:
+        return ''
+    if not item.imagem_largura:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            item.imagem.url, item.nome, classe, carregamento,
+        )
+
+    nome = item.imagem.name
+    larguras = larguras_derivadas(item.imagem_largura)
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        srcset(nome, item.imagem_largura, 'webp'), sizes,
+        default_storage.url(nome_derivado(nome, larguras[len(larguras) // 2], 'jpg')),
+        srcset(nome, item.imagem_largura, 'jpg'), sizes,
+        item.imagem_largura, item.imagem_altura, item.nome, classe, carregamento,
+    )
@@ -1,3 +1,1517 @@
-from django.test import TestCase
+import gzip
+import importlib.util
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import warnings
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.client import HTTPConnection
+from http.server import ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+from asgiref.sync import async_to_sync
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import Http404
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, re_path, reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from quitute_nas_nuvens.arquivos import nomes_com_hash, servir_estatico, servir_media
+from quitute_nas_nuvens.views import AsyncHomepageView, AsyncSubscribeView
+
+from .estoque_ao_vivo import MonitorEstoque
+from .imagens import nome_derivado
+from .inscricoes import estatisticas_fila, inscritos, processar_lote
+from .catalogo import versao_catalogo
+from .management.commands.verificar_planos import varreduras_completas
+from .models import EmailOutbox, EmailSubscription, Item, Reserva
+from .outbox import enfileirar_email, publicar_lote
+from .sessao_cliente import engine_cliente
+from .views import AsyncItemReserveView
+from . import http_pool, sns_topic, sqs_buffer
+from .loadgen import EscolhaZipf, Metricas, percentil
+from .sqs_buffer import BufferSQS
+from . import vendas
+from .vendas import BackendFailover, CircuitoLatencia
+
+
+class QueryCountTestCase(TestCase):
+    """
+    Base dos testes que fixam o número de queries de cada view.
+
+    Um aumento no número de queries é uma regressão de desempenho: se a
+    mudança for intencional, ajuste o número esperado no teste.
+    """
+
+    email = 'cliente@example.com'
+
+    def setUp(self):
+        cache.clear()
+        inscritos.limpar()
+        inscritos.aquecer()
+        # Backends de venda novos: o disjuntor não herda falhas de outros testes
+        instancias = mock.patch.dict(vendas._instancias, clear=True)
+        instancias.start()
+        self.addCleanup(instancias.stop)
+        self.item = Item.objects.create(nome='Bolo de cenoura', quantidade_estoque=5)
+        self.outro = Item.objects.create(nome='Pão de queijo', quantidade_estoque=10)
+        self.entrar(self.email)
+
+    def entrar(self, email):
+        """Grava o email na sessão do comprador, como a homepage faz."""
+        sessao = engine_cliente().SessionStore()
+        sessao['customer_email'] = email
+        sessao.save()
+        self.client.cookies[settings.CUSTOMER_SESSION_COOKIE_NAME] = sessao.session_key
+
+
+class HomepageQueryCountTests(QueryCountTestCase):
+
+    def test_get(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('homepage'))
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_post_email_novo(self, subscribe):
+        # Só grava a inscrição pendente; a Lambda fica para o worker
+        with self.assertNumQueries(4):
+            response = self.client.post(reverse('homepage'), {'email': 'novo@example.com'})
+        self.assertRedirects(response, reverse('item_list'), fetch_redirect_response=False)
+        self.assertFalse(EmailSubscription.objects.get(email='novo@example.com').subscribed)
+        subscribe.assert_not_called()
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_post_email_ja_inscrito(self, subscribe):
+        EmailSubscription.objects.create(email=self.email, subscribed=True)
+        with self.assertNumQueries(0):
+            self.client.post(reverse('homepage'), {'email': self.email})
+        subscribe.assert_not_called()
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_post_email_inscrito_fora_do_cache(self, subscribe):
+        # Inscrito por outro processo: cai no banco uma vez e entra no cache
+        EmailSubscription.objects.create(email=self.email, subscribed=True)
+        inscritos.limpar()
+        inscritos.aquecido = True
+        with self.assertNumQueries(1):
+            self.client.post(reverse('homepage'), {'email': self.email})
+        with self.assertNumQueries(0):
+            self.client.post(reverse('homepage'), {'email': self.email})
+        subscribe.assert_not_called()
+
+
+class CatalogoQueryCountTests(QueryCountTestCase):
+
+    def test_lista_sem_cache(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('item_list'))
+        self.assertContains(response, 'Bolo de cenoura')
+
+    def test_lista_com_cache(self):
+        self.client.get(reverse('item_list'))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('item_list'))
+        self.assertContains(response, 'Bolo de cenoura')
+
+    def test_lista_invalida_cache_quando_estoque_muda(self):
+        self.client.get(reverse('item_list'))
+        self.item.quantidade_estoque = 0
+        self.item.save()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('item_list'))
+        self.assertContains(response, 'Esgotado')
+
+    def test_detalhe(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('item_detail', args=[self.item.pk]))
+        self.assertContains(response, 'Bolo de cenoura')
+        # Formulário e aviso de esgotado vão juntos, para o estoque ao vivo alternar sem reload
+        self.assertContains(response, f'data-estoque-com-estoque="{self.item.pk}">')
+        self.assertContains(response, f'data-estoque-esgotado="{self.item.pk}" hidden>')
+
+
+class ReservaQueryCountTests(QueryCountTestCase):
+
+    @mock.patch('consumidor.vendas.processar_venda')
+    def test_reserva_confirmada(self, processar_venda):
+        processar_venda.return_value = {
+            'success': True,
+            'message': 'Venda processada com sucesso!',
+            'produto': 'Bolo de cenoura',
+            'quantidade_vendida': 2,
+            'estoque_restante': 3,
+            'disponivel': True,
+        }
+        # Só a gravação do email na outbox: o item não é lido do banco e o
+        # email do cliente vem do cookie assinado
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse('item_reserve', args=[self.item.pk]),
+                {'nome_cliente': 'Ana', 'quantidade': 2}
+            )
+        self.assertContains(response, 'Bolo de cenoura')
+        processar_venda.assert_called_once_with(self.item.pk, 2, self.email)
+        self.assertEqual(EmailOutbox.objects.get().email, self.email)
+
+    @mock.patch('consumidor.vendas.processar_venda')
+    def test_reserva_recusada(self, processar_venda):
+        processar_venda.return_value = {
+            'success': False,
+            'message': 'Estoque insuficiente. Apenas 5 unidades disponíveis.',
+            'produto': 'Bolo de cenoura',
+        }
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                reverse('item_reserve', args=[self.item.pk]),
+                {'nome_cliente': 'Ana', 'quantidade': 50}
+            )
+        self.assertContains(response, 'Estoque insuficiente')
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    @mock.patch('consumidor.vendas.processar_venda')
+    def test_quantidade_invalida(self, processar_venda):
+        for quantidade in ('abc', '', '0', '-2', '1.5'):
+            with self.assertNumQueries(0):
+                response = self.client.post(
+                    reverse('item_reserve', args=[self.item.pk]),
+                    {'nome_cliente': 'Ana', 'quantidade': quantidade}
+                )
+            self.assertContains(response, 'Informe uma quantidade válida', status_code=400)
+        processar_venda.assert_not_called()
+
+
+# URLs dos testes pelo cliente ASGI: as views assíncronas (ASYNC_VIEWS=true)
+# e a rota de produção das mídias, além das rotas normais do app
+urlpatterns = [
+    path('', AsyncHomepageView.as_view(), name='homepage'),
+    path('subscribe/', AsyncSubscribeView.as_view(), name='subscribe'),
+    path('quitutes/<int:pk>/reserve/', AsyncItemReserveView.as_view(), name='item_reserve'),
+    path('quitutes/', include('consumidor.urls')),
+    re_path(r'^media/(?P<caminho>.*)$', servir_media),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class ViewsAssincronasQueryCountTests(QueryCountTestCase):
+    """
+    Views de ASYNC_VIEWS=true pelo cliente ASGI.
+
+    O cliente roda com async_to_sync: assim o assertNumQueries fica na thread
+    do teste, a mesma em que o sync_to_async das views executa as queries.
+    """
+
+    def setUp(self):
+        super().setUp()
+        nome = settings.CUSTOMER_SESSION_COOKIE_NAME
+        self.async_client.cookies[nome] = self.client.cookies[nome].value
+
+    def pedir(self, metodo, *args, **kwargs):
+        return async_to_sync(getattr(self.async_client, metodo))(*args, **kwargs)
+
+    def test_homepage_get(self):
+        with self.assertNumQueries(0):
+            response = self.pedir('get', reverse('homepage'))
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_homepage_post_email_novo(self, subscribe):
+        with self.assertNumQueries(4):
+            response = self.pedir('post', reverse('homepage'), {'email': 'novo@example.com'})
+        self.assertRedirects(response, reverse('item_list'), fetch_redirect_response=False)
+        self.assertFalse(EmailSubscription.objects.get(email='novo@example.com').subscribed)
+        subscribe.assert_not_called()
+
+    def test_subscribe_email_ja_inscrito(self):
+        EmailSubscription.objects.create(email=self.email, subscribed=True)
+        with self.assertNumQueries(0):
+            response = self.pedir('get', reverse('subscribe'), {'email': self.email})
+        self.assertRedirects(response, reverse('item_list'), fetch_redirect_response=False)
+
+    @mock.patch('consumidor.vendas.processar_venda_async', new_callable=mock.AsyncMock)
+    def test_reserva_confirmada(self, processar_venda_async):
+        processar_venda_async.return_value = {
+            'success': True,
+            'message': 'Venda processada com sucesso!',
+            'produto': 'Bolo de cenoura',
+            'quantidade_vendida': 2,
+            'estoque_restante': 3,
+            'disponivel': True,
+        }
+        with self.assertNumQueries(1):
+            response = self.pedir(
+                'post', reverse('item_reserve', args=[self.item.pk]),
+                {'nome_cliente': 'Ana', 'quantidade': 2}
+            )
+        self.assertContains(response, 'Bolo de cenoura')
+        processar_venda_async.assert_awaited_once_with(self.item.pk, 2, self.email)
+        self.assertEqual(EmailOutbox.objects.get().email, self.email)
+
+    @mock.patch('consumidor.vendas.processar_venda_async', new_callable=mock.AsyncMock)
+    def test_reserva_quantidade_invalida(self, processar_venda_async):
+        response = self.pedir(
+            'post', reverse('item_reserve', args=[self.item.pk]),
+            {'nome_cliente': 'Ana', 'quantidade': 'abc'}
+        )
+        self.assertContains(response, 'Informe uma quantidade válida', status_code=400)
+        processar_venda_async.assert_not_awaited()
+
+
+class CarrinhoQueryCountTests(QueryCountTestCase):
+
+    def adicionar(self, item, quantidade=1):
+        self.client.post(reverse('carrinho_adicionar', args=[item.pk]), {'quantidade': quantidade})
+
+    def test_adicionar(self):
+        with self.assertNumQueries(0):
+            self.adicionar(self.item, 2)
+
+    def test_adicionar_quantidade_invalida(self):
+        response = self.client.post(reverse('carrinho_adicionar', args=[self.item.pk]), {'quantidade': 'dois'})
+        self.assertContains(response, 'Informe uma quantidade válida', status_code=400)
+        response = self.client.get(reverse('carrinho'))
+        self.assertNotContains(response, 'Bolo de cenoura')
+
+    def test_carrinho(self):
+        self.adicionar(self.item)
+        self.adicionar(self.outro)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('carrinho'))
+        self.assertContains(response, 'Pão de queijo')
+
+    @mock.patch('consumidor.vendas.processar_checkout')
+    def test_checkout(self, processar_checkout):
+        self.adicionar(self.item)
+        self.adicionar(self.outro, 3)
+        processar_checkout.return_value = {
+            'success': True,
+            'message': 'Pedido processado com sucesso!',
+            'itens': [
+                {'produto_id': self.item.pk, 'produto': 'Bolo de cenoura', 'quantidade_vendida': 1,
+                 'estoque_restante': 4, 'disponivel': True},
+                {'produto_id': self.outro.pk, 'produto': 'Pão de queijo', 'quantidade_vendida': 3,
+                 'estoque_restante': 7, 'disponivel': True},
+            ],
+        }
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('checkout'), {'nome_cliente': 'Ana'})
+        self.assertContains(response, 'Pão de queijo')
+        self.assertEqual(EmailOutbox.objects.count(), 1)
+
+
+class AdministracaoQueryCountTests(QueryCountTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+
+    def test_metricas(self):
+        self.client.force_login(self.admin)
+        # Sessão + usuário do admin, mais a fila de inscrições
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('metricas'))
+        self.assertEqual(response.status_code, 200)
+
+    @mock.patch('consumidor.views.entregar_produtos')
+    def test_entregar_produtos(self, entregar_produtos):
+        entregar_produtos.return_value = {
+            'success': True,
+            'message': 'Produtos entregues',
+            'produtos_inseridos': 1,
+            'produtos_atualizados': 2,
+            'total_produtos': 3,
+        }
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('entregar_produtos'))
+        self.assertContains(response, 'Produtos entregues')
+
+
+@mock.patch('consumidor.outbox.invalidar_topico')
+@mock.patch('consumidor.outbox.resolver_topic_arn', return_value='arn:aws:sns:us-east-1:0:EnviaEmail')
+@mock.patch('consumidor.outbox.obter_cliente_sns')
+class OutboxTests(TestCase):
+
+    def setUp(self):
+        self.email = enfileirar_email('ana@example.com', 'Reserva confirmada', 'Olá, Ana')
+
+    def test_publica_e_marca_enviado(self, obter_cliente_sns, resolver, invalidar):
+        enfileirar_email('bia@example.com', 'Reserva confirmada', 'Olá, Bia')
+        sns = obter_cliente_sns.return_value
+        sns.publish.return_value = {'MessageId': 'm1'}
+        self.assertEqual(publicar_lote(), {'enviados': 2, 'reagendados': 0, 'falhas': 0})
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_ENVIADO, tentativas=1).count(), 2)
+        mensagens = sorted(chamada.kwargs['Message'] for chamada in sns.publish.call_args_list)
+        self.assertEqual(mensagens, ['Olá, Ana', 'Olá, Bia'])
+        invalidar.assert_not_called()
+
+    def test_falha_temporaria_reagenda_com_backoff(self, obter_cliente_sns, resolver, invalidar):
+        obter_cliente_sns.return_value.publish.side_effect = Exception('Throttling')
+        self.assertEqual(publicar_lote(), {'enviados': 0, 'reagendados': 1, 'falhas': 0})
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.tentativas), (EmailOutbox.STATUS_PENDENTE, 1))
+        self.assertEqual(self.email.ultimo_erro, 'Throttling')
+        self.assertGreater(self.email.proxima_tentativa, timezone.now())
+        # O tópico pode ter sido recriado: o ARN é resolvido de novo na próxima tentativa
+        invalidar.assert_called_once_with('EnviaEmail')
+        # Ainda no backoff: o próximo lote não pega o email
+        self.assertEqual(publicar_lote(), {'enviados': 0, 'reagendados': 0, 'falhas': 0})
+
+    def test_desiste_apos_max_tentativas(self, obter_cliente_sns, resolver, invalidar):
+        EmailOutbox.objects.filter(pk=self.email.pk).update(tentativas=4)
+        obter_cliente_sns.return_value.publish.side_effect = Exception('InvalidParameter')
+        self.assertEqual(publicar_lote(max_tentativas=5), {'enviados': 0, 'reagendados': 0, 'falhas': 1})
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.tentativas), (EmailOutbox.STATUS_FALHOU, 5))
+
+
+class FilaInscricoesTests(TestCase):
+
+    def setUp(self):
+        self.pendente = EmailSubscription.objects.create(email='fila@example.com')
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_worker_inscreve_pendentes(self, subscribe):
+        subscribe.return_value = {'success': True, 'subscription_arn': 'arn:teste'}
+        self.assertEqual(processar_lote(), {'inscritos': 1, 'enviados': 0, 'reagendados': 0})
+        self.pendente.refresh_from_db()
+        self.assertTrue(self.pendente.subscribed)
+        self.assertEqual(self.pendente.subscription_arn, 'arn:teste')
+        self.assertIsNotNone(self.pendente.inscrito_em)
+        self.assertEqual(estatisticas_fila()['pendentes'], 0)
+        self.assertEqual(estatisticas_fila()['amostra_lag'], 1)
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_falha_reagenda_com_backoff(self, subscribe):
+        subscribe.return_value = {'success': False, 'message': 'Timeout na chamada da Lambda'}
+        self.assertEqual(processar_lote(), {'inscritos': 0, 'enviados': 0, 'reagendados': 1})
+        self.pendente.refresh_from_db()
+        self.assertFalse(self.pendente.subscribed)
+        self.assertEqual(self.pendente.tentativas, 1)
+        self.assertEqual(self.pendente.ultimo_erro, 'Timeout na chamada da Lambda')
+        # Ainda no backoff: o próximo lote não pega a inscrição
+        self.assertEqual(processar_lote(), {'inscritos': 0, 'enviados': 0, 'reagendados': 0})
+        self.assertEqual(estatisticas_fila()['pendentes'], 1)
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_envio_pelo_sqs_aguarda_a_lambda(self, subscribe):
+        subscribe.return_value = {'success': True, 'aguardando_lambda': True}
+        self.assertEqual(processar_lote(), {'inscritos': 0, 'enviados': 1, 'reagendados': 0})
+        self.pendente.refresh_from_db()
+        self.assertFalse(self.pendente.subscribed)
+        self.assertGreater(self.pendente.proxima_tentativa, timezone.now())
+        # A Lambda grava a inscrição antes do prazo: nada a reenviar
+        EmailSubscription.objects.filter(pk=self.pendente.pk).update(subscribed=True, subscription_arn='arn:lambda')
+        self.assertEqual(processar_lote(), {'inscritos': 0, 'enviados': 0, 'reagendados': 0})
+        self.pendente.refresh_from_db()
+        self.assertEqual(self.pendente.subscription_arn, 'arn:lambda')
+
+    @mock.patch('consumidor.inscricoes.subscribe_email_to_sns')
+    def test_sucesso_sem_arn_nao_apaga_o_existente(self, subscribe):
+        EmailSubscription.objects.filter(pk=self.pendente.pk).update(subscription_arn='arn:anterior')
+        subscribe.return_value = {'success': True}
+        processar_lote()
+        self.pendente.refresh_from_db()
+        self.assertTrue(self.pendente.subscribed)
+        self.assertEqual(self.pendente.subscription_arn, 'arn:anterior')
+
+
+@override_settings(VENDAS_BACKEND='orm')
+class VerificarPlanosTests(TestCase):
+
+    def test_varreduras_completas_no_sqlite(self):
+        plano, tabelas = varreduras_completas('SELECT id FROM consumidor_item WHERE nome = %s', ['Bolo'])
+        self.assertEqual(tabelas, ['consumidor_item'], plano)
+        # Varredura de índice não conta, nem com o nome da tabela cortado no meio
+        plano, tabelas = varreduras_completas(
+            'SELECT id FROM consumidor_reserva ORDER BY data_reserva', []
+        )
+        self.assertIn('USING', plano)
+        self.assertEqual(tabelas, [], plano)
+        plano, tabelas = varreduras_completas(
+            'SELECT id, subscribed FROM consumidor_emailsubscription WHERE email = %s', ['a@example.com']
+        )
+        self.assertEqual(tabelas, [], plano)
+
+    def test_consultas_frequentes_usam_indice(self):
+        saida = StringIO()
+        call_command('verificar_planos', stdout=saida)
+        self.assertIn('Todas as consultas frequentes usam índice', saida.getvalue())
+
+
+class VendasBancoTests(QueryCountTestCase):
+
+    def test_reserva_pelo_banco(self):
+        versao = versao_catalogo()
+        # Trava e lê o item, baixa o estoque, grava a reserva, incrementa o
+        # catálogo e coloca os dois emails (retirada e confirmação) na outbox
+        with self.assertNumQueries(8):
+            response = self.client.post(
+                reverse('item_reserve', args=[self.item.pk]),
+                {'nome_cliente': 'Ana', 'quantidade': 2}
+            )
+        self.assertContains(response, 'Bolo de cenoura')
+        self.item.refresh_from_db()
+        self.assertEqual((self.item.quantidade_estoque, self.item.versao), (3, 2))
+        self.assertEqual(Reserva.objects.get().quantidade, 2)
+        self.assertEqual(EmailOutbox.objects.count(), 2)
+        self.assertEqual(versao_catalogo(), versao + 1)
+
+    def test_estoque_insuficiente_nao_altera_nada(self):
+        response = self.client.post(
+            reverse('item_reserve', args=[self.item.pk]),
+            {'nome_cliente': 'Ana', 'quantidade': 6}
+        )
+        self.assertContains(response, 'Apenas 5 unidades')
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantidade_estoque, 5)
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_ultima_unidade_marca_indisponivel(self):
+        self.client.post(reverse('item_reserve', args=[self.item.pk]), {'nome_cliente': 'Ana', 'quantidade': 5})
+        self.item.refresh_from_db()
+        self.assertFalse(self.item.disponivel)
+
+    def test_pedido_tudo_ou_nada(self):
+        self.client.post(reverse('carrinho_adicionar', args=[self.item.pk]), {'quantidade': 2})
+        self.client.post(reverse('carrinho_adicionar', args=[self.outro.pk]), {'quantidade': 11})
+        response = self.client.post(reverse('checkout'), {'nome_cliente': 'Ana'})
+        self.assertContains(response, 'Estoque insuficiente para: Pão de queijo.')
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantidade_estoque, 5)
+
+        self.client.post(reverse('carrinho_remover', args=[self.outro.pk]))
+        self.client.post(reverse('carrinho_adicionar', args=[self.outro.pk]), {'quantidade': 3})
+        response = self.client.post(reverse('checkout'), {'nome_cliente': 'Ana'})
+        self.assertContains(response, 'Pão de queijo')
+        self.assertEqual(Reserva.objects.count(), 2)
+        self.assertEqual(Item.objects.get(pk=self.outro.pk).quantidade_estoque, 7)
+
+
+class FailoverVendasTests(TestCase):
+
+    def setUp(self):
+        self.item = Item.objects.create(nome='Bolo de cenoura', quantidade_estoque=5)
+        self.backend = BackendFailover(circuito=CircuitoLatencia(latencia_max_ms=1000, limiar=2, aberto_s=30))
+
+    @mock.patch('consumidor.vendas.processar_venda')
+    def test_lambda_fora_do_ar_vende_pelo_banco(self, processar_venda):
+        processar_venda.return_value = {'success': False, 'message': 'Connection refused', 'falha': 'conexao'}
+        resultado = self.backend.vender(self.item.pk, 1, 'cliente@example.com')
+        self.assertTrue(resultado['success'])
+        self.assertEqual(resultado['estoque_restante'], 4)
+        self.assertEqual(self.backend.contagens['desviadas'], 1)
+
+    @mock.patch('consumidor.vendas.processar_venda')
+    def test_timeout_de_leitura_nao_vende_de_novo(self, processar_venda):
+        processar_venda.return_value = {'success': False, 'message': 'Read timed out', 'falha': 'indeterminada'}
+        resultado = self.backend.vender(self.item.pk, 1, 'cliente@example.com')
+        self.assertFalse(resultado['success'])
+        self.assertFalse(Reserva.objects.exists())
+        self.assertEqual(self.backend.contagens['indeterminadas'], 1)
+
+    @mock.patch('consumidor.vendas.processar_venda')
+    def test_lambda_lenta_abre_o_circuito(self, processar_venda):
+        processar_venda.return_value = {'success': True, 'message': 'ok', 'produto': 'Bolo de cenoura'}
+        self.backend.circuito.latencia_max_ms = 0
+        self.backend.vender(self.item.pk, 1, 'cliente@example.com')
+        self.backend.vender(self.item.pk, 1, 'cliente@example.com')
+        self.assertEqual(self.backend.circuito.estado, 'aberto')
+
+        resultado = self.backend.vender(self.item.pk, 1, 'cliente@example.com')
+        self.assertEqual(processar_venda.call_count, 2)
+        self.assertEqual(resultado['estoque_restante'], 4)
+
+        # Passado o tempo de abertura, uma venda rápida na Lambda fecha o circuito
+        self.backend.circuito.latencia_max_ms = 1000
+        self.backend.circuito.aberto_ate = 0
+        self.backend.vender(self.item.pk, 1, 'cliente@example.com')
+        self.assertEqual(processar_venda.call_count, 3)
+        self.assertEqual(self.backend.circuito.estado, 'fechado')
+
+
+class ApiCatalogoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.item = Item.objects.create(nome='Bolo de cenoura', quantidade_estoque=5)
+        self.outro = Item.objects.create(nome='Pão de queijo', quantidade_estoque=10)
+
+    def test_catalogo_com_etag(self):
+        response = self.client.get(reverse('api_catalogo'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertEqual([item['nome'] for item in response.json()['itens']], ['Bolo de cenoura', 'Pão de queijo'])
+
+    def test_if_none_match_responde_304_sem_ler_os_itens(self):
+        etag = self.client.get(reverse('api_catalogo'))['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api_catalogo'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_etag_muda_com_o_estoque(self):
+        etag = self.client.get(reverse('api_catalogo'))['ETag']
+        self.item.quantidade_estoque = 0
+        self.item.save()
+        response = self.client.get(reverse('api_catalogo'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['itens'][0]['quantidade_estoque'], 0)
+
+    def test_varios_itens_por_id(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('api_catalogo'), {'ids': f'{self.outro.pk},{self.item.pk}'})
+        self.assertEqual([item['id'] for item in response.json()['itens']], [self.item.pk, self.outro.pk])
+        self.assertEqual(self.client.get(reverse('api_catalogo'), {'ids': 'a,b'}).status_code, 400)
+
+    def test_etag_dos_ids_depende_so_dos_itens_pedidos(self):
+        url = reverse('api_catalogo')
+        etag = self.client.get(url, {'ids': self.item.pk})['ETag']
+        self.outro.quantidade_estoque = 1
+        self.outro.save()
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {'ids': self.item.pk}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.item.quantidade_estoque = 1
+        self.item.save()
+        self.assertEqual(self.client.get(url, {'ids': self.item.pk}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_save_incrementa_versao(self):
+        self.assertEqual(self.item.versao, 1)
+        self.item.quantidade_estoque = 4
+        self.item.save(update_fields=['quantidade_estoque'])
+        self.assertEqual(self.item.versao, 2)
+        Item.objects.get(pk=self.item.pk).save()
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.versao, 3)
+
+    def test_item(self):
+        response = self.client.get(reverse('api_item', args=[self.item.pk]))
+        self.assertEqual(response.json()['quantidade_estoque'], 5)
+        self.assertEqual(response['ETag'], f'"item-{self.item.pk}-v1"')
+        response = self.client.get(reverse('api_item', args=[self.item.pk]), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get(reverse('api_item', args=[9999])).status_code, 404)
+
+
+class ImagensDerivadasTests(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media)
+        configuracao = override_settings(MEDIA_ROOT=self.media)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+
+    def upload(self, tamanho=(800, 600)):
+        buffer = BytesIO()
+        Image.new('RGB', tamanho, 'orange').save(buffer, 'JPEG')
+        return SimpleUploadedFile('bolo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_save_gera_derivados_e_dimensoes(self):
+        item = Item.objects.create(nome='Bolo', quantidade_estoque=1, imagem=self.upload())
+        self.assertEqual((item.imagem_largura, item.imagem_altura), (800, 600))
+        for largura in (320, 480, 672, 800):
+            for extensao in ('webp', 'jpg'):
+                self.assertTrue(default_storage.exists(nome_derivado(item.imagem.name, largura, extensao)))
+        self.assertFalse(default_storage.exists(nome_derivado(item.imagem.name, 960, 'webp')))
+
+    def test_save_sem_trocar_imagem_nao_gera_de_novo(self):
+        item = Item.objects.create(nome='Bolo', quantidade_estoque=1, imagem=self.upload())
+        item = Item.objects.get(pk=item.pk)
+        with mock.patch('consumidor.imagens.gerar_derivados') as gerar:
+            item.quantidade_estoque = 0
+            item.save()
+            item.save(update_fields=['quantidade_estoque'])
+        gerar.assert_not_called()
+
+    def test_template_tag_com_srcset(self):
+        item = Item.objects.create(nome='Bolo', quantidade_estoque=1, imagem=self.upload((400, 300)))
+        html = Template('{% load imagens %}{% imagem_responsiva item sizes="50vw" %}').render(Context({'item': item}))
+        self.assertIn('type="image/webp"', html)
+        self.assertIn('-320w.webp 320w', html)
+        self.assertIn('-400w.jpg 400w', html)
+        self.assertIn('width="400" height="300"', html)
+        self.assertIn('loading="lazy"', html)
+
+        Item.objects.filter(pk=item.pk).update(imagem_largura=None)
+        item.refresh_from_db()
+        html = Template('{% load imagens %}{% imagem_responsiva item %}').render(Context({'item': item}))
+        self.assertIn(f'src="{item.imagem.url}"', html)
+
+
+
+
+class ArquivosProducaoTests(SimpleTestCase):
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta)
+        self.media = os.path.join(self.pasta, 'media')
+        os.makedirs(os.path.join(self.media, 'produtos'))
+        with open(os.path.join(self.media, 'produtos', 'bolo.jpg'), 'wb') as arquivo:
+            arquivo.write(b'0123456789')
+        configuracao = override_settings(
+            STATIC_ROOT=os.path.join(self.pasta, 'static'),
+            MEDIA_ROOT=self.media,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'quitute_nas_nuvens.arquivos.EstaticosComprimidos'}},
+        )
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.addCleanup(nomes_com_hash.cache_clear)
+        self.factory = RequestFactory()
+
+    def conteudo(self, response):
+        dados = b''.join(response.streaming_content)
+        response.close()
+        return dados
+
+    def test_estatico_com_hash_e_pre_comprimido(self):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        nomes_com_hash.cache_clear()
+        nome = staticfiles_storage.stored_name('js/estoque_ao_vivo.js')
+        self.assertNotEqual(nome, 'js/estoque_ao_vivo.js')
+
+        response = servir_estatico(self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate'), nome)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        with staticfiles_storage.open(nome) as original:
+            self.assertEqual(gzip.decompress(self.conteudo(response)), original.read())
+
+        response = servir_estatico(self.factory.get('/'), 'js/estoque_ao_vivo.js')
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.conteudo(response)
+        with self.assertRaises(Http404):
+            servir_estatico(self.factory.get('/'), nome + '.gz')
+
+    def test_media_com_range(self):
+        response = servir_media(self.factory.get('/', HTTP_RANGE='bytes=2-5'), 'produtos/bolo.jpg')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(self.conteudo(response), b'2345')
+
+        response = servir_media(self.factory.get('/', HTTP_RANGE='bytes=-3'), 'produtos/bolo.jpg')
+        self.assertEqual(self.conteudo(response), b'789')
+        response = servir_media(self.factory.get('/', HTTP_RANGE='bytes=10-'), 'produtos/bolo.jpg')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_media_if_modified_since(self):
+        modificado = http_date(os.stat(os.path.join(self.media, 'produtos', 'bolo.jpg')).st_mtime)
+        response = servir_media(self.factory.get('/', HTTP_IF_MODIFIED_SINCE=modificado), 'produtos/bolo.jpg')
+        self.assertEqual(response.status_code, 304)
+        response = servir_media(self.factory.get('/'), 'produtos/bolo.jpg')
+        self.assertEqual(response['Last-Modified'], modificado)
+        self.assertEqual(self.conteudo(response), b'0123456789')
+
+    def test_caminho_fora_da_pasta(self):
+        for caminho in ('../tests.py', '/etc/passwd', 'produtos/'):
+            with self.assertRaises(Http404):
+                servir_media(self.factory.get('/'), caminho)
+
+    @override_settings(ARQUIVOS_OFFLOAD='x-accel-redirect', ARQUIVOS_ACCEL_PREFIXO='/_arquivos/')
+    def test_offload_para_o_proxy(self):
+        response = servir_media(self.factory.get('/'), 'produtos/bolo.jpg')
+        self.assertEqual(response['X-Accel-Redirect'], '/_arquivos/media/produtos/bolo.jpg')
+        self.assertEqual(response.content, b'')
+        with override_settings(ARQUIVOS_OFFLOAD='x-sendfile'):
+            response = servir_media(self.factory.get('/'), 'produtos/bolo.jpg')
+        self.assertEqual(response['X-Sendfile'], os.path.join(self.media, 'produtos', 'bolo.jpg'))
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_media_pelo_asgi_sem_iterador_sincrono(self):
+        with warnings.catch_warnings(record=True) as avisos:
+            warnings.simplefilter('always')
+            response = await self.async_client.get('/media/produtos/bolo.jpg', headers={'Range': 'bytes=2-5'})
+            self.assertEqual(response.status_code, 206)
+            self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+            self.assertEqual(b''.join([parte async for parte in response.streaming_content]), b'2345')
+
+            response = await self.async_client.get('/media/produtos/bolo.jpg')
+            self.assertEqual(response['Content-Length'], '10')
+            self.assertEqual(b''.join([parte async for parte in response.streaming_content]), b'0123456789')
+        self.assertFalse([aviso for aviso in avisos if 'synchronous iterators' in str(aviso.message)])
+
+
+class ItemVersaoTests(TestCase):
+
+    def test_save_nao_rele_a_versao(self):
+        item = Item.objects.create(nome='Brigadeiro', quantidade_estoque=3)
+        item.quantidade_estoque = 2
+        with CaptureQueriesContext(connection) as consultas:
+            item.save()
+        self.assertFalse([
+            consulta['sql'] for consulta in consultas
+            if consulta['sql'].startswith('SELECT') and 'consumidor_item' in consulta['sql']
+        ])
+        # A versão nova só é lida quando alguém precisa dela
+        with self.assertNumQueries(1):
+            self.assertEqual(item.versao, 2)
+        item.save(update_fields=['quantidade_estoque'])
+        self.assertEqual(Item.objects.get(pk=item.pk).versao, 3)
+
+
+class BufferSQSTests(SimpleTestCase):
+    """Buffer de envio em lote para o SQS, com send_message_batch falso."""
+
+    def setUp(self):
+        self.lotes = []
+        self.respostas = []
+        self.cliente = mock.Mock()
+        self.cliente.send_message_batch.side_effect = self.send_message_batch
+
+    def send_message_batch(self, QueueUrl, Entries):
+        self.lotes.append([entrada['MessageBody'] for entrada in Entries])
+        resposta = self.respostas.pop(0) if self.respostas else None
+        if isinstance(resposta, Exception):
+            raise resposta
+        return resposta or {'Successful': [{'Id': entrada['Id']} for entrada in Entries]}
+
+    def buffer_parado(self, **opcoes):
+        """Buffer sem a thread de fundo: os envios acontecem só no flush()."""
+        buffer = BufferSQS('https://sqs/fila', self.cliente, intervalo=0.01, **opcoes)
+        buffer._parar.set()
+        buffer._thread.join()
+        return buffer
+
+    def test_agrupa_em_lotes_de_10(self):
+        buffer = self.buffer_parado()
+        for i in range(23):
+            self.assertTrue(buffer.enviar(f'm{i}'))
+        buffer.flush()
+        self.assertEqual([len(lote) for lote in self.lotes], [10, 10, 3])
+        self.assertEqual(buffer.estatisticas['enviadas'], 23)
+        self.assertEqual(buffer.pendentes(), 0)
+
+    def test_reenvia_so_as_entradas_recusadas(self):
+        buffer = self.buffer_parado()
+        self.respostas.append({
+            'Successful': [{'Id': '0'}],
+            'Failed': [{'Id': '1', 'SenderFault': False}, {'Id': '2', 'SenderFault': True}],
+        })
+        for corpo in ('a', 'b', 'c'):
+            buffer.enviar(corpo)
+        buffer.flush()
+        # Só a falha do lado do SQS volta para o buffer; a mensagem inválida é descartada
+        self.assertEqual(self.lotes, [['a', 'b', 'c'], ['b']])
+        self.assertEqual(buffer.estatisticas['reenvios'], 1)
+        self.assertEqual(buffer.estatisticas['descartadas'], 1)
+        self.assertEqual(buffer.falhas_seguidas, 0)
+
+    def test_descarta_apos_max_tentativas_com_backoff(self):
+        buffer = self.buffer_parado(max_tentativas=3, backoff=0.5)
+        self.respostas.extend([Exception('ServiceUnavailable')] * 3)
+        buffer.enviar('a')
+        buffer.flush()
+        self.assertEqual(self.lotes, [['a'], ['a'], ['a']])
+        self.assertEqual(buffer.estatisticas['descartadas'], 1)
+        self.assertEqual(buffer.pendentes(), 0)
+        # 0,5 s, 1 s, 2 s... até BACKOFF_MAX
+        self.assertEqual(buffer.espera_backoff(), 2.0)
+        buffer.falhas_seguidas = 20
+        self.assertEqual(buffer.espera_backoff(), sqs_buffer.BACKOFF_MAX)
+
+    def test_fechar_envia_o_que_ficou_no_buffer(self):
+        buffer = BufferSQS('https://sqs/fila', self.cliente, intervalo=0.05)
+        for i in range(25):
+            buffer.enviar(f'm{i}')
+        buffer.fechar()
+        self.assertFalse(buffer._thread.is_alive())
+        self.assertEqual(sorted(corpo for lote in self.lotes for corpo in lote), sorted(f'm{i}' for i in range(25)))
+        self.assertTrue(all(len(lote) <= 10 for lote in self.lotes))
+
+    @mock.patch.dict(sqs_buffer._buffers, clear=True)
+    @mock.patch('consumidor.sqs_buffer.atexit.register')
+    @mock.patch('consumidor.sqs_buffer.boto3.client')
+    def test_um_buffer_por_fila(self, client, register):
+        client.return_value = self.cliente
+        fila = sqs_buffer.obter_buffer('https://sqs/fila', 'us-east-1')
+        outra = sqs_buffer.obter_buffer('https://sqs/outra', 'us-east-1')
+        self.addCleanup(fila.fechar)
+        self.addCleanup(outra.fechar)
+        self.assertIs(sqs_buffer.obter_buffer('https://sqs/fila', 'us-east-1'), fila)
+        self.assertIsNot(fila, outra)
+        self.assertEqual(outra.queue_url, 'https://sqs/outra')
+        # Cada buffer é esvaziado quando o processo termina
+        register.assert_has_calls([mock.call(fila.fechar), mock.call(outra.fechar)])
+        self.assertEqual(set(sqs_buffer.estatisticas_buffer()), {'https://sqs/fila', 'https://sqs/outra'})
+
+
+class SessaoHTTPTests(SimpleTestCase):
+    """Pool de conexões HTTP compartilhado pelas chamadas às Function URLs."""
+
+    def setUp(self):
+        patches = [
+            mock.patch.multiple(http_pool, _session=None, _session_pid=None, _adapter=None),
+            mock.patch.dict(http_pool._chamadas, clear=True),
+            mock.patch.dict(os.environ),
+            mock.patch('requests.Session.post'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        os.environ.pop('LAMBDA_TIMEOUT_VENDA_PRODUTOS', None)
+        os.environ.pop('LAMBDA_TIMEOUT_ENTREGA_PRODUTO', None)
+
+    def test_timeout_por_endpoint_e_contadores(self):
+        http_pool.post('venda_produtos', 'https://venda.lambda-url.aws/', {'itens': []})
+        http_pool.post('venda_produtos', 'https://venda.lambda-url.aws/', {'itens': []})
+        http_pool.post('entrega_produto', 'https://entrega.lambda-url.aws/', {'produtos': []})
+        sessao = http_pool.obter_sessao()
+        timeouts = [chamada.kwargs['timeout'] for chamada in sessao.post.call_args_list]
+        self.assertEqual(timeouts, [(3.05, 10), (3.05, 10), (3.05, 30)])
+        endpoints = http_pool.estatisticas_conexoes()['endpoints']
+        self.assertEqual(
+            {nome: (dados['chamadas'], dados['erros']) for nome, dados in endpoints.items()},
+            {'venda_produtos': (2, 0), 'entrega_produto': (1, 0)}
+        )
+
+    def test_timeout_configurado_por_env(self):
+        os.environ['LAMBDA_TIMEOUT_VENDA_PRODUTOS'] = '2,8'
+        os.environ['LAMBDA_TIMEOUT_ENTREGA_PRODUTO'] = '5'
+        http_pool.post('venda_produtos', 'https://venda.lambda-url.aws/', {})
+        http_pool.post('entrega_produto', 'https://entrega.lambda-url.aws/', {})
+        timeouts = [chamada.kwargs['timeout'] for chamada in http_pool.obter_sessao().post.call_args_list]
+        self.assertEqual(timeouts, [(2.0, 8.0), (5.0, 5.0)])
+
+    def test_erro_de_rede_conta_no_endpoint(self):
+        http_pool.obter_sessao().post.side_effect = requests.exceptions.ConnectTimeout()
+        with self.assertRaises(requests.exceptions.ConnectTimeout):
+            http_pool.post('venda_produtos', 'https://venda.lambda-url.aws/', {})
+        dados = http_pool.estatisticas_conexoes()['endpoints']['venda_produtos']
+        self.assertEqual((dados['chamadas'], dados['erros']), (1, 1))
+
+    def test_sessao_unica_com_pool_por_host(self):
+        sessao = http_pool.obter_sessao()
+        self.assertIs(http_pool.obter_sessao(), sessao)
+        adapter = sessao.get_adapter('https://venda.lambda-url.aws/')
+        self.assertIs(adapter, http_pool._adapter)
+        pool = adapter.poolmanager.connection_from_url('https://venda.lambda-url.aws/')
+        self.assertEqual(pool.pool.maxsize, http_pool.POOL_MAXSIZE)
+        self.assertEqual(adapter.poolmanager.pools._maxsize, http_pool.POOL_HOSTS)
+        self.assertEqual(
+            http_pool.estatisticas_conexoes()['hosts'],
+            {'https://venda.lambda-url.aws:443': {'requisicoes': 0, 'conexoes_novas': 0, 'reusos': 0, 'taxa_reuso': 0.0}}
+        )
+
+    def test_nova_sessao_depois_do_fork(self):
+        sessao = http_pool.obter_sessao()
+        with mock.patch.object(http_pool.os, 'getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(http_pool.obter_sessao(), sessao)
+
+
+class GeradorCargaTests(SimpleTestCase):
+    """Cálculos do gerador de carga: percentis, resumo em JSON e escolha de Zipf."""
+
+    def test_percentil_por_posicao(self):
+        valores = list(range(1, 101))
+        self.assertEqual([percentil(valores, p) for p in (0.50, 0.95, 0.99)], [51, 96, 100])
+        self.assertEqual(percentil([7], 0.99), 7)
+        self.assertIsNone(percentil([], 0.5))
+
+    def test_resumo_por_etapa(self):
+        metricas = Metricas()
+        metricas.jornadas.update(iniciadas=12, concluidas=10, interrompidas=2)
+        with mock.patch('consumidor.loadgen.time.perf_counter', return_value=10.0):
+            # Latências de 1 a 100 ms, fora de ordem; as duas últimas com erro
+            for ms in [*range(51, 101), *range(1, 51)]:
+                erro = ms > 98
+                metricas.registrar('reserva', 10.0 - ms / 1000, 503 if erro else 200, erro=erro)
+            metricas.registrar('homepage', 10.0 - 0.25, erro=True)
+
+        resumo = json.loads(json.dumps(metricas.resumo(50)))
+        self.assertEqual(set(resumo), {'duracao_s', 'jornadas', 'reservas', 'etapas'})
+        self.assertEqual(resumo['jornadas']['por_segundo'], 0.2)
+        self.assertEqual(set(resumo['etapas']), {'reserva', 'homepage'})
+        self.assertEqual(resumo['etapas']['reserva'], {
+            'requisicoes': 100,
+            'vazao_rps': 2.0,
+            'erros': 2,
+            'taxa_erro': 0.02,
+            'status': {'200': 98, '503': 2},
+            'latencia_ms': {'p50': 51.0, 'p95': 96.0, 'p99': 100.0, 'max': 100.0},
+        })
+        self.assertEqual(resumo['etapas']['homepage']['status'], {'excecao': 1})
+        self.assertEqual(resumo['etapas']['homepage']['taxa_erro'], 1.0)
+
+    def test_zipf_concentra_nos_primeiros_itens(self):
+        escolha = EscolhaZipf(range(1, 11), 1.2, random.Random(7))
+        contagem = Counter(escolha.escolher() for _ in range(10000))
+        frequencias = [contagem[item] for item in escolha.itens]
+        self.assertGreater(frequencias[0], 3500)
+        self.assertGreater(frequencias[0], frequencias[1])
+        self.assertGreater(frequencias[1], frequencias[-1])
+
+        # A mesma semente repete as mesmas escolhas; expoente 0 é uniforme
+        repetida = EscolhaZipf(range(1, 11), 1.2, random.Random(7))
+        self.assertEqual(repetida.itens, escolha.itens)
+        self.assertEqual(EscolhaZipf(range(1, 11), 0, random.Random(7)).pesos, [1.0] * 10)
+
+
+class PaginadorFalso:
+    """Paginador de list_topics falso: segue o NextToken de cada página."""
+
+    def __init__(self, paginas):
+        self.paginas = paginas
+        self.tokens = []
+
+    def paginate(self):
+        token = None
+        while True:
+            self.tokens.append(token)
+            pagina = self.paginas[token]
+            yield pagina
+            token = pagina.get('NextToken')
+            if token is None:
+                return
+
+
+class TopicoSNSTests(SimpleTestCase):
+    """Resolução do ARN de tópicos SNS com cache (cópia idêntica em cada Lambda)."""
+
+    def setUp(self):
+        patches = [
+            mock.patch.dict(sns_topic._cache, clear=True),
+            mock.patch.dict(sns_topic.estatisticas, {chave: 0 for chave in sns_topic.estatisticas}),
+            mock.patch.dict(os.environ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        os.environ.pop('SNS_TOPIC_ARN_ENVIAEMAIL', None)
+        self.paginador = PaginadorFalso({
+            None: {'Topics': [{'TopicArn': 'arn:aws:sns:us-east-1:0:Outro'}], 'NextToken': 'p2'},
+            'p2': {'Topics': [{'TopicArn': 'arn:aws:sns:us-east-1:0:EnviaEmail'}]},
+        })
+        self.sns = mock.Mock()
+        self.sns.get_paginator.return_value = self.paginador
+
+    def test_percorre_paginas_e_usa_cache(self):
+        with mock.patch.object(sns_topic.time, 'monotonic', return_value=1000.0):
+            self.assertEqual(sns_topic.resolver_topic_arn('EnviaEmail', self.sns), 'arn:aws:sns:us-east-1:0:EnviaEmail')
+            self.assertEqual(self.paginador.tokens, [None, 'p2'])
+            self.assertEqual(sns_topic.resolver_topic_arn('EnviaEmail', self.sns), 'arn:aws:sns:us-east-1:0:EnviaEmail')
+            # O tópico da primeira página também ficou em cache
+            self.assertEqual(sns_topic.resolver_topic_arn('Outro', self.sns), 'arn:aws:sns:us-east-1:0:Outro')
+        self.assertEqual(self.sns.get_paginator.call_count, 1)
+        estatisticas = sns_topic.estatisticas_topicos()
+        self.assertEqual((estatisticas['consultas'], estatisticas['cache_hits']), (3, 2))
+        self.assertEqual((estatisticas['paginas_list_topics'], estatisticas['list_topics_evitados']), (2, 2))
+
+    def test_resolve_de_novo_depois_do_ttl(self):
+        with mock.patch.object(sns_topic.time, 'monotonic', return_value=1000.0):
+            sns_topic.resolver_topic_arn('EnviaEmail', self.sns)
+        with mock.patch.object(sns_topic.time, 'monotonic', return_value=1000.0 + sns_topic.CACHE_TTL - 1):
+            sns_topic.resolver_topic_arn('EnviaEmail', self.sns)
+        self.assertEqual(self.sns.get_paginator.call_count, 1)
+        with mock.patch.object(sns_topic.time, 'monotonic', return_value=1000.0 + sns_topic.CACHE_TTL):
+            sns_topic.resolver_topic_arn('EnviaEmail', self.sns)
+        self.assertEqual(self.sns.get_paginator.call_count, 2)
+        self.assertEqual(sns_topic.estatisticas_topicos()['cache_hits'], 1)
+
+    def test_para_na_pagina_do_topico(self):
+        sns_topic.resolver_topic_arn('Outro', self.sns)
+        self.assertEqual(self.paginador.tokens, [None])
+
+    def test_topico_inexistente(self):
+        with self.assertRaises(sns_topic.TopicoNaoEncontrado):
+            sns_topic.resolver_topic_arn('Inexistente', self.sns)
+        self.assertEqual(self.paginador.tokens, [None, 'p2'])
+
+    def test_arn_fixado_por_env_nao_lista_topicos(self):
+        os.environ['SNS_TOPIC_ARN_ENVIAEMAIL'] = 'arn:aws:sns:sa-east-1:0:EnviaEmail'
+        self.assertEqual(sns_topic.resolver_topic_arn('EnviaEmail', self.sns), 'arn:aws:sns:sa-east-1:0:EnviaEmail')
+        self.sns.get_paginator.assert_not_called()
+        estatisticas = sns_topic.estatisticas_topicos()
+        self.assertEqual((estatisticas['fixados_por_env'], estatisticas['list_topics_evitados']), (1, 1))
+
+    def test_copias_das_lambdas_identicas(self):
+        with open(sns_topic.__file__, 'rb') as arquivo:
+            original = arquivo.read()
+        for pasta in ('vendaProduto', 'subscribeEmail', 'enviaEmailInteressados'):
+            with open(os.path.join(settings.BASE_DIR, pasta, 'sns_topic.py'), 'rb') as arquivo:
+                self.assertEqual(arquivo.read(), original, pasta)
+
+
+def carregar_lambda(pasta, modulo):
+    """
+    Carrega `pasta/modulo.py` de uma Lambda sem alterar o estado global.
+
+    Cada Lambda tem seus próprios rds_connection.py e sns_topic.py: os módulos
+    irmãos são importados com a pasta no sys.path e depois retirados de
+    sys.modules, para não colidirem com os de outra Lambda. O sys.path é
+    restaurado por inteiro, já que o próprio módulo pode alterá-lo.
+    """
+    caminho = os.path.join(settings.BASE_DIR, pasta)
+    irmaos = {nome[:-3] for nome in os.listdir(caminho) if nome.endswith('.py')}
+    salvos = {nome: sys.modules.pop(nome) for nome in irmaos if nome in sys.modules}
+    caminhos = list(sys.path)
+    sys.path.insert(0, caminho)
+    try:
+        spec = importlib.util.spec_from_file_location(f'{pasta}.{modulo}', os.path.join(caminho, f'{modulo}.py'))
+        carregado = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(carregado)
+    finally:
+        sys.path[:] = caminhos
+        for nome in irmaos:
+            sys.modules.pop(nome, None)
+        sys.modules.update(salvos)
+    return carregado
+
+
+class EmuladorLambdaTests(SimpleTestCase):
+    """Containers e limite de concorrência do emulador local, com um handler de teste."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.emulador = carregar_lambda('emuladorLocal', 'emulador')
+
+    def setUp(self):
+        self.liberar = threading.Event()
+        self.executando = threading.Event()
+
+        def lambda_handler(evento, contexto):
+            self.executando.set()
+            self.liberar.wait(5)
+            return {'statusCode': 200, 'body': json.dumps({'funcao': contexto.function_name})}
+
+        handler = mock.Mock(lambda_handler=lambda_handler)
+        patch = mock.patch.object(self.emulador, 'carregar_isolado', return_value=(handler, {}))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        emulador = mock.Mock(init_ms=0)
+        emulador.reservar_concorrencia.return_value = True
+        self.funcao = self.emulador.Funcao(emulador, 'teste', 'pasta', 'modulo', concorrencia=1, timeout=5)
+        emulador.funcao.return_value = self.funcao
+        self.addCleanup(self.funcao.encerrar)
+
+        requisicao = type('Requisicao', (self.emulador.Requisicao,), {'emulador': emulador})
+        servidor = ThreadingHTTPServer(('127.0.0.1', 0), requisicao)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        self.addCleanup(servidor.server_close)
+        self.addCleanup(servidor.shutdown)
+        self.porta = servidor.server_address[1]
+
+    def invocar(self):
+        conexao = HTTPConnection('127.0.0.1', self.porta, timeout=5)
+        try:
+            conexao.request('POST', '/teste', body='{}')
+            resposta = conexao.getresponse()
+            return resposta.status, resposta.getheader('X-Emulador-Cold-Start'), resposta.read()
+        finally:
+            conexao.close()
+
+    def test_cold_start_warm_start_e_throttle(self):
+        self.liberar.set()
+        self.assertEqual(self.invocar(), (200, 'true', b'{"funcao": "teste"}'))
+        self.assertEqual(self.invocar()[:2], (200, 'false'))
+
+        # Com concorrência 1, a chamada que chega durante outra recebe 429
+        self.liberar.clear()
+        self.executando.clear()
+        primeira = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(primeira.shutdown)
+        futuro = primeira.submit(self.invocar)
+        self.assertTrue(self.executando.wait(5))
+        status, _, corpo = self.invocar()
+        self.assertEqual((status, json.loads(corpo)), (429, {'Message': 'Rate Exceeded.'}))
+        self.liberar.set()
+        self.assertEqual(futuro.result(timeout=5)[:2], (200, 'false'))
+
+        resumo = self.funcao.resumo()
+        self.assertEqual(
+            {chave: resumo[chave] for chave in ('invocacoes', 'cold_starts', 'throttles', 'containers', 'em_execucao')},
+            {'invocacoes': 3, 'cold_starts': 1, 'throttles': 1, 'containers': 1, 'em_execucao': 0}
+        )
+
+
+class CursorFalso:
+    """Cursor do pymysql falso: cada execute consome a próxima resposta do roteiro da conexão."""
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.rowcount = 0
+        self.lastrowid = None
+        self._linhas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, sql, parametros=None):
+        self.conexao.comandos.append((' '.join(sql.split()), parametros))
+        resposta = self.conexao.respostas.pop(0) if self.conexao.respostas else {}
+        self.rowcount = resposta.get('rowcount', 0)
+        self.lastrowid = resposta.get('lastrowid')
+        self._linhas = list(resposta.get('linhas', []))
+
+    executemany = execute
+
+    def fetchone(self):
+        return self._linhas[0] if self._linhas else None
+
+    def fetchall(self):
+        return self._linhas
+
+
+class ConexaoFalsa:
+    """Conexão do pymysql falsa, com as respostas de cada comando em ordem."""
+
+    def __init__(self, respostas):
+        self.respostas = list(respostas)
+        self.comandos = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def sql(self, prefixo):
+        return [sql for sql, _ in self.comandos if sql.startswith(prefixo)]
+
+
+class VendaLambdaTests(SimpleTestCase):
+    """Lambda venda_de_produtos, com conexão MySQL falsa."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with mock.patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
+            cls.lambda_ = carregar_lambda('vendaProduto', 'venda_de_produtos')
+
+    def setUp(self):
+        self.addCleanup(self.lambda_._nomes.clear)
+
+    def vender(self, conexao, corpo):
+        @contextmanager
+        def conexao_falsa():
+            # Como rds_connection.conexao: transação interrompida é desfeita
+            try:
+                yield conexao
+            except Exception:
+                conexao.rollback()
+                raise
+
+        with mock.patch.object(self.lambda_, 'conexao', conexao_falsa), \
+                mock.patch.object(self.lambda_, 'enviar_email_retirada'), \
+                mock.patch.object(self.lambda_, 'enviar_email_retirada_pedido'):
+            resposta = self.lambda_.lambda_handler({'body': json.dumps(corpo)}, None)
+        return resposta['statusCode'], json.loads(resposta['body'])
+
+    def test_estoque_restante_vem_do_update(self):
+        corpo = {'produto_id': 1, 'quantidade': 2, 'email': 'ana@example.com'}
+        # UPDATE (nova quantidade no lastrowid), INSERT da reserva, nome do produto, versão do catálogo
+        conexao = ConexaoFalsa([{'rowcount': 1, 'lastrowid': 3}, {'rowcount': 1}, {'linhas': [('Brigadeiro',)]}, {}])
+        status, corpo_resposta = self.vender(conexao, corpo)
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            (corpo_resposta['produto'], corpo_resposta['estoque_restante'], corpo_resposta['disponivel']),
+            ('Brigadeiro', 3, True)
+        )
+        self.assertIn('LAST_INSERT_ID(quantidade_estoque - %s)', conexao.comandos[0][0])
+        self.assertEqual(conexao.commits, 2)
+
+        # Com o nome no cache do container: só o UPDATE e o INSERT na transação
+        conexao = ConexaoFalsa([{'rowcount': 1, 'lastrowid': 0}, {'rowcount': 1}, {}])
+        status, corpo_resposta = self.vender(conexao, corpo)
+        self.assertEqual((corpo_resposta['estoque_restante'], corpo_resposta['disponivel']), (0, False))
+        self.assertEqual(conexao.sql('SELECT'), [])
+
+    def pedido_cas(self, respostas, tentativas=8):
+        conexao = ConexaoFalsa(respostas)
+        corpo = {'itens': [{'produto_id': 1, 'quantidade': 2}, {'produto_id': 2, 'quantidade': 1}],
+                 'email': 'ana@example.com'}
+        with mock.patch.multiple(self.lambda_, VENDA_MODO='cas', VENDA_CAS_TENTATIVAS=tentativas,
+                                 VENDA_CAS_ESPERA_MS=0), \
+                mock.patch.dict(self.lambda_.estatisticas_cas, {'conflitos': 0, 'esgotadas': 0}):
+            status, corpo_resposta = self.vender(conexao, corpo)
+            estatisticas = dict(self.lambda_.estatisticas_cas)
+        return conexao, status, corpo_resposta, estatisticas
+
+    def test_cas_refaz_o_pedido_apos_conflito(self):
+        conexao, status, corpo, estatisticas = self.pedido_cas([
+            # 1ª tentativa: outro pedido mudou a versão do produto 1 entre a leitura e o UPDATE
+            {'linhas': [(1, 'Bolo', 5, 7), (2, 'Pão', 10, 3)]}, {'rowcount': 1},
+            # 2ª tentativa: relê as versões e grava
+            {'linhas': [(1, 'Bolo', 4, 8), (2, 'Pão', 10, 3)]}, {'rowcount': 2}, {'rowcount': 2}, {},
+        ])
+        self.assertEqual(status, 200)
+        self.assertEqual([linha['estoque_restante'] for linha in corpo['itens']], [2, 9])
+        self.assertEqual(estatisticas, {'conflitos': 1, 'esgotadas': 0})
+        self.assertEqual(conexao.rollbacks, 1)
+        # Leitura sem trava e UPDATE condicionado às versões lidas
+        self.assertTrue(all('FOR UPDATE' not in sql for sql in conexao.sql('SELECT')))
+        updates = [(sql, parametros) for sql, parametros in conexao.comandos if sql.startswith('UPDATE')]
+        self.assertIn('AND versao = CASE id', updates[-1][0])
+        self.assertEqual(updates[-1][1][-4:], [1, 8, 2, 3])
+        self.assertEqual(len(conexao.sql('INSERT INTO consumidor_reserva')), 1)
+
+    def test_cas_desiste_depois_das_tentativas(self):
+        linhas = {'linhas': [(1, 'Bolo', 5, 7), (2, 'Pão', 10, 3)]}
+        conexao, status, corpo, estatisticas = self.pedido_cas(
+            [linhas, {'rowcount': 0}, linhas, {'rowcount': 1}], tentativas=2
+        )
+        self.assertEqual(status, 409)
+        self.assertEqual(corpo['tentativas'], 2)
+        self.assertEqual(estatisticas, {'conflitos': 2, 'esgotadas': 1})
+        self.assertEqual((conexao.commits, conexao.rollbacks), (0, 2))
+        self.assertEqual(conexao.sql('INSERT'), [])
+
+    def test_quantidade_booleana_recusada(self):
+        conexao = ConexaoFalsa([])
+        status, _ = self.vender(conexao, {'produto_id': 1, 'quantidade': True, 'email': 'ana@example.com'})
+        self.assertEqual(status, 400)
+        status, _ = self.vender(conexao, {'itens': [{'produto_id': 1, 'quantidade': True}], 'email': 'ana@example.com'})
+        self.assertEqual(status, 400)
+        self.assertEqual(conexao.comandos, [])
+
+
+class NotificacaoInteressadosTests(SimpleTestCase):
+    """Lambda envia_email_interessados, com cursor e SNS falsos."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.lambda_ = carregar_lambda('enviaEmailInteressados', 'envia_email_interessados')
+
+    def test_alocar_pula_pedido_maior_que_o_estoque(self):
+        agora = timezone.now()
+        linhas = [(1, 'a@x.com', 3, agora), (2, 'b@x.com', 5, agora), (3, 'c@x.com', 2, agora), (4, 'd@x.com', 1, agora)]
+        atendidas, estoque = self.lambda_.alocar(linhas, 6)
+        self.assertEqual([linha[0] for linha in atendidas], [1, 3, 4])
+        self.assertEqual(estoque, 0)
+        self.assertEqual(self.lambda_.alocar(linhas, 0), ([], 0))
+
+    def test_reivindicar_chunk_pagina_por_data_e_id(self):
+        cursor = mock.Mock()
+        cursor.fetchall.return_value = []
+        self.lambda_.reivindicar_chunk(cursor, 7, (None, None), 500)
+        sql, parametros = cursor.execute.call_args.args
+        self.assertEqual(parametros, (7, 500))
+        self.assertIn('FOR UPDATE SKIP LOCKED', sql)
+
+        ultima = timezone.now()
+        self.lambda_.reivindicar_chunk(cursor, 7, (ultima, 42), 500)
+        sql, parametros = cursor.execute.call_args.args
+        self.assertEqual(parametros, (7, ultima, ultima, 42, 500))
+        self.assertIn('(data_criacao > %s OR (data_criacao = %s AND id > %s))', sql)
+        self.assertIn('ORDER BY data_criacao, id', sql)
+
+    def test_publicar_lote_devolve_so_os_aceitos(self):
+        sns = mock.Mock()
+        sns.publish_batch.return_value = {
+            'Successful': [{'Id': '1', 'MessageId': 'm1'}],
+            'Failed': [{'Id': '2', 'Code': 'InternalError', 'SenderFault': False}],
+        }
+        agora = timezone.now()
+        publicadas = self.lambda_.publicar_lote(sns, 'arn:topico', 'Brigadeiro', [(1, 'a@x.com', 1, agora), (2, 'b@x.com', 2, agora)])
+        self.assertEqual(publicadas, [1])
+        entradas = sns.publish_batch.call_args.kwargs['PublishBatchRequestEntries']
+        self.assertEqual(
+            [entrada['MessageAttributes']['email']['StringValue'] for entrada in entradas],
+            ['a@x.com', 'b@x.com']
+        )
+
+        sns.publish_batch.side_effect = Exception('Throttling')
+        self.assertEqual(self.lambda_.publicar_lote(sns, 'arn:topico', 'Brigadeiro', [(1, 'a@x.com', 1, agora)]), [])
+
+
+class InscricaoLambdaTests(SimpleTestCase):
+    """Lambda subscribe_email no trigger SQS, com SNS e conexão MySQL falsos."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.lambda_ = carregar_lambda('subscribeEmail', 'subscribe_email')
+
+    def registro(self, message_id, email):
+        return {'messageId': message_id, 'body': json.dumps({'email': email})}
+
+    def test_lote_devolve_so_os_registros_que_falharam(self):
+        def inscrever(email):
+            if email == 'erro@x.com':
+                raise Exception('Throttling')
+            return {'success': True, 'message': 'ok', 'subscription_arn': 'arn:inscricao'}
+
+        evento = {'Records': [self.registro('m1', 'erro@x.com'), self.registro('m2', 'ana@x.com')]}
+        with mock.patch.object(self.lambda_, 'subscribe_to_sns', side_effect=inscrever) as subscribe:
+            resposta = self.lambda_.process_sqs_messages(evento)
+        self.assertEqual(resposta, {'batchItemFailures': [{'itemIdentifier': 'm1'}]})
+        self.assertEqual(sorted(chamada.args[0] for chamada in subscribe.call_args_list), ['ana@x.com', 'erro@x.com'])
+
+    def test_falha_no_sns_nao_grava_inscricao(self):
+        def subscribe(Endpoint, **kwargs):
+            if Endpoint == 'erro@x.com':
+                raise Exception('Throttling')
+            return {'SubscriptionArn': 'pending confirmation'}
+
+        sns = mock.Mock()
+        sns.subscribe.side_effect = subscribe
+        conexao = ConexaoFalsa([])
+
+        @contextmanager
+        def conexao_falsa():
+            yield conexao
+
+        evento = {'Records': [self.registro('m1', 'erro@x.com'), self.registro('m2', 'ana@x.com'), {'messageId': 'm3', 'body': '{}'}]}
+        with mock.patch.object(self.lambda_, 'conexao', conexao_falsa), \
+                mock.patch.object(self.lambda_, 'obter_cliente_sns', return_value=sns), \
+                mock.patch.object(self.lambda_, 'resolver_topic_arn', return_value='arn:aws:sns:us-east-1:0:EnviaEmail'):
+            resposta = self.lambda_.process_sqs_messages(evento)
+        self.assertEqual(resposta, {'batchItemFailures': [{'itemIdentifier': 'm1'}, {'itemIdentifier': 'm3'}]})
+        upserts = [parametros for sql, parametros in conexao.comandos if sql.startswith('INSERT INTO consumidor_emailsubscription')]
+        self.assertEqual(upserts, [('ana@x.com', 'pending confirmation', True, 'pending confirmation', True)])
+        self.assertEqual(conexao.commits, 1)
+
+
+class EntregaFornecedorLambdaTests(SimpleTestCase):
+    """Lambda simulador_vendedor: a entrega usa um número constante de round trips."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with mock.patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'us-east-1'}):
+            cls.lambda_ = carregar_lambda('simulaVendedor', 'simulador_vendedor')
+
+    def entregar(self, produtos, anteriores, interessados):
+        conexao = ConexaoFalsa([{'linhas': anteriores}, {}, {}, {'linhas': interessados}])
+        with mock.patch.object(self.lambda_, 'obter_conexao', return_value=conexao), \
+                mock.patch.object(self.lambda_, 'lambda_client') as lambda_client:
+            resultado = self.lambda_.armazena_produtos_rds(produtos)
+        return resultado, conexao, lambda_client
+
+    def assertRoundTrips(self, conexao, produtos):
+        self.assertEqual(len(conexao.comandos), 4)
+        (select, ids), (upsert, linhas), (catalogo, _), (contagem, _) = conexao.comandos
+        self.assertTrue(select.startswith('SELECT id, quantidade_estoque, disponivel FROM consumidor_item WHERE id IN'))
+        self.assertEqual(ids, sorted(produto['id'] for produto in produtos))
+        self.assertIn('versao = versao + 1', upsert)
+        self.assertEqual(len(linhas), len(produtos))
+        self.assertTrue(catalogo.startswith('INSERT INTO consumidor_catalogoversao'))
+        self.assertTrue(contagem.startswith('SELECT item_id, COUNT(*) as total FROM consumidor_notificacao'))
+        self.assertIn('GROUP BY item_id', contagem)
+        # Um commit da entrega e outro da versão do catálogo, em transação própria
+        self.assertEqual(conexao.commits, 2)
+
+    def assertInvocouNotificacao(self, lambda_client, produto_ids):
+        lambda_client.invoke.assert_called_once()
+        chamada = lambda_client.invoke.call_args.kwargs
+        self.assertEqual((chamada['FunctionName'], chamada['InvocationType']), ('envia_email_interessados', 'Event'))
+        self.assertEqual(json.loads(chamada['Payload']), {'produto_ids': produto_ids})
+
+    def test_um_produto(self):
+        produtos = [{'id': 1, 'nome': 'Brigadeiro', 'quantidade': 10}]
+        resultado, conexao, lambda_client = self.entregar(produtos, [(1, 0, True)], [(1, 4)])
+        self.assertEqual(resultado, {'inseridos': 0, 'atualizados': 1, 'notificacoes_enviadas': 1})
+        self.assertRoundTrips(conexao, produtos)
+        self.assertEqual(conexao.comandos[3][1], [1])
+        self.assertInvocouNotificacao(lambda_client, [1])
+
+    def test_varios_produtos_mesmos_round_trips(self):
+        produtos = [{'id': produto_id, 'nome': f'Produto {produto_id}', 'quantidade': 5} for produto_id in range(1, 6)]
+        anteriores = [(1, 0, True), (2, 3, True), (3, 7, False)]
+        resultado, conexao, lambda_client = self.entregar(produtos, anteriores, [(1, 2), (3, 1)])
+        self.assertEqual(resultado, {'inseridos': 2, 'atualizados': 3, 'notificacoes_enviadas': 2})
+        self.assertRoundTrips(conexao, produtos)
+        # Só os produtos que estavam esgotados ou indisponíveis são consultados
+        self.assertEqual(sorted(conexao.comandos[3][1]), [1, 3])
+        self.assertInvocouNotificacao(lambda_client, [1, 3])
+
+    def test_sem_interessados_nao_invoca(self):
+        produtos = [{'id': 1, 'nome': 'Brigadeiro', 'quantidade': 10}]
+        resultado, conexao, lambda_client = self.entregar(produtos, [(1, 0, True)], [])
+        self.assertEqual(resultado['notificacoes_enviadas'], 0)
+        lambda_client.invoke.assert_not_called()
+
+
+class EstoqueAoVivoTests(TestCase):
+
+    async def test_monitor_publica_so_as_mudancas(self):
+        item = await Item.objects.acreate(nome='Brigadeiro', quantidade_estoque=3)
+        await Item.objects.acreate(nome='Beijinho', quantidade_estoque=4)
+        monitor = MonitorEstoque(intervalo=60)
+        assinante = await monitor.assinar()
+        try:
+            self.assertEqual(len(monitor.snapshot), 2)
+            self.assertEqual(assinante.retirar(), [])
+
+            item.quantidade_estoque = 1
+            await item.asave()
+            await monitor.verificar()
+            # Sem mudança na versão do catálogo, nada é relido nem publicado
+            await monitor.verificar()
+            self.assertEqual(
+                assinante.retirar(),
+                [{'item_id': item.pk, 'quantidade_estoque': 1, 'disponivel': True}]
+            )
+        finally:
+            monitor.cancelar(assinante)
+            monitor._tarefa.cancel()
+
+
+class SessaoClienteTests(QueryCountTestCase):
+
+    def test_homepage_nao_grava_sessao_no_banco(self):
+        EmailSubscription.objects.create(email='outro@example.com', subscribed=True)
+        self.client.post(reverse('homepage'), {'email': 'outro@example.com'})
+        self.assertIn(settings.CUSTOMER_SESSION_COOKIE_NAME, self.client.cookies)
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(self.client.get(reverse('item_list')).status_code, 200)
+
+    def test_cookie_adulterado_volta_para_homepage(self):
+        nome = settings.CUSTOMER_SESSION_COOKIE_NAME
+        adulterado = self.client.cookies[nome].value[:-2] + 'xx'
+        self.client.cookies[nome] = adulterado
+        response = self.client.get(reverse('item_list'))
+        self.assertRedirects(response, reverse('homepage'), fetch_redirect_response=False)
+        self.assertNotEqual(response.cookies[nome].value, adulterado)
+
+    def test_admin_continua_com_sessao_no_banco(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        self.client.login(username='admin', password='senha')
+        self.assertTrue(Session.objects.exists())
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('item_list')).status_code, 200)
+
+
+@override_settings(CUSTOMER_SESSION_MODE='db')
+class SessaoClienteBancoTests(QueryCountTestCase):
+
+    def test_detalhe_le_sessao_do_banco(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('item_detail', args=[self.item.pk]))
+        self.assertContains(response, 'Bolo de cenoura')
@@ -1,9 +1,21 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Com ASYNC_VIEWS=true, a reserva usa a view assíncrona
+item_reserve_view = views.AsyncItemReserveView if settings.ASYNC_VIEWS else views.ItemReserveView
+
 urlpatterns = [
     path('', views.ItemListView.as_view(), name='item_list'),
     path('<int:pk>/', views.ItemDetailView.as_view(), name='item_detail'),
-    path('<int:pk>/reserve/', views.ItemReserveView.as_view(), name='item_reserve'),
+    path('<int:pk>/reserve/', item_reserve_view.as_view(), name='item_reserve'),
+    path('api/itens/', views.ApiCatalogoView.as_view(), name='api_catalogo'),
+    path('api/itens/<int:pk>/', views.ApiItemView.as_view(), name='api_item'),
+    path('estoque/eventos/', views.EstoqueEventosView.as_view(), name='estoque_eventos'),
+    path('carrinho/', views.CarrinhoView.as_view(), name='carrinho'),
+    path('carrinho/adicionar/<int:pk>/', views.CarrinhoAdicionarView.as_view(), name='carrinho_adicionar'),
+    path('carrinho/remover/<int:pk>/', views.CarrinhoRemoverView.as_view(), name='carrinho_remover'),
+    path('checkout/', views.CheckoutView.as_view(), name='checkout'),
     path('admin/entregar-produtos/', views.EntregarProdutosView.as_view(), name='entregar_produtos'),
+    path('admin/metricas/', views.MetricasView.as_view(), name='metricas'),
 ]
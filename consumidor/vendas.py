@@ -0,0 +1,373 @@
+"""
+Backends de venda do aplicativo Consumidor.
+
+As views de reserva e de checkout não chamam a Lambda diretamente: pedem o
+backend configurado em VENDAS_BACKEND, e todos devolvem o mesmo dicionário de
+`processar_venda` / `processar_checkout`:
+
+    lambda    Lambda venda_produtos pela Function URL (comportamento original)
+    orm       a mesma venda feita pelo Django, no mesmo banco: trava a linha
+              do item com SELECT ... FOR UPDATE, baixa o estoque, incrementa a
+              versão do item e do catálogo, grava a Reserva e coloca o email
+              de retirada na outbox, tudo em uma transação
+    failover  Lambda enquanto ela responde rápido; vendas pelo banco quando a
+              chamada nem chega à Lambda ou quando o disjuntor de latência
+              está aberto
+
+O failover nunca refaz pelo banco uma venda cuja resposta se perdeu (timeout
+de leitura, conexão caída, erro 5xx): a Lambda pode ter feito o commit, e
+vender de novo baixaria o estoque duas vezes. Essas falhas só contam para
+abrir o disjuntor; quem decide tentar de novo é o cliente.
+"""
+
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import F
+
+from .catalogo import incrementar_versao
+from .lambda_integration import FALHAS_SEM_EFEITO, processar_checkout, processar_venda
+from .lambda_integration_async import processar_venda_async
+from .models import Item, Reserva
+from .outbox import enfileirar_email
+
+# Latências recentes da Lambda guardadas para as métricas
+AMOSTRA_LATENCIA = 200
+
+
+def email_retirada(nome, quantidade, estoque_restante):
+    """Mesmo email de retirada que a Lambda venda_produtos envia pelo SNS."""
+    subject = f'Seu pedido está pronto para retirada - {nome}'
+    message = f"""
+Olá,
+
+Seu pedido foi confirmado com sucesso!
+
+Detalhes do pedido:
+- Produto: {nome}
+- Quantidade: {quantidade}
+- Estoque restante: {estoque_restante}
+
+Você pode retirar seu produto na padaria agora mesmo.
+
+Atenciosamente,
+Quitute nas Nuvens
+"""
+    return subject, message
+
+
+def email_retirada_pedido(linhas):
+    """Email de retirada de um pedido com vários itens, como o da Lambda."""
+    detalhes = "\n".join(f"- {linha['produto']}: {linha['quantidade_vendida']}" for linha in linhas)
+    subject = 'Seu pedido está pronto para retirada'
+    message = f"""
+Olá,
+
+Seu pedido foi confirmado com sucesso!
+
+Itens do pedido:
+{detalhes}
+
+Você pode retirar seus produtos na padaria agora mesmo.
+
+Atenciosamente,
+Quitute nas Nuvens
+"""
+    return subject, message
+
+
+class BackendLambda:
+    """Vendas pela Lambda venda_produtos."""
+
+    nome = 'lambda'
+
+    def vender(self, produto_id, quantidade, email):
+        return processar_venda(produto_id, quantidade, email)
+
+    async def avender(self, produto_id, quantidade, email):
+        return await processar_venda_async(produto_id, quantidade, email)
+
+    def vender_pedido(self, itens, email):
+        return processar_checkout(itens, email)
+
+    def estatisticas(self):
+        return {'backend': self.nome}
+
+
+class BackendORM:
+    """
+    Vendas pelo ORM do Django, com as mesmas regras da Lambda venda_produtos.
+
+    A linha do item fica travada do SELECT ao commit, então vendas
+    concorrentes (por este backend ou pela Lambda, que trava o mesmo
+    registro) nunca deixam o estoque negativo.
+    """
+
+    nome = 'orm'
+
+    def vender(self, produto_id, quantidade, email):
+        if isinstance(quantidade, bool) or not isinstance(quantidade, int) or quantidade <= 0:
+            return {'success': False, 'message': 'quantidade deve ser maior que 0.'}
+
+        with transaction.atomic():
+            item = (
+                Item.objects.select_for_update()
+                .filter(pk=produto_id)
+                .values('nome', 'quantidade_estoque')
+                .first()
+            )
+            if item is None:
+                return {'success': False, 'message': f'Produto com ID {produto_id} não encontrado.'}
+            if item['quantidade_estoque'] < quantidade:
+                return {
+                    'success': False,
+                    'message': f"Estoque insuficiente. Apenas {item['quantidade_estoque']} unidades disponíveis.",
+                    'produto': item['nome'],
+                }
+
+            estoque_restante = item['quantidade_estoque'] - quantidade
+            Item.objects.filter(pk=produto_id).update(
+                quantidade_estoque=F('quantidade_estoque') - quantidade,
+                disponivel=estoque_restante > 0,
+                versao=F('versao') + 1,
+            )
+            Reserva.objects.create(item_id=produto_id, email_cliente=email, quantidade=quantidade, confirmado=True)
+            enfileirar_email(email, *email_retirada(item['nome'], quantidade, estoque_restante))
+        # update() não dispara os signals de Item. Fora da transação, como nas
+        # Lambdas: o lock da linha de versão não serializa as vendas
+        incrementar_versao()
+
+        print(f"🗄️ Venda processada pelo banco: {quantidade}x {item['nome']} para {email}")
+        return {
+            'success': True,
+            'message': 'Venda processada com sucesso!',
+            'produto': item['nome'],
+            'quantidade_vendida': quantidade,
+            'estoque_restante': estoque_restante,
+            'disponivel': estoque_restante > 0,
+        }
+
+    async def avender(self, produto_id, quantidade, email):
+        return await sync_to_async(self.vender)(produto_id, quantidade, email)
+
+    def vender_pedido(self, itens, email):
+        """Vende todos os itens do pedido em uma transação (tudo ou nada)."""
+        quantidades = {}
+        for linha in itens:
+            quantidade = linha.get('quantidade', 1)
+            if isinstance(quantidade, bool) or not isinstance(quantidade, int) or quantidade <= 0:
+                return {'success': False, 'message': 'quantidade deve ser maior que 0.'}
+            quantidades[linha['produto_id']] = quantidades.get(linha['produto_id'], 0) + quantidade
+        if not quantidades:
+            return {'success': False, 'message': 'O pedido não tem itens.'}
+
+        with transaction.atomic():
+            # Travas sempre em ordem de id, como na Lambda: sem deadlock entre pedidos
+            produtos = {
+                produto['id']: produto
+                for produto in Item.objects.select_for_update()
+                .filter(pk__in=quantidades)
+                .order_by('id')
+                .values('id', 'nome', 'quantidade_estoque')
+            }
+            nao_encontrados = [produto_id for produto_id in quantidades if produto_id not in produtos]
+            if nao_encontrados:
+                return {'success': False, 'message': f'Produtos não encontrados: {nao_encontrados}'}
+            faltantes = [
+                produtos[produto_id]['nome'] for produto_id in sorted(quantidades)
+                if produtos[produto_id]['quantidade_estoque'] < quantidades[produto_id]
+            ]
+            if faltantes:
+                return {'success': False, 'message': f"Estoque insuficiente para: {', '.join(faltantes)}."}
+
+            linhas = []
+            for produto_id in sorted(quantidades):
+                quantidade = quantidades[produto_id]
+                estoque_restante = produtos[produto_id]['quantidade_estoque'] - quantidade
+                Item.objects.filter(pk=produto_id).update(
+                    quantidade_estoque=F('quantidade_estoque') - quantidade,
+                    disponivel=estoque_restante > 0,
+                    versao=F('versao') + 1,
+                )
+                linhas.append({
+                    'produto_id': produto_id,
+                    'produto': produtos[produto_id]['nome'],
+                    'quantidade_vendida': quantidade,
+                    'estoque_restante': estoque_restante,
+                    'disponivel': estoque_restante > 0,
+                })
+            Reserva.objects.bulk_create([
+                Reserva(item_id=linha['produto_id'], email_cliente=email,
+                        quantidade=linha['quantidade_vendida'], confirmado=True)
+                for linha in linhas
+            ])
+            enfileirar_email(email, *email_retirada_pedido(linhas))
+        incrementar_versao()
+
+        print(f"🗄️ Pedido processado pelo banco: {len(linhas)} itens para {email}")
+        return {'success': True, 'message': 'Pedido processado com sucesso!', 'itens': linhas}
+
+    def estatisticas(self):
+        return {'backend': self.nome}
+
+
+class CircuitoLatencia:
+    """
+    Disjuntor pela latência da Lambda.
+
+    fechado: as vendas vão para a Lambda. Cada chamada lenta (acima de
+    `latencia_max_ms`) ou com falha conta; uma chamada boa zera a contagem.
+    Com `limiar` chamadas ruins seguidas o circuito abre.
+    aberto: as vendas vão direto para o banco durante `aberto_s` segundos.
+    meio_aberto: passado esse tempo, uma única venda testa a Lambda; se ela
+    for boa o circuito fecha, senão abre de novo.
+    """
+
+    def __init__(self, latencia_max_ms, limiar, aberto_s):
+        self.latencia_max_ms = latencia_max_ms
+        self.limiar = limiar
+        self.aberto_s = aberto_s
+        self.estado = 'fechado'
+        self.ruins_seguidas = 0
+        self.aberto_ate = 0.0
+        self.aberturas = 0
+        self.latencias_ms = deque(maxlen=AMOSTRA_LATENCIA)
+        self._lock = threading.Lock()
+
+    def permite(self):
+        """Indica se esta venda pode ir para a Lambda."""
+        with self._lock:
+            if self.estado == 'fechado':
+                return True
+            if self.estado == 'aberto' and time.monotonic() >= self.aberto_ate:
+                # Esta venda é a sonda; as demais continuam no banco até o resultado
+                self.estado = 'meio_aberto'
+                return True
+            return False
+
+    def registrar(self, duracao_s, sucesso):
+        """Registra o resultado de uma chamada à Lambda."""
+        duracao_ms = duracao_s * 1000
+        ruim = not sucesso or duracao_ms > self.latencia_max_ms
+        with self._lock:
+            self.latencias_ms.append(duracao_ms)
+            if self.estado == 'meio_aberto':
+                if ruim:
+                    self._abrir()
+                else:
+                    self.estado, self.ruins_seguidas = 'fechado', 0
+                    print("✅ Disjuntor de vendas fechado: Lambda venda_produtos respondendo")
+            elif ruim:
+                self.ruins_seguidas += 1
+                if self.estado == 'fechado' and self.ruins_seguidas >= self.limiar:
+                    self._abrir()
+            else:
+                self.ruins_seguidas = 0
+
+    def _abrir(self):
+        self.estado = 'aberto'
+        self.aberto_ate = time.monotonic() + self.aberto_s
+        self.aberturas += 1
+        print(f"⚡ Disjuntor de vendas aberto por {self.aberto_s:.0f}s: vendas pelo banco")
+
+    def estatisticas(self):
+        with self._lock:
+            latencias = sorted(self.latencias_ms)
+        return {
+            'estado': self.estado,
+            'ruins_seguidas': self.ruins_seguidas,
+            'aberturas': self.aberturas,
+            'latencia_max_ms': self.latencia_max_ms,
+            'lambda_p50_ms': round(latencias[len(latencias) // 2], 1) if latencias else None,
+            'lambda_p95_ms': round(latencias[min(int(len(latencias) * 0.95), len(latencias) - 1)], 1) if latencias else None,
+        }
+
+
+class BackendFailover:
+    """Lambda com desvio para o banco quando ela está fora ou lenta."""
+
+    nome = 'failover'
+
+    def __init__(self, primario=None, reserva=None, circuito=None):
+        self.primario = primario or BackendLambda()
+        self.reserva = reserva or BackendORM()
+        self.circuito = circuito or CircuitoLatencia(
+            settings.VENDAS_LATENCIA_MAX_MS,
+            settings.VENDAS_FALHAS_PARA_ABRIR,
+            settings.VENDAS_CIRCUITO_ABERTO_S,
+        )
+        self.contagens = {'lambda': 0, 'banco': 0, 'desviadas': 0, 'indeterminadas': 0}
+        self._lock = threading.Lock()
+
+    def _contar(self, chave):
+        with self._lock:
+            self.contagens[chave] += 1
+
+    def _resultado_lambda(self, resultado, inicio):
+        """Registra a chamada no disjuntor; True se a venda deve ir para o banco."""
+        falha = resultado.get('falha')
+        self.circuito.registrar(time.perf_counter() - inicio, falha is None)
+        if falha in FALHAS_SEM_EFEITO:
+            print(f"🔀 Lambda venda_produtos indisponível ({falha}): venda pelo banco")
+            self._contar('desviadas')
+            return True
+        self._contar('indeterminadas' if falha else 'lambda')
+        return False
+
+    def _executar(self, metodo, *args):
+        if not self.circuito.permite():
+            self._contar('banco')
+            return getattr(self.reserva, metodo)(*args)
+        inicio = time.perf_counter()
+        resultado = getattr(self.primario, metodo)(*args)
+        if self._resultado_lambda(resultado, inicio):
+            return getattr(self.reserva, metodo)(*args)
+        return resultado
+
+    def vender(self, produto_id, quantidade, email):
+        return self._executar('vender', produto_id, quantidade, email)
+
+    def vender_pedido(self, itens, email):
+        return self._executar('vender_pedido', itens, email)
+
+    async def avender(self, produto_id, quantidade, email):
+        if not self.circuito.permite():
+            self._contar('banco')
+            return await self.reserva.avender(produto_id, quantidade, email)
+        inicio = time.perf_counter()
+        resultado = await self.primario.avender(produto_id, quantidade, email)
+        if self._resultado_lambda(resultado, inicio):
+            return await self.reserva.avender(produto_id, quantidade, email)
+        return resultado
+
+    def estatisticas(self):
+        with self._lock:
+            contagens = dict(self.contagens)
+        return {'backend': self.nome, 'circuito': self.circuito.estatisticas(), **contagens}
+
+
+BACKENDS = {
+    'lambda': BackendLambda,
+    'orm': BackendORM,
+    'failover': BackendFailover,
+}
+
+# Uma instância por backend e processo: o disjuntor precisa do histórico
+_instancias = {}
+
+
+def obter_backend(nome=None):
+    """Retorna o backend de vendas configurado em VENDAS_BACKEND."""
+    nome = nome or settings.VENDAS_BACKEND
+    if nome not in BACKENDS:
+        raise ImproperlyConfigured(
+            f"VENDAS_BACKEND inválido: {nome!r} (use {', '.join(BACKENDS)})"
+        )
+    if nome not in _instancias:
+        _instancias[nome] = BACKENDS[nome]()
+    return _instancias[nome]
@@ -5,28 +5,36 @@ Este módulo contém as views responsáveis por gerenciar a experiência
 do comprador ao visualizar e reservar quitutes.
 """
 
-from django.shortcuts import render, redirect, get_object_or_404
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render, redirect
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.http import condition
 from django.views.generic import ListView, DetailView
-from django.urls import reverse_lazy
-from .models import Item, Reserva
-from .lambda_integration import processar_venda, entregar_produtos
-import boto3
-import os
-
-
-def send_reservation_email(email, nome_cliente, item_nome, quantidade):
-    """
-    Envia email de confirmação de reserva via SNS
-    """
-    try:
-        sns = boto3.client('sns', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-        alertTopic = 'EnviaEmail'
-        snsTopicArn = [t['TopicArn'] for t in sns.list_topics()['Topics']
-                      if t['TopicArn'].lower().endswith(':' + alertTopic.lower())][0]
-
-        subject = f'Confirmação de Reserva - {item_nome}'
-        message = f"""
+from .models import Item
+from .lambda_integration import entregar_produtos
+from .http_pool import estatisticas_conexoes
+from .sqs_buffer import estatisticas_buffer
+from .outbox import enfileirar_email, aenfileirar_email
+from .catalogo import versao_catalogo
+from .inscricoes import estatisticas_fila, inscritos
+from .estoque_ao_vivo import eventos_estoque, formatar_evento, monitor
+from .vendas import obter_backend
+
+
+def build_reservation_email(email, nome_cliente, item_nome, quantidade):
+    """Monta o assunto e o corpo do email de confirmação de reserva."""
+    subject = f'Confirmação de Reserva - {item_nome}'
+    message = f"""
 Olá {nome_cliente},
 
 Sua reserva foi confirmada com sucesso!
@@ -41,14 +49,63 @@ Você pode retirar seu produto na padaria assim que estiver pronto.
 Atenciosamente,
 Quitute nas Nuvens
 """
-        response = sns.publish(
-            TopicArn=snsTopicArn,
-            Message=message,
-            Subject=subject
-        )
-        print(f"📧 Email de reserva enviado via SNS para {email}: {response}")
-    except Exception as e:
-        print(f"❌ Erro ao enviar email de reserva para {email}: {e}")
+    return subject, message
+
+
+def enqueue_reservation_email(email, nome_cliente, item_nome, quantidade):
+    """
+    Grava o email de confirmação de reserva na outbox.
+
+    A publicação no SNS é feita pelo worker `publicar_emails`, fora da requisição.
+    """
+    subject, message = build_reservation_email(email, nome_cliente, item_nome, quantidade)
+    enfileirar_email(email, subject, message)
+
+
+def enqueue_order_email(email, nome_cliente, linhas):
+    """Grava na outbox um único email de confirmação para um pedido com vários itens."""
+    detalhes = "\n".join(f"- {linha['produto']}: {linha['quantidade_vendida']}" for linha in linhas)
+    subject = 'Confirmação de Pedido - Quitute nas Nuvens'
+    message = f"""
+Olá {nome_cliente},
+
+Seu pedido foi confirmado com sucesso!
+
+Itens do pedido:
+{detalhes}
+
+Você pode retirar seus produtos na padaria assim que estiverem prontos.
+
+Atenciosamente,
+Quitute nas Nuvens
+"""
+    enfileirar_email(email, subject, message)
+
+
+async def aenqueue_reservation_email(email, nome_cliente, item_nome, quantidade):
+    """Versão assíncrona de `enqueue_reservation_email`."""
+    subject, message = build_reservation_email(email, nome_cliente, item_nome, quantidade)
+    await aenfileirar_email(email, subject, message)
+
+
+QUANTIDADE_INVALIDA = 'Informe uma quantidade válida (um número inteiro maior que 0).'
+
+
+def ler_quantidade(request):
+    """Lê o campo `quantidade` do formulário; None se não for um inteiro positivo."""
+    try:
+        quantidade = int(request.POST.get('quantidade', 1))
+    except (TypeError, ValueError):
+        return None
+    return quantidade if quantidade > 0 else None
+
+
+def quantidade_invalida(request, pk):
+    """Página de erro da reserva para uma quantidade inválida (400)."""
+    return render(request, 'items/reservation_error.html', {
+        'item_id': pk,
+        'error_message': QUANTIDADE_INVALIDA,
+    }, status=400)
 
 
 class SessionRequiredMixin:
@@ -60,11 +117,23 @@ class SessionRequiredMixin:
 
     def dispatch(self, request, *args, **kwargs):
         """Verifica se o e-mail está na sessão antes de processar a requisição."""
-        if 'customer_email' not in request.session:
+        if 'customer_email' not in request.sessao_cliente:
             return redirect('homepage')
         return super().dispatch(request, *args, **kwargs)
 
 
+class AsyncSessionRequiredMixin:
+    """
+    Versão assíncrona de `SessionRequiredMixin`, para views com handlers async.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        """Verifica se o e-mail está na sessão sem bloquear o event loop."""
+        if not await request.sessao_cliente.ahas_key('customer_email'):
+            return redirect('homepage')
+        return await super().dispatch(request, *args, **kwargs)
+
+
 class ItemListView(SessionRequiredMixin, ListView):
     """
     Exibe a lista de quitutes disponíveis para reserva.
@@ -80,9 +149,21 @@ class ItemListView(SessionRequiredMixin, ListView):
     context_object_name = 'items'
 
     def get_queryset(self):
-        """Retorna todos os itens disponíveis."""
+        """
+        Retorna todos os itens disponíveis.
+
+        O queryset é preguiçoso: só é avaliado quando o template não encontra
+        a versão atual do catálogo no cache.
+        """
         return Item.objects.all()
 
+    def get_context_data(self, **kwargs):
+        """Adiciona a versão do catálogo, usada como chave do cache do template."""
+        context = super().get_context_data(**kwargs)
+        context['versao_catalogo'] = versao_catalogo()
+        context['catalogo_cache_timeout'] = settings.CATALOGO_CACHE_TIMEOUT
+        return context
+
 
 class ItemDetailView(SessionRequiredMixin, DetailView):
     """
@@ -112,7 +193,7 @@ class ItemReserveView(SessionRequiredMixin, View):
 
     def post(self, request, pk):
         """
-        Processa o formulário de reserva usando Lambda venda_produtos.
+        Processa o formulário de reserva pelo backend de vendas configurado.
 
         Args:
             pk: ID do item a ser reservado
@@ -120,35 +201,34 @@ class ItemReserveView(SessionRequiredMixin, View):
         Returns:
             Renderiza a página de sucesso ou redireciona para detalhes
         """
-        item = get_object_or_404(Item, pk=pk)
-
         nome_cliente = request.POST.get('nome_cliente')
-        quantidade = int(request.POST.get('quantidade', 1))
-        email_cliente = request.session.get('customer_email')
+        quantidade = ler_quantidade(request)
+        if quantidade is None:
+            return quantidade_invalida(request, pk)
+        email_cliente = request.sessao_cliente.get('customer_email')
 
-        # Chama Lambda para processar a venda
-        print(f"🔄 Chamando Lambda venda_produtos para item {pk}, quantidade {quantidade}")
-        resultado = processar_venda(pk, quantidade, email_cliente)
+        # Processa a venda (Lambda ou banco, ver vendas.py). A resposta já traz
+        # o nome do produto e o estoque restante, então o item não é lido aqui.
+        print(f"🔄 Processando venda do item {pk}, quantidade {quantidade}")
+        resultado = obter_backend().vender(pk, quantidade, email_cliente)
 
         if resultado['success']:
-            # Atualiza item local (sincroniza com banco)
-            item.refresh_from_db()
-
-            # Envia email de confirmação
-            send_reservation_email(email_cliente, nome_cliente, item.nome, quantidade)
+            # Grava o email de confirmação na outbox (publicado pelo worker)
+            enqueue_reservation_email(email_cliente, nome_cliente, resultado['produto'], quantidade)
 
             # Renderiza página de sucesso
             return render(request, 'items/reservation_success.html', {
                 'nome_cliente': nome_cliente,
-                'item_nome': item.nome,
+                'item_nome': resultado['produto'],
                 'quantidade': quantidade,
                 'email_cliente': email_cliente,
                 'lambda_message': resultado.get('message')
             })
         else:
-            # Se a Lambda falhou, mostra erro
+            # Se a venda falhou, mostra erro
             return render(request, 'items/reservation_error.html', {
-                'item': item,
+                'item_id': pk,
+                'item_nome': resultado.get('produto'),
                 'error_message': resultado.get('message')
             })
 
@@ -157,6 +237,260 @@ class ItemReserveView(SessionRequiredMixin, View):
         return redirect('item_detail', pk=pk)
 
 
+class AsyncItemReserveView(AsyncSessionRequiredMixin, View):
+    """
+    Versão assíncrona de `ItemReserveView` (usada quando ASYNC_VIEWS=true).
+
+    A chamada à Lambda venda_produtos é feita com httpx, então um único
+    worker ASGI mantém centenas de reservas em andamento ao mesmo tempo.
+    """
+
+    async def post(self, request, pk):
+        """Processa o formulário de reserva sem bloquear o worker."""
+        nome_cliente = request.POST.get('nome_cliente')
+        quantidade = ler_quantidade(request)
+        if quantidade is None:
+            return quantidade_invalida(request, pk)
+        email_cliente = await request.sessao_cliente.aget('customer_email')
+
+        print(f"🔄 Processando venda do item {pk}, quantidade {quantidade}")
+        resultado = await obter_backend().avender(pk, quantidade, email_cliente)
+
+        if resultado['success']:
+            await aenqueue_reservation_email(email_cliente, nome_cliente, resultado['produto'], quantidade)
+
+            return render(request, 'items/reservation_success.html', {
+                'nome_cliente': nome_cliente,
+                'item_nome': resultado['produto'],
+                'quantidade': quantidade,
+                'email_cliente': email_cliente,
+                'lambda_message': resultado.get('message')
+            })
+        else:
+            return render(request, 'items/reservation_error.html', {
+                'item_id': pk,
+                'item_nome': resultado.get('produto'),
+                'error_message': resultado.get('message')
+            })
+
+    async def get(self, request, pk):
+        """Redireciona GET requests para a página de detalhes."""
+        return redirect('item_detail', pk=pk)
+
+
+class EstoqueEventosView(View):
+    """
+    Stream Server-Sent Events com o estoque dos quitutes.
+
+    Envia o estoque atual ao conectar e depois só os itens que mudaram
+    (`{item_id, quantidade_estoque, disponivel}`), a partir do monitor
+    compartilhado do processo (ver estoque_ao_vivo.py).
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            # No WSGI cada conexão aberta prenderia uma thread: envia o estado
+            # atual e deixa o EventSource reconectar depois do retry.
+            itens = await sync_to_async(list)(
+                Item.objects.values('quantidade_estoque', 'disponivel', item_id=F('id'))
+            )
+            return HttpResponse(
+                'retry: 10000\n\n' + formatar_evento('snapshot', itens),
+                content_type='text/event-stream'
+            )
+
+        assinante = await monitor.assinar()
+        response = StreamingHttpResponse(eventos_estoque(assinante), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # nginx não deve segurar os eventos
+        return response
+
+
+API_MAX_IDS = 100
+CAMPOS_API = ('id', 'nome', 'quantidade_estoque', 'disponivel', 'versao', 'imagem')
+
+
+def serializar_itens(linhas):
+    """Converte linhas de `values(*CAMPOS_API)` no formato da API."""
+    for linha in linhas:
+        linha['imagem'] = default_storage.url(linha['imagem']) if linha['imagem'] else None
+    return linhas
+
+
+def ler_ids(texto):
+    """Lê o parâmetro `ids` ("1,2,3"). Levanta ValueError com a mensagem para o cliente."""
+    try:
+        ids = sorted({int(item_id) for item_id in texto.split(',') if item_id.strip()})
+    except ValueError:
+        raise ValueError('ids deve ser uma lista de inteiros separados por vírgula')
+    if len(ids) > API_MAX_IDS:
+        raise ValueError(f'No máximo {API_MAX_IDS} ids por chamada')
+    return ids
+
+
+def etag_catalogo(request, *args, **kwargs):
+    """
+    ETag forte da API de catálogo.
+
+    O catálogo completo usa a versão global do catálogo. Com `?ids=`, a ETag é
+    um hash das versões dos itens pedidos (uma consulta só de id e versão),
+    então mudanças em outros itens não invalidam a resposta.
+    """
+    texto = request.GET.get('ids')
+    if texto is None:
+        request.versao_catalogo = versao_catalogo()
+        return f"catalogo-{request.versao_catalogo}"
+    try:
+        item_ids = ler_ids(texto)
+    except ValueError:
+        return None
+    versoes = Item.objects.filter(id__in=item_ids).order_by('id').values_list('id', 'versao')
+    assinatura = ','.join(f'{item_id}:{versao}' for item_id, versao in versoes)
+    return 'itens-' + hashlib.blake2b(assinatura.encode(), digest_size=12).hexdigest()
+
+
+@method_decorator(condition(etag_func=etag_catalogo), name='get')
+class ApiCatalogoView(View):
+    """
+    Catálogo em JSON para quiosques e apps: `{versao, itens: [...]}`.
+
+    Com `?ids=1,2,3` devolve só esses itens, numa única consulta. Um
+    If-None-Match com a ETag atual recebe 304 sem ler nem serializar os itens;
+    o catálogo completo serializado fica no cache sob a versão do catálogo.
+    """
+
+    def get(self, request):
+        if request.GET.get('ids') is None:
+            versao = request.versao_catalogo
+            conteudo = cache.get_or_set(
+                f'api-catalogo:{versao}',
+                lambda: self.serializar(Item.objects.order_by('id'), versao=versao),
+                settings.CATALOGO_CACHE_TIMEOUT
+            )
+        else:
+            try:
+                item_ids = ler_ids(request.GET['ids'])
+            except ValueError as e:
+                return JsonResponse({'erro': str(e)}, status=400)
+            conteudo = self.serializar(Item.objects.filter(id__in=item_ids).order_by('id'))
+        response = HttpResponse(conteudo, content_type='application/json')
+        response['Cache-Control'] = 'no-cache'  # sempre revalidar com a ETag
+        return response
+
+    @staticmethod
+    def serializar(queryset, **extra):
+        itens = serializar_itens(list(queryset.values(*CAMPOS_API)))
+        return JsonResponse({**extra, 'itens': itens}).content
+
+
+def etag_item(request, pk):
+    """ETag forte de um item da API, a partir da versão do item."""
+    versao = Item.objects.filter(pk=pk).values_list('versao', flat=True).first()
+    return f"item-{pk}-v{versao}" if versao is not None else None
+
+
+@method_decorator(condition(etag_func=etag_item), name='get')
+class ApiItemView(View):
+    """Um quitute em JSON, com a mesma revalidação por ETag do catálogo."""
+
+    def get(self, request, pk):
+        linhas = serializar_itens(list(Item.objects.filter(pk=pk).values(*CAMPOS_API)))
+        if not linhas:
+            return JsonResponse({'erro': 'Item não encontrado'}, status=404)
+        response = JsonResponse(linhas[0])
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class CarrinhoView(SessionRequiredMixin, View):
+    """
+    Exibe o carrinho do comprador.
+
+    O carrinho fica na sessão como {id do item: quantidade}.
+    """
+
+    template_name = 'items/carrinho.html'
+
+    @staticmethod
+    def linhas_do_carrinho(request):
+        """Retorna as linhas do carrinho com os itens carregados em uma única query."""
+        carrinho = request.sessao_cliente.get('carrinho', {})
+        itens = Item.objects.in_bulk([int(pk) for pk in carrinho])
+        return [
+            {'item': itens[int(pk)], 'quantidade': quantidade}
+            for pk, quantidade in carrinho.items() if int(pk) in itens
+        ]
+
+    def get(self, request):
+        """Renderiza o carrinho."""
+        return render(request, self.template_name, {'linhas': self.linhas_do_carrinho(request)})
+
+
+class CarrinhoAdicionarView(SessionRequiredMixin, View):
+    """Adiciona um quitute ao carrinho (POST)."""
+
+    def post(self, request, pk):
+        quantidade = ler_quantidade(request)
+        if quantidade is None:
+            return quantidade_invalida(request, pk)
+        carrinho = request.sessao_cliente.get('carrinho', {})
+        carrinho[str(pk)] = carrinho.get(str(pk), 0) + quantidade
+        request.sessao_cliente['carrinho'] = carrinho
+        return redirect('carrinho')
+
+
+class CarrinhoRemoverView(SessionRequiredMixin, View):
+    """Remove um quitute do carrinho (POST)."""
+
+    def post(self, request, pk):
+        carrinho = request.sessao_cliente.get('carrinho', {})
+        if carrinho.pop(str(pk), None) is not None:
+            request.sessao_cliente['carrinho'] = carrinho
+        return redirect('carrinho')
+
+
+class CheckoutView(SessionRequiredMixin, View):
+    """
+    Finaliza o pedido do carrinho.
+
+    Todos os itens são vendidos em uma única chamada ao backend de vendas,
+    que processa o pedido em uma transação (tudo ou nada).
+    """
+
+    def post(self, request):
+        carrinho = request.sessao_cliente.get('carrinho', {})
+        if not carrinho:
+            return redirect('carrinho')
+
+        nome_cliente = request.POST.get('nome_cliente')
+        email_cliente = request.sessao_cliente.get('customer_email')
+        itens = [
+            {'produto_id': int(pk), 'quantidade': quantidade}
+            for pk, quantidade in carrinho.items()
+        ]
+
+        print(f"🔄 Processando pedido com {len(itens)} itens")
+        resultado = obter_backend().vender_pedido(itens, email_cliente)
+
+        if resultado['success']:
+            request.sessao_cliente['carrinho'] = {}
+            enqueue_order_email(email_cliente, nome_cliente, resultado['itens'])
+            return render(request, 'items/checkout_sucesso.html', {
+                'nome_cliente': nome_cliente,
+                'email_cliente': email_cliente,
+                'itens': resultado['itens'],
+            })
+
+        return render(request, CarrinhoView.template_name, {
+            'linhas': CarrinhoView.linhas_do_carrinho(request),
+            'error_message': resultado.get('message'),
+        })
+
+    def get(self, request):
+        """Redireciona GET requests para o carrinho."""
+        return redirect('carrinho')
+
+
 class EntregarProdutosView(View):
     """
     View administrativa para chamar Lambda de entrega de produtos.
@@ -183,3 +517,27 @@ class EntregarProdutosView(View):
             return render(request, 'items/entrega_erro.html', {
                 'error_message': resultado.get('message')
             })
+
+
+@method_decorator(staff_member_required, name='dispatch')
+class MetricasView(View):
+    """
+    View administrativa com as métricas internas deste processo do Django.
+
+    Mostra o reuso de conexões HTTP com as Function URLs das Lambdas, o
+    estado do buffer de envio em lote para o SQS, o cache de inscritos e a
+    fila de inscrições pendentes (profundidade e atraso até a inscrição), as
+    conexões SSE de estoque ao vivo e o backend de vendas (com o estado do
+    disjuntor no modo failover).
+    """
+
+    def get(self, request):
+        """Retorna as métricas em JSON."""
+        return JsonResponse({
+            'http_lambdas': estatisticas_conexoes(),
+            'buffer_sqs': estatisticas_buffer(),
+            'cache_inscritos': inscritos.estatisticas(),
+            'fila_inscricoes': estatisticas_fila(),
+            'estoque_sse': monitor.estatisticas(),
+            'vendas': obter_backend().estatisticas(),
+        })
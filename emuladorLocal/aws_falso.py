@@ -0,0 +1,350 @@
+"""
+Serviços AWS em memória para o emulador local.
+
+Substitui o `boto3` dentro do emulador: os handlers das Lambdas continuam
+chamando `boto3.client('sns')`, `boto3.client('lambda')` etc., mas recebem
+clientes que guardam tudo em memória. SNS e SQS também respondem pelo HTTP
+do emulador no formato das APIs da AWS, então o Django (com o boto3 de
+verdade) pode usar AWS_ENDPOINT_URL_SNS / AWS_ENDPOINT_URL_SQS apontando
+para o emulador.
+
+Cobre apenas as operações usadas pelo projeto:
+    SNS     list_topics (paginado), create_topic, subscribe, publish, publish_batch
+    SQS     send_message, send_message_batch (e a leitura feita pelo gatilho do emulador)
+    Lambda  invoke (RequestResponse e Event)
+"""
+import hashlib
+import io
+import itertools
+import json
+import queue
+import sys
+import threading
+import time
+import types
+import uuid
+from collections import deque
+from xml.sax.saxutils import escape
+
+CONTA = '000000000000'
+REGIAO = 'us-east-1'
+TOPICOS_PADRAO = ('EnviaEmail', 'ProdutoDisponivel')
+TAMANHO_PAGINA_TOPICOS = 100
+
+
+class Boto3Error(Exception):
+    """Equivalente a `boto3.exceptions.Boto3Error`."""
+
+
+class ErroAWS(Boto3Error):
+    """Erro devolvido por um serviço em memória (ex.: tópico inexistente)."""
+
+    def __init__(self, codigo, mensagem):
+        super().__init__(f'{codigo}: {mensagem}')
+        self.codigo = codigo
+        self.mensagem = mensagem
+
+
+class Paginador:
+    """Paginador mínimo no formato do boto3 (`paginate()` devolve as páginas)."""
+
+    def __init__(self, operacao, chave_token='NextToken'):
+        self.operacao = operacao
+        self.chave_token = chave_token
+
+    def paginate(self, **kwargs):
+        token = None
+        while True:
+            pagina = self.operacao(**kwargs, **({self.chave_token: token} if token else {}))
+            yield pagina
+            token = pagina.get(self.chave_token)
+            if not token:
+                return
+
+
+class SNSMemoria:
+    """Tópicos, assinaturas e mensagens publicadas, em memória."""
+
+    def __init__(self, topicos=TOPICOS_PADRAO, historico=1000):
+        self._lock = threading.Lock()
+        self.topicos = {}  # arn -> {'nome', 'assinaturas'}
+        self.mensagens = deque(maxlen=historico)
+        self.estatisticas = {'publish': 0, 'publish_batch': 0, 'mensagens': 0, 'subscribe': 0, 'list_topics': 0}
+        for nome in topicos:
+            self.create_topic(Name=nome)
+
+    def _contar(self, chave, valor=1):
+        with self._lock:
+            self.estatisticas[chave] += valor
+
+    def _topico(self, arn):
+        topico = self.topicos.get(arn)
+        if topico is None:
+            raise ErroAWS('NotFound', f'Topic does not exist: {arn}')
+        return topico
+
+    def create_topic(self, Name, **kwargs):
+        arn = f'arn:aws:sns:{REGIAO}:{CONTA}:{Name}'
+        with self._lock:
+            self.topicos.setdefault(arn, {'nome': Name, 'assinaturas': []})
+        return {'TopicArn': arn}
+
+    def list_topics(self, NextToken=None):
+        self._contar('list_topics')
+        arns = sorted(self.topicos)
+        inicio = int(NextToken or 0)
+        pagina = {'Topics': [{'TopicArn': arn} for arn in arns[inicio:inicio + TAMANHO_PAGINA_TOPICOS]]}
+        if inicio + TAMANHO_PAGINA_TOPICOS < len(arns):
+            pagina['NextToken'] = str(inicio + TAMANHO_PAGINA_TOPICOS)
+        return pagina
+
+    def get_paginator(self, operacao):
+        if operacao != 'list_topics':
+            raise NotImplementedError(f'Paginador {operacao} não existe no SNS em memória')
+        return Paginador(self.list_topics)
+
+    def subscribe(self, TopicArn, Protocol, Endpoint, **kwargs):
+        self._contar('subscribe')
+        topico = self._topico(TopicArn)
+        arn = f'{TopicArn}:{uuid.uuid4()}'
+        with self._lock:
+            topico['assinaturas'].append({'SubscriptionArn': arn, 'Protocol': Protocol, 'Endpoint': Endpoint})
+        return {'SubscriptionArn': arn}
+
+    def publish(self, TopicArn, Message, Subject=None, MessageAttributes=None, **kwargs):
+        topico = self._topico(TopicArn)
+        message_id = str(uuid.uuid4())
+        with self._lock:
+            self.estatisticas['publish'] += 1
+            self.estatisticas['mensagens'] += 1
+            self.mensagens.append({
+                'MessageId': message_id,
+                'topico': topico['nome'],
+                'assunto': Subject,
+                'mensagem': Message,
+                'atributos': {
+                    nome: atributo.get('StringValue')
+                    for nome, atributo in (MessageAttributes or {}).items()
+                },
+                'momento': time.time(),
+            })
+        return {'MessageId': message_id}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries, **kwargs):
+        if len(PublishBatchRequestEntries) > 10:
+            raise ErroAWS('TooManyEntriesInBatchRequest', 'The batch request contains more entries than permissible.')
+        self._contar('publish_batch')
+        sucesso = []
+        for entrada in PublishBatchRequestEntries:
+            resposta = self.publish(
+                TopicArn,
+                entrada['Message'],
+                entrada.get('Subject'),
+                entrada.get('MessageAttributes'),
+            )
+            sucesso.append({'Id': entrada['Id'], 'MessageId': resposta['MessageId']})
+        return {'Successful': sucesso, 'Failed': []}
+
+    def ultimas_mensagens(self, quantidade=50):
+        with self._lock:
+            return list(self.mensagens)[-quantidade:]
+
+
+class SQSMemoria:
+    """Filas SQS em memória, identificadas pelo último trecho da QueueUrl."""
+
+    def __init__(self, max_recebimentos=3):
+        self._lock = threading.Lock()
+        self.filas = {}  # nome -> queue.Queue de mensagens
+        self.dlq = deque(maxlen=1000)
+        self.max_recebimentos = max_recebimentos
+        self.estatisticas = {'enviadas': 0, 'chamadas_batch': 0, 'recebidas': 0, 'devolvidas': 0, 'dlq': 0}
+
+    @staticmethod
+    def nome_fila(queue_url):
+        return queue_url.rstrip('/').rsplit('/', 1)[-1]
+
+    def fila(self, nome):
+        with self._lock:
+            return self.filas.setdefault(nome, queue.Queue())
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        mensagem = {
+            'messageId': str(uuid.uuid4()),
+            'receiptHandle': str(uuid.uuid4()),
+            'body': MessageBody,
+            'md5OfBody': hashlib.md5(MessageBody.encode()).hexdigest(),
+            'recebimentos': 0,
+        }
+        self.fila(self.nome_fila(QueueUrl)).put(mensagem)
+        with self._lock:
+            self.estatisticas['enviadas'] += 1
+        return {'MessageId': mensagem['messageId'], 'MD5OfMessageBody': mensagem['md5OfBody']}
+
+    def send_message_batch(self, QueueUrl, Entries, **kwargs):
+        if len(Entries) > 10:
+            raise ErroAWS('TooManyEntriesInBatchRequest', 'Maximum number of entries per request are 10.')
+        with self._lock:
+            self.estatisticas['chamadas_batch'] += 1
+        sucesso = []
+        for entrada in Entries:
+            resposta = self.send_message(QueueUrl, entrada['MessageBody'])
+            sucesso.append({'Id': entrada['Id'], **resposta})
+        return {'Successful': sucesso, 'Failed': []}
+
+    def receber(self, nome, maximo=10, espera=0.5):
+        """Lê até `maximo` mensagens, esperando no máximo `espera` segundos pela primeira."""
+        fila = self.fila(nome)
+        try:
+            mensagens = [fila.get(timeout=espera)]
+        except queue.Empty:
+            return []
+        while len(mensagens) < maximo:
+            try:
+                mensagens.append(fila.get_nowait())
+            except queue.Empty:
+                break
+        for mensagem in mensagens:
+            mensagem['recebimentos'] += 1
+        with self._lock:
+            self.estatisticas['recebidas'] += len(mensagens)
+        return mensagens
+
+    def devolver(self, nome, mensagem):
+        """Mensagem não processada volta para a fila (ou para a DLQ após max_recebimentos)."""
+        with self._lock:
+            if mensagem['recebimentos'] >= self.max_recebimentos:
+                self.estatisticas['dlq'] += 1
+                self.dlq.append(mensagem)
+                return
+            self.estatisticas['devolvidas'] += 1
+        self.fila(nome).put(mensagem)
+
+    def pendentes(self):
+        with self._lock:
+            return {nome: fila.qsize() for nome, fila in self.filas.items()}
+
+
+class LambdaMemoria:
+    """Cliente Lambda que entrega as invocações para o emulador."""
+
+    def __init__(self, invocar, invocar_assincrono):
+        self._invocar = invocar
+        self._invocar_assincrono = invocar_assincrono
+
+    def invoke(self, FunctionName, InvocationType='RequestResponse', Payload=b'{}', **kwargs):
+        if isinstance(Payload, str):
+            Payload = Payload.encode()
+        evento = json.loads(Payload or b'{}')
+        nome = FunctionName.rsplit(':', 1)[-1]
+        if InvocationType == 'Event':
+            self._invocar_assincrono(nome, evento)
+            return {'StatusCode': 202, 'Payload': io.BytesIO(b'')}
+        status, resultado = self._invocar(nome, evento)
+        resposta = {'StatusCode': 200, 'Payload': io.BytesIO(json.dumps(resultado).encode())}
+        if status != 200:
+            resposta['FunctionError'] = 'Unhandled'
+        return resposta
+
+
+class ContaAWS:
+    """Estado de todos os serviços em memória de uma execução do emulador."""
+
+    def __init__(self):
+        self.sns = SNSMemoria()
+        self.sqs = SQSMemoria()
+        self.lambda_ = None
+
+    def cliente(self, servico, *args, **kwargs):
+        if servico == 'sns':
+            return self.sns
+        if servico == 'sqs':
+            return self.sqs
+        if servico == 'lambda':
+            if self.lambda_ is None:
+                raise RuntimeError('O cliente Lambda em memória só existe com o emulador rodando')
+            return self.lambda_
+        raise NotImplementedError(f'Serviço {servico} não existe no emulador local')
+
+
+def instalar_boto3_falso(conta):
+    """Registra em sys.modules um `boto3` que devolve os clientes em memória da conta."""
+    excecoes = types.ModuleType('boto3.exceptions')
+    excecoes.Boto3Error = Boto3Error
+
+    boto3 = types.ModuleType('boto3')
+    boto3.__doc__ = 'boto3 em memória do emulador local (ver emuladorLocal/aws_falso.py)'
+    boto3.client = conta.cliente
+    boto3.exceptions = excecoes
+
+    sys.modules['boto3'] = boto3
+    sys.modules['boto3.exceptions'] = excecoes
+    return boto3
+
+
+# --- APIs HTTP, para clientes boto3 de verdade (o Django) -------------------
+
+_ids_requisicao = itertools.count(1)
+
+
+def responder_sqs(conta, alvo, corpo):
+    """
+    Atende uma chamada do protocolo JSON do SQS (cabeçalho X-Amz-Target).
+
+    Returns:
+        tuple: (status HTTP, dicionário de resposta)
+    """
+    operacao = alvo.rsplit('.', 1)[-1]
+    try:
+        if operacao == 'SendMessage':
+            return 200, conta.sqs.send_message(corpo['QueueUrl'], corpo['MessageBody'])
+        if operacao == 'SendMessageBatch':
+            return 200, conta.sqs.send_message_batch(corpo['QueueUrl'], corpo['Entries'])
+        if operacao == 'GetQueueUrl':
+            return 200, {'QueueUrl': f'http://localhost/{CONTA}/{corpo["QueueName"]}'}
+    except ErroAWS as e:
+        return 400, {'__type': f'com.amazonaws.sqs#{e.codigo}', 'message': e.mensagem}
+    return 400, {'__type': 'com.amazonaws.sqs#UnsupportedOperation', 'message': f'{operacao} não suportada'}
+
+
+def responder_sns(conta, parametros):
+    """
+    Atende uma chamada do protocolo query do SNS (formulário com Action=...).
+
+    Returns:
+        tuple: (status HTTP, XML de resposta)
+    """
+    acao = parametros.get('Action')
+    request_id = f'emulador-{next(_ids_requisicao)}'
+    metadados = f'<ResponseMetadata><RequestId>{request_id}</RequestId></ResponseMetadata>'
+    xmlns = 'xmlns="http://sns.amazonaws.com/doc/2010-03-31/"'
+    try:
+        if acao == 'Publish':
+            atributos = {}
+            for chave, valor in parametros.items():
+                # MessageAttributes.entry.N.Name / .Value.StringValue
+                if chave.startswith('MessageAttributes.entry.') and chave.endswith('.Name'):
+                    prefixo = chave[:-len('Name')]
+                    atributos[valor] = {'StringValue': parametros.get(prefixo + 'Value.StringValue')}
+            resposta = conta.sns.publish(
+                parametros['TopicArn'], parametros['Message'], parametros.get('Subject'), atributos
+            )
+            corpo = f'<PublishResult><MessageId>{resposta["MessageId"]}</MessageId></PublishResult>'
+        elif acao == 'ListTopics':
+            pagina = conta.sns.list_topics(parametros.get('NextToken'))
+            membros = ''.join(
+                f'<member><TopicArn>{escape(topico["TopicArn"])}</TopicArn></member>' for topico in pagina['Topics']
+            )
+            token = f'<NextToken>{pagina["NextToken"]}</NextToken>' if 'NextToken' in pagina else ''
+            corpo = f'<ListTopicsResult><Topics>{membros}</Topics>{token}</ListTopicsResult>'
+        elif acao == 'CreateTopic':
+            resposta = conta.sns.create_topic(parametros['Name'])
+            corpo = f'<CreateTopicResult><TopicArn>{escape(resposta["TopicArn"])}</TopicArn></CreateTopicResult>'
+        else:
+            raise ErroAWS('InvalidAction', f'{acao} não suportada pelo emulador')
+    except ErroAWS as e:
+        return 400, (
+            f'<ErrorResponse {xmlns}><Error><Type>Sender</Type><Code>{e.codigo}</Code>'
+            f'<Message>{escape(e.mensagem)}</Message></Error><RequestId>{request_id}</RequestId></ErrorResponse>'
+        )
+    return 200, f'<{acao}Response {xmlns}>{corpo}{metadados}</{acao}Response>'
@@ -0,0 +1,554 @@
+#!/usr/bin/env python
+"""
+Emulador local das Lambdas do Quitute nas Nuvens.
+
+Serve os `lambda_handler` de verdade (vendaProduto, subscribeEmail,
+simulaVendedor e enviaEmailInteressados) por HTTP, no formato das Function
+URLs, para rodar o sistema inteiro sem AWS:
+
+- Cada função tem containers independentes. Um container é uma importação
+  isolada do pacote da Lambda (variáveis de módulo e conexão RDS próprias)
+  com uma thread de execução, que atende uma invocação por vez.
+- A primeira invocação que não encontra container ocioso paga o cold start
+  (importação + --init-ms); as seguintes reaproveitam o container quente.
+  Containers ociosos por mais de --ocioso-s segundos são descartados.
+- Invocações além do limite de concorrência da função (--concorrencia) ou
+  da conta (--limite-conta) recebem 429, como no Lambda.
+- SNS, SQS e o cliente Lambda usados pelos handlers são substituídos pelos
+  serviços em memória de aws_falso.py. Mensagens enviadas à fila de
+  inscrição disparam subscribe_email em lotes, como o gatilho SQS.
+
+Os handlers usam SQL do MySQL (ON DUPLICATE KEY UPDATE, FOR UPDATE SKIP
+LOCKED), então o banco precisa ser um MySQL/MariaDB local com o schema do
+Django (python manage.py migrate), configurado pelas mesmas variáveis das
+Lambdas: DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_PORT.
+
+Uso:
+    python emuladorLocal/emulador.py --porta 9000 --concorrencia 10
+
+E no .env do Django:
+    VENDA_PRODUTOS_URL=http://localhost:9000/venda_produtos
+    SUBSCRIBE_EMAIL_URL=http://localhost:9000/subscribe_email
+    ENTREGA_PRODUTO_URL=http://localhost:9000/entrega_produto
+    AWS_ENDPOINT_URL_SNS=http://localhost:9000   (outbox de emails)
+    AWS_ENDPOINT_URL_SQS=http://localhost:9000   (com USE_SQS_TRIGGER=true)
+
+Métricas em GET /_emulador/metricas e emails publicados em GET /_emulador/emails.
+"""
+import argparse
+import importlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import aws_falso  # noqa: E402
+
+# nome da função -> (pasta do pacote, módulo do handler)
+FUNCOES = {
+    'venda_produtos': ('vendaProduto', 'venda_de_produtos'),
+    'subscribe_email': ('subscribeEmail', 'subscribe_email'),
+    'entrega_produto': ('simulaVendedor', 'simulador_vendedor'),
+    'envia_email_interessados': ('enviaEmailInteressados', 'envia_email_interessados'),
+}
+
+
+class Throttled(Exception):
+    """Limite de concorrência atingido (TooManyRequestsException)."""
+
+
+class TempoEsgotado(Exception):
+    """A invocação passou do timeout da função."""
+
+
+_import_lock = threading.Lock()
+
+
+def carregar_isolado(pasta, modulo):
+    """
+    Importa o handler de uma Lambda com módulos só dele.
+
+    Os pacotes têm módulos com o mesmo nome (rds_connection, sns_topic), e
+    cada container precisa do seu próprio estado de módulo, então a
+    importação é feita com esses nomes fora de sys.modules e o resultado é
+    removido de sys.modules em seguida.
+    """
+    caminho = os.path.join(RAIZ, pasta)
+    locais = {nome[:-3] for nome in os.listdir(caminho) if nome.endswith('.py')}
+    with _import_lock:
+        salvos = {nome: sys.modules.pop(nome) for nome in locais if nome in sys.modules}
+        sys.path.insert(0, caminho)
+        try:
+            handler = importlib.import_module(modulo)
+            carregados = {nome: sys.modules[nome] for nome in locais if nome in sys.modules}
+        finally:
+            sys.path.remove(caminho)
+            for nome in locais:
+                sys.modules.pop(nome, None)
+            sys.modules.update(salvos)
+    return handler, carregados
+
+
+class Contexto:
+    """Objeto `context` passado ao handler."""
+
+    def __init__(self, funcao, timeout):
+        self.function_name = funcao
+        self.function_version = '$LATEST'
+        self.invoked_function_arn = f'arn:aws:lambda:{aws_falso.REGIAO}:{aws_falso.CONTA}:function:{funcao}'
+        self.memory_limit_in_mb = 128
+        self.aws_request_id = str(uuid.uuid4())
+        self._prazo = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self):
+        return max(int((self._prazo - time.monotonic()) * 1000), 0)
+
+
+class Container:
+    """Um ambiente de execução: módulos próprios e uma thread que atende uma invocação por vez."""
+
+    _numeros = {}
+
+    def __init__(self, funcao, init_ms):
+        self.funcao = funcao
+        Container._numeros[funcao.nome] = numero = Container._numeros.get(funcao.nome, 0) + 1
+        self.nome = f'{funcao.nome}-{numero}'
+        inicio = time.perf_counter()
+        self.handler, self.modulos = carregar_isolado(funcao.pasta, funcao.modulo)
+        time.sleep(init_ms / 1000)
+        self.init_ms = (time.perf_counter() - inicio) * 1000
+        self.ultimo_uso = time.monotonic()
+        self.invocacoes = 0
+        self._fila = queue.Queue()
+        self._thread = threading.Thread(target=self._executar, name=self.nome, daemon=True)
+        self._thread.start()
+
+    def invocar(self, evento, timeout):
+        futuro = Future()
+        self._fila.put((evento, futuro))
+        try:
+            return futuro.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TempoEsgotado(f'Task timed out after {timeout:.2f} seconds')
+
+    def _executar(self):
+        while True:
+            tarefa = self._fila.get()
+            if tarefa is None:
+                break
+            evento, futuro = tarefa
+            self.invocacoes += 1
+            try:
+                futuro.set_result(self.handler.lambda_handler(evento, Contexto(self.funcao.nome, self.funcao.timeout)))
+            except BaseException as e:
+                futuro.set_exception(e)
+        # Fecha a conexão RDS do container, que pertence a esta thread
+        rds = self.modulos.get('rds_connection')
+        if rds is not None:
+            rds.descartar_conexao()
+
+    def encerrar(self):
+        self._fila.put(None)
+
+
+class Funcao:
+    """Containers, limite de concorrência e métricas de uma função."""
+
+    def __init__(self, emulador, nome, pasta, modulo, concorrencia, timeout):
+        self.emulador = emulador
+        self.nome = nome
+        self.pasta = pasta
+        self.modulo = modulo
+        self.concorrencia = concorrencia
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._ociosos = []  # pilha: o container usado por último é o próximo a ser usado
+        self.em_execucao = 0
+        self.containers = 0
+        self.metricas = {'invocacoes': 0, 'cold_starts': 0, 'throttles': 0, 'erros': 0, 'timeouts': 0}
+        self.duracoes = deque(maxlen=10000)
+        self.inits = deque(maxlen=1000)
+
+    def _contar(self, chave):
+        with self._lock:
+            self.metricas[chave] += 1
+
+    def _adquirir(self):
+        with self._lock:
+            if self.em_execucao >= self.concorrencia or not self.emulador.reservar_concorrencia():
+                self.metricas['throttles'] += 1
+                raise Throttled(f'Rate Exceeded: {self.nome}')
+            self.em_execucao += 1
+            if self._ociosos:
+                return self._ociosos.pop(), False
+            self.containers += 1
+            self.metricas['cold_starts'] += 1
+        try:
+            container = Container(self, self.emulador.init_ms)
+        except BaseException:
+            with self._lock:
+                self.em_execucao -= 1
+                self.containers -= 1
+            self.emulador.liberar_concorrencia()
+            raise
+        self.inits.append(container.init_ms)
+        return container, True
+
+    def _liberar(self, container, reaproveitar):
+        with self._lock:
+            self.em_execucao -= 1
+            if reaproveitar:
+                container.ultimo_uso = time.monotonic()
+                self._ociosos.append(container)
+            else:
+                self.containers -= 1
+        self.emulador.liberar_concorrencia()
+        if not reaproveitar:
+            container.encerrar()
+
+    def invocar(self, evento):
+        """
+        Executa o handler em um container, criando um se necessário.
+
+        Returns:
+            tuple: (resultado do handler, True se foi cold start)
+        """
+        container, frio = self._adquirir()
+        self._contar('invocacoes')
+        inicio = time.perf_counter()
+        reaproveitar = True
+        try:
+            return container.invocar(evento, self.timeout), frio
+        except TempoEsgotado:
+            # Como no Lambda, o ambiente que estourou o timeout não é reaproveitado
+            reaproveitar = False
+            self._contar('timeouts')
+            raise
+        except Exception:
+            self._contar('erros')
+            raise
+        finally:
+            self.duracoes.append((time.perf_counter() - inicio) * 1000)
+            self._liberar(container, reaproveitar)
+
+    def reciclar_ociosos(self, ocioso_s):
+        limite = time.monotonic() - ocioso_s
+        with self._lock:
+            expirados = [c for c in self._ociosos if c.ultimo_uso < limite]
+            self._ociosos = [c for c in self._ociosos if c.ultimo_uso >= limite]
+            self.containers -= len(expirados)
+        for container in expirados:
+            container.encerrar()
+        return len(expirados)
+
+    def encerrar(self):
+        with self._lock:
+            ociosos, self._ociosos = self._ociosos, []
+        for container in ociosos:
+            container.encerrar()
+
+    def resumo(self):
+        duracoes = sorted(self.duracoes)
+
+        def percentil(p):
+            return round(duracoes[min(int(len(duracoes) * p), len(duracoes) - 1)], 1) if duracoes else None
+
+        with self._lock:
+            dados = dict(self.metricas)
+            dados.update({
+                'containers': self.containers,
+                'ociosos': len(self._ociosos),
+                'em_execucao': self.em_execucao,
+                'concorrencia': self.concorrencia,
+            })
+        dados['duracao_ms'] = {'p50': percentil(0.50), 'p95': percentil(0.95), 'p99': percentil(0.99)}
+        dados['init_medio_ms'] = round(sum(self.inits) / len(self.inits), 1) if self.inits else None
+        return dados
+
+
+class Emulador:
+    """Funções, serviços AWS em memória, invocações assíncronas e gatilhos SQS."""
+
+    def __init__(self, concorrencia, limite_conta, timeout, init_ms, ocioso_s, gatilhos):
+        self.init_ms = init_ms
+        self.ocioso_s = ocioso_s
+        self.limite_conta = limite_conta
+        self._em_execucao_conta = 0
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+
+        self.conta = aws_falso.ContaAWS()
+        self.conta.lambda_ = aws_falso.LambdaMemoria(self.invocar_evento, self.invocar_assincrono)
+        aws_falso.instalar_boto3_falso(self.conta)
+
+        self.funcoes = {
+            nome: Funcao(self, nome, pasta, modulo, concorrencia, timeout)
+            for nome, (pasta, modulo) in FUNCOES.items()
+        }
+        self.assincronas = queue.Queue()
+        self.metricas_assincronas = {'enfileiradas': 0, 'entregues': 0, 'reenvios': 0, 'descartadas': 0}
+        self.gatilhos = gatilhos  # nome da fila -> função
+
+        threads = [self._reciclar, *[self._despachar_assincronas] * 4]
+        threads += [lambda fila=fila, funcao=funcao: self._consumir_fila(fila, funcao) for fila, funcao in gatilhos.items()]
+        for alvo in threads:
+            threading.Thread(target=alvo, daemon=True).start()
+
+    def reservar_concorrencia(self):
+        with self._lock:
+            if self._em_execucao_conta >= self.limite_conta:
+                return False
+            self._em_execucao_conta += 1
+            return True
+
+    def liberar_concorrencia(self):
+        with self._lock:
+            self._em_execucao_conta -= 1
+
+    def funcao(self, nome):
+        funcao = self.funcoes.get(nome)
+        if funcao is None:
+            raise KeyError(f'Function not found: {nome}')
+        return funcao
+
+    def invocar_evento(self, nome, evento):
+        """Invocação síncrona pelo cliente Lambda em memória. Returns: (status, resultado)."""
+        try:
+            resultado, _ = self.funcao(nome).invocar(evento)
+            return 200, resultado
+        except Exception as e:
+            return 500, {'errorMessage': str(e), 'errorType': type(e).__name__}
+
+    def invocar_assincrono(self, nome, evento):
+        """InvocationType='Event': entra na fila interna e é entregue em segundo plano."""
+        self.funcao(nome)
+        with self._lock:
+            self.metricas_assincronas['enfileiradas'] += 1
+        self.assincronas.put((nome, evento, 0))
+
+    def _despachar_assincronas(self):
+        while not self._parar.is_set():
+            try:
+                nome, evento, tentativas = self.assincronas.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self.funcao(nome).invocar(evento)
+                chave = 'entregues'
+            except Throttled:
+                # Throttle em invocação assíncrona não conta como tentativa
+                time.sleep(0.1)
+                self.assincronas.put((nome, evento, tentativas))
+                continue
+            except Exception as e:
+                print(f"❌ Invocação assíncrona de {nome} falhou (tentativa {tentativas + 1}): {e}")
+                if tentativas < 2:
+                    self.assincronas.put((nome, evento, tentativas + 1))
+                    chave = 'reenvios'
+                else:
+                    chave = 'descartadas'
+            with self._lock:
+                self.metricas_assincronas[chave] += 1
+
+    def _consumir_fila(self, fila, nome):
+        """Gatilho SQS: entrega lotes de até 10 mensagens e devolve as de batchItemFailures."""
+        funcao = self.funcao(nome)
+        while not self._parar.is_set():
+            mensagens = self.conta.sqs.receber(fila, maximo=10, espera=0.5)
+            if not mensagens:
+                continue
+            evento = {'Records': [
+                {
+                    'messageId': mensagem['messageId'],
+                    'receiptHandle': mensagem['receiptHandle'],
+                    'body': mensagem['body'],
+                    'attributes': {'ApproximateReceiveCount': str(mensagem['recebimentos'])},
+                    'md5OfBody': mensagem['md5OfBody'],
+                    'eventSource': 'aws:sqs',
+                    'eventSourceARN': f'arn:aws:sqs:{aws_falso.REGIAO}:{aws_falso.CONTA}:{fila}',
+                    'awsRegion': aws_falso.REGIAO,
+                }
+                for mensagem in mensagens
+            ]}
+            try:
+                resultado, _ = funcao.invocar(evento)
+                falhas = {f['itemIdentifier'] for f in (resultado or {}).get('batchItemFailures', [])}
+            except Exception as e:
+                if not isinstance(e, Throttled):
+                    print(f"❌ Gatilho SQS {fila} -> {nome} falhou: {e}")
+                falhas = {mensagem['messageId'] for mensagem in mensagens}
+                time.sleep(0.1)
+            for mensagem in mensagens:
+                if mensagem['messageId'] in falhas:
+                    self.conta.sqs.devolver(fila, mensagem)
+
+    def _reciclar(self):
+        while not self._parar.wait(min(self.ocioso_s, 5)):
+            for funcao in self.funcoes.values():
+                reciclados = funcao.reciclar_ociosos(self.ocioso_s)
+                if reciclados:
+                    print(f"♻️ {reciclados} container(s) ocioso(s) de {funcao.nome} descartado(s)")
+
+    def metricas(self):
+        with self._lock:
+            assincronas = dict(self.metricas_assincronas)
+            em_execucao = self._em_execucao_conta
+        assincronas['pendentes'] = self.assincronas.qsize()
+        return {
+            'funcoes': {nome: funcao.resumo() for nome, funcao in self.funcoes.items()},
+            'conta': {'em_execucao': em_execucao, 'limite': self.limite_conta},
+            'invocacoes_assincronas': assincronas,
+            'sns': dict(self.conta.sns.estatisticas),
+            'sqs': {**self.conta.sqs.estatisticas, 'pendentes': self.conta.sqs.pendentes()},
+        }
+
+    def encerrar(self):
+        self._parar.set()
+        for funcao in self.funcoes.values():
+            funcao.encerrar()
+
+
+def evento_function_url(metodo, caminho, consulta, cabecalhos, corpo):
+    """Monta o evento no formato 2.0 das Lambda Function URLs."""
+    agora = time.time()
+    return {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': caminho,
+        'rawQueryString': consulta,
+        'headers': {chave.lower(): valor for chave, valor in cabecalhos.items()},
+        'requestContext': {
+            'http': {'method': metodo, 'path': caminho, 'protocol': 'HTTP/1.1', 'sourceIp': '127.0.0.1'},
+            'requestId': str(uuid.uuid4()),
+            'time': time.strftime('%d/%b/%Y:%H:%M:%S +0000', time.gmtime(agora)),
+            'timeEpoch': int(agora * 1000),
+        },
+        'body': corpo,
+        'isBase64Encoded': False,
+    }
+
+
+class Requisicao(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    emulador = None
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, status, corpo, tipo='application/json', cabecalhos=None):
+        dados = corpo if isinstance(corpo, bytes) else corpo.encode()
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(dados)))
+        for chave, valor in (cabecalhos or {}).items():
+            self.send_header(chave, valor)
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def _json(self, status, dados):
+        self._responder(status, json.dumps(dados, ensure_ascii=False, default=str))
+
+    def do_GET(self):
+        caminho = urlsplit(self.path).path
+        if caminho == '/_emulador/metricas':
+            return self._json(200, self.emulador.metricas())
+        if caminho == '/_emulador/emails':
+            return self._json(200, self.emulador.conta.sns.ultimas_mensagens())
+        return self._function_url('GET')
+
+    def do_POST(self):
+        self._function_url('POST')
+
+    def _function_url(self, metodo):
+        partes = urlsplit(self.path)
+        tamanho = int(self.headers.get('Content-Length') or 0)
+        corpo = self.rfile.read(tamanho).decode() if tamanho else ''
+
+        # APIs da AWS para clientes boto3 de verdade (endpoint_url = emulador)
+        if partes.path == '/' and self.headers.get('X-Amz-Target', '').startswith('AmazonSQS.'):
+            status, dados = aws_falso.responder_sqs(self.emulador.conta, self.headers['X-Amz-Target'], json.loads(corpo or '{}'))
+            return self._responder(status, json.dumps(dados), 'application/x-amz-json-1.0')
+        if partes.path == '/' and 'Action=' in corpo:
+            status, xml = aws_falso.responder_sns(self.emulador.conta, dict(parse_qsl(corpo)))
+            return self._responder(status, xml, 'text/xml')
+
+        nome = partes.path.strip('/').split('/', 1)[0]
+        try:
+            funcao = self.emulador.funcao(nome)
+        except KeyError as e:
+            return self._json(404, {'Message': str(e)})
+
+        evento = evento_function_url(metodo, partes.path, partes.query, dict(self.headers), corpo)
+        try:
+            resultado, frio = funcao.invocar(evento)
+        except Throttled:
+            return self._json(429, {'Message': 'Rate Exceeded.'})
+        except TempoEsgotado as e:
+            return self._json(502, {'Message': str(e)})
+        except Exception as e:
+            print(f"❌ {nome} levantou {type(e).__name__}: {e}")
+            return self._json(502, {'Message': 'Internal Server Error', 'errorType': type(e).__name__})
+
+        cabecalhos = {'X-Emulador-Cold-Start': str(frio).lower()}
+        if isinstance(resultado, dict) and 'statusCode' in resultado:
+            cabecalhos.update(resultado.get('headers') or {})
+            tipo = cabecalhos.pop('Content-Type', 'application/json')
+            corpo_resposta = resultado.get('body', '')
+            if not isinstance(corpo_resposta, str):
+                corpo_resposta = json.dumps(corpo_resposta)
+            return self._responder(int(resultado['statusCode']), corpo_resposta, tipo, cabecalhos)
+        return self._responder(200, json.dumps(resultado), cabecalhos=cabecalhos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=9000)
+    parser.add_argument('--concorrencia', type=int, default=10,
+                        help='invocações simultâneas por função (reserved concurrency)')
+    parser.add_argument('--limite-conta', type=int, default=1000,
+                        help='invocações simultâneas somando todas as funções')
+    parser.add_argument('--timeout', type=float, default=30.0, help='timeout de cada função, em segundos')
+    parser.add_argument('--init-ms', type=float, default=250.0,
+                        help='atraso extra de cold start, além da importação real do handler')
+    parser.add_argument('--ocioso-s', type=float, default=300.0,
+                        help='segundos até um container ocioso ser descartado')
+    parser.add_argument('--gatilho-sqs', action='append', default=[], metavar='FILA=FUNCAO',
+                        help='liga uma fila SQS em memória a uma função (padrão: subscribe-email=subscribe_email)')
+    args = parser.parse_args()
+
+    os.environ.setdefault('AWS_DEFAULT_REGION', aws_falso.REGIAO)
+    gatilhos = dict(gatilho.split('=', 1) for gatilho in args.gatilho_sqs) or {'subscribe-email': 'subscribe_email'}
+
+    emulador = Emulador(args.concorrencia, args.limite_conta, args.timeout, args.init_ms, args.ocioso_s, gatilhos)
+    Requisicao.emulador = emulador
+    servidor = ThreadingHTTPServer((args.host, args.porta), Requisicao)
+    servidor.daemon_threads = True
+
+    print(f"🚀 Emulador de Lambdas em http://{args.host}:{args.porta}")
+    for nome in emulador.funcoes:
+        print(f"   POST http://{args.host}:{args.porta}/{nome}")
+    for fila, nome in gatilhos.items():
+        print(f"   fila SQS {fila} -> {nome}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        emulador.encerrar()
+        print("Emulador encerrado")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Benchmark de vazão da Lambda envia_email_interessados.
+
+Cria uma lista de espera sintética (100 mil pedidos por padrão) para um
+produto, reabastece o estoque com unidades suficientes para atender a fila
+inteira e mede quanto tempo a Lambda leva para atendê-la com diferentes
+tamanhos de chunk. Por padrão o SNS é substituído por um cliente falso com
+latência configurável, para medir só o caminho do banco e dos lotes; use
+--sns-real para publicar de verdade.
+
+Precisa de um MySQL com o schema do Django (python manage.py migrate) e das
+mesmas variáveis de ambiente da Lambda: DB_HOST, DB_USER, DB_PASSWORD, DB_NAME.
+
+Uso:
+    python enviaEmailInteressados/benchmark_interessados.py --pedidos 100000 --chunks 100,500,2000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pymysql
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rds_connection  # noqa: E402
+import sns_topic  # noqa: E402
+import envia_email_interessados  # noqa: E402
+
+
+class SNSFalso:
+    """Cliente SNS que só conta as chamadas e simula a latência do publish_batch."""
+
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        with self._lock:
+            self.chamadas += 1
+        time.sleep(self.latencia)
+        return {'Successful': [{'Id': entrada['Id']} for entrada in PublishBatchRequestEntries], 'Failed': []}
+
+
+def conectar():
+    return pymysql.connect(
+        host=rds_connection.host,
+        user=rds_connection.user,
+        password=rds_connection.password,
+        database=rds_connection.database,
+        port=rds_connection.port
+    )
+
+
+def preparar_fila(produto_id, pedidos, semente=42):
+    """
+    Recria o produto e a lista de espera sintética.
+
+    Returns:
+        int: soma das quantidades pedidas (estoque necessário para atender todos)
+    """
+    aleatorio = random.Random(semente)
+    inicio = datetime(2025, 1, 1)
+    linhas = [
+        (f'espera-{i}@example.com', produto_id, aleatorio.randint(1, 3), False,
+         inicio + timedelta(milliseconds=i))
+        for i in range(pedidos)
+    ]
+    demanda = sum(linha[2] for linha in linhas)
+
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM consumidor_notificacao WHERE item_id = %s", (produto_id,))
+            cursor.execute(
+                """
+                INSERT INTO consumidor_item (id, nome, quantidade_estoque, disponivel)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE quantidade_estoque = VALUES(quantidade_estoque), disponivel = TRUE
+                """,
+                (produto_id, 'produto benchmark', demanda, True)
+            )
+            for i in range(0, len(linhas), 5000):
+                cursor.executemany(
+                    """
+                    INSERT INTO consumidor_notificacao (email_cliente, item_id, quantidade, notificado, data_criacao)
+                    VALUES (%s, %s, %s, %s, %s)
+                    """,
+                    linhas[i:i + 5000]
+                )
+        connection.commit()
+    finally:
+        connection.close()
+    return demanda
+
+
+def pendentes(produto_id):
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM consumidor_notificacao WHERE item_id = %s AND notificado = FALSE",
+                (produto_id,)
+            )
+            return cursor.fetchone()[0]
+    finally:
+        connection.close()
+
+
+def executar(tamanho_chunk, args):
+    demanda = preparar_fila(args.produto_id, args.pedidos)
+    sns = SNSFalso(args.latencia_sns / 1000)
+    if not args.sns_real:
+        sns_topic._sns_client = sns
+
+    inicio = time.perf_counter()
+    resultado = envia_email_interessados.notificar_interessados(args.produto_id, tamanho_chunk)
+    duracao = time.perf_counter() - inicio
+
+    return {
+        'tamanho_chunk': tamanho_chunk,
+        'pedidos': args.pedidos,
+        'estoque': demanda,
+        'notificados': resultado['notificados'],
+        'falhas': resultado['falhas'],
+        'pendentes_apos': pendentes(args.produto_id),
+        'chunks': resultado['chunks'],
+        'chamadas_publish_batch': sns.chamadas if not args.sns_real else None,
+        'duracao_s': round(duracao, 3),
+        'notificacoes_por_segundo': round(resultado['notificados'] / duracao, 1) if duracao else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pedidos', type=int, default=100_000)
+    parser.add_argument('--chunks', default='100,500,2000',
+                        help='tamanhos de chunk a comparar, separados por vírgula')
+    parser.add_argument('--produto-id', type=int, default=9998)
+    parser.add_argument('--latencia-sns', type=float, default=20.0,
+                        help='latência simulada de cada publish_batch, em ms')
+    parser.add_argument('--sns-real', action='store_true',
+                        help='publica no tópico EnviaEmail de verdade')
+    args = parser.parse_args()
+
+    if not args.sns_real:
+        os.environ.setdefault('SNS_TOPIC_ARN_ENVIAEMAIL', 'arn:aws:sns:us-east-1:000000000000:EnviaEmail')
+
+    resultados = [executar(int(tamanho), args) for tamanho in args.chunks.split(',')]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print(f"Conexões RDS: {rds_connection.estatisticas_conexao()}")
+
+    if any(resultado['pendentes_apos'] for resultado in resultados):
+        print("❌ Pedidos ficaram sem notificação mesmo com estoque suficiente")
+        sys.exit(1)
+    print("✅ Lista de espera atendida por completo")
+
+
+if __name__ == '__main__':
+    main()
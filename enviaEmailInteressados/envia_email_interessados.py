@@ -0,0 +1,264 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+
+from rds_connection import conexao, estatisticas_conexao
+from sns_topic import obter_cliente_sns, resolver_topic_arn, invalidar_topico
+
+# Quantas linhas da lista de espera são reivindicadas (e travadas) por transação
+TAMANHO_CHUNK = int(os.getenv('NOTIFICACAO_CHUNK', '500'))
+
+# Limite do publish_batch do SNS
+TAMANHO_LOTE_SNS = 10
+
+# Os lotes de um chunk são publicados em paralelo. O pool vive no módulo para
+# que suas threads sejam reaproveitadas entre invocações do container quente.
+SNS_MAX_WORKERS = int(os.getenv('SNS_MAX_WORKERS', '8'))
+_executor = ThreadPoolExecutor(max_workers=SNS_MAX_WORKERS)
+
+
+def montar_email(nome, quantidade):
+    """Assunto e mensagem do aviso de produto disponível."""
+    subject = f'{nome} está disponível novamente!'[:100]
+    message = f"""
+Olá,
+
+O produto que você estava esperando voltou ao estoque!
+
+Detalhes:
+- Produto: {nome}
+- Quantidade desejada: {quantidade}
+
+Faça sua reserva pelo site antes que acabe.
+
+Atenciosamente,
+Quitute nas Nuvens
+"""
+    return subject, message
+
+
+def reivindicar_chunk(cursor, produto_id, cursor_fila, tamanho):
+    """
+    Trava o próximo chunk de pedidos pendentes do produto, em ordem de chegada.
+
+    A paginação é por (data_criacao, id), então pedidos que ficaram de fora da
+    alocação não são lidos de novo. Com SKIP LOCKED, duas invocações para o
+    mesmo produto dividem a fila em vez de esperar uma pela outra.
+    """
+    data_criacao, ultimo_id = cursor_fila
+    if data_criacao is None:
+        cursor.execute(
+            """
+            SELECT id, email_cliente, quantidade, data_criacao
+            FROM consumidor_notificacao
+            WHERE item_id = %s AND notificado = FALSE
+            ORDER BY data_criacao, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (produto_id, tamanho)
+        )
+    else:
+        cursor.execute(
+            """
+            SELECT id, email_cliente, quantidade, data_criacao
+            FROM consumidor_notificacao
+            WHERE item_id = %s AND notificado = FALSE
+              AND (data_criacao > %s OR (data_criacao = %s AND id > %s))
+            ORDER BY data_criacao, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+            """,
+            (produto_id, data_criacao, data_criacao, ultimo_id, tamanho)
+        )
+    return cursor.fetchall()
+
+
+def alocar(linhas, estoque):
+    """
+    Distribui o estoque entre os pedidos na ordem da fila (first-fit).
+
+    Um pedido é atendido se a quantidade desejada cabe no estoque restante;
+    pedidos maiores continuam na fila e os seguintes ainda podem ser atendidos.
+
+    Returns:
+        tuple: (linhas atendidas, estoque restante)
+    """
+    atendidas = []
+    for linha in linhas:
+        if estoque <= 0:
+            break
+        quantidade = linha[2]
+        if quantidade <= estoque:
+            atendidas.append(linha)
+            estoque -= quantidade
+    return atendidas, estoque
+
+
+def publicar_lote(sns, topic_arn, nome, linhas):
+    """
+    Publica até 10 emails com uma chamada `publish_batch`.
+
+    O email do cliente vai no atributo `email` da mensagem, para que a
+    assinatura do tópico possa filtrar por destinatário.
+
+    Returns:
+        list: ids das notificações publicadas com sucesso
+    """
+    entradas = []
+    for notificacao_id, email, quantidade, _ in linhas:
+        subject, message = montar_email(nome, quantidade)
+        entradas.append({
+            'Id': str(notificacao_id),
+            'Subject': subject,
+            'Message': message,
+            'MessageAttributes': {
+                'email': {'DataType': 'String', 'StringValue': email}
+            }
+        })
+
+    try:
+        response = sns.publish_batch(TopicArn=topic_arn, PublishBatchRequestEntries=entradas)
+    except Exception as e:
+        print(f"❌ Erro ao publicar lote de {len(entradas)} emails: {e}")
+        return []
+
+    falhas = response.get('Failed', [])
+    if falhas:
+        print(f"⚠️ {len(falhas)} emails recusados pelo SNS no lote: {falhas}")
+    return [int(entrada['Id']) for entrada in response.get('Successful', [])]
+
+
+def notificar_interessados(produto_id, tamanho_chunk=TAMANHO_CHUNK):
+    """
+    Atende a lista de espera de um produto que voltou ao estoque.
+
+    Cada chunk é reivindicado, publicado e marcado como notificado na mesma
+    transação: se a Lambda cair no meio, as linhas não confirmadas voltam a
+    ficar pendentes.
+
+    Returns:
+        dict: contagem de notificados, falhas e estoque não alocado
+    """
+    sns = obter_cliente_sns()
+    topic_arn = resolver_topic_arn('EnviaEmail', sns)
+
+    resultado = {'produto_id': produto_id, 'notificados': 0, 'falhas': 0, 'chunks': 0}
+
+    with conexao() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nome, quantidade_estoque FROM consumidor_item WHERE id = %s",
+                (produto_id,)
+            )
+            item = cursor.fetchone()
+        connection.commit()
+
+        if not item:
+            resultado['erro'] = f'Produto com ID {produto_id} não encontrado.'
+            return resultado
+
+        nome, estoque = item
+        cursor_fila = (None, None)
+
+        while estoque > 0:
+            with connection.cursor() as cursor:
+                linhas = reivindicar_chunk(cursor, produto_id, cursor_fila, tamanho_chunk)
+                if not linhas:
+                    connection.commit()
+                    break
+
+                resultado['chunks'] += 1
+                cursor_fila = (linhas[-1][3], linhas[-1][0])
+                atendidas, estoque = alocar(linhas, estoque)
+
+                lotes = [atendidas[i:i + TAMANHO_LOTE_SNS] for i in range(0, len(atendidas), TAMANHO_LOTE_SNS)]
+                publicadas = [
+                    notificacao_id
+                    for ids in _executor.map(lambda lote: publicar_lote(sns, topic_arn, nome, lote), lotes)
+                    for notificacao_id in ids
+                ]
+
+                if publicadas:
+                    marcadores = ', '.join(['%s'] * len(publicadas))
+                    cursor.execute(
+                        f"UPDATE consumidor_notificacao SET notificado = TRUE WHERE id IN ({marcadores})",
+                        publicadas
+                    )
+            connection.commit()
+
+            resultado['notificados'] += len(publicadas)
+            # Pedidos que falharam continuam pendentes e serão atendidos no próximo reabastecimento
+            resultado['falhas'] += len(atendidas) - len(publicadas)
+
+            if len(linhas) < tamanho_chunk:
+                break
+
+    resultado['estoque_nao_alocado'] = max(estoque, 0)
+    return resultado
+
+
+def lambda_handler(event, context):
+    """
+    Envia emails para os clientes que aguardam produtos que voltaram ao estoque.
+
+    Aceita {"produto_id": 1} ou {"produto_ids": [1, 2, 3]} (invocação
+    assíncrona feita pelo simulador_vendedor).
+    """
+    print("Event received by Lambda function: " + json.dumps(event, indent=2))
+
+    if 'body' in event and event['body'] is not None:
+        log = json.loads(event['body'])
+    else:
+        log = event
+
+    produto_ids = log.get('produto_ids')
+    if produto_ids is None and log.get('produto_id') is not None:
+        produto_ids = [log['produto_id']]
+
+    if not produto_ids:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'message': 'produto_id ou produto_ids é obrigatório.'
+            })
+        }
+
+    resultados = []
+    try:
+        for produto_id in produto_ids:
+            resultado = notificar_interessados(produto_id)
+            print(f"📧 Lista de espera do produto {produto_id}: {resultado}")
+            resultados.append(resultado)
+    except pymysql.MySQLError as e:
+        print(f"Erro ao acessar RDS: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'message': f'Erro ao acessar o banco: {str(e)}',
+                'resultados': resultados
+            })
+        }
+    except Exception as e:
+        print(f"Erro inesperado: {e}")
+        # O tópico pode ter sido recriado: a próxima invocação resolve o ARN de novo
+        invalidar_topico('EnviaEmail')
+        return {
+            'statusCode': 500,
+            'body': json.dumps({
+                'message': f'Erro ao notificar interessados: {str(e)}',
+                'resultados': resultados
+            })
+        }
+    finally:
+        print(f"Conexões RDS: {estatisticas_conexao()}")
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Interessados notificados com sucesso!',
+            'resultados': resultados
+        })
+    }
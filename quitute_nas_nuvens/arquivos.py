@@ -0,0 +1,258 @@
+"""
+Arquivos estáticos e de mídia em produção (DEBUG=false).
+
+`collectstatic` grava os estáticos com o hash do conteúdo no nome
+(ManifestStaticFilesStorage) e, ao lado de cada um, versões .gz e .br já
+comprimidas (o .br só com o pacote brotli instalado). Como o nome muda a
+cada alteração, os arquivos com hash são servidos com cache "immutable" de
+um ano; a view escolhe a versão comprimida pelo Accept-Encoding, sem
+comprimir nada durante a requisição.
+
+As mídias (imagens dos quitutes e seus derivados) mantêm o nome, então têm
+cache de ARQUIVOS_MEDIA_MAX_AGE segundos e respondem a If-Modified-Since
+(304) e a Range (206), para downloads retomados e leitura parcial.
+
+Sob ASGI os bytes saem de um gerador assíncrono (cada leitura em uma thread),
+porque o handler ASGI do Django carregaria um iterador síncrono inteiro na
+memória antes de enviar; no WSGI continuam FileResponse e o gerador síncrono.
+
+Com um proxy na frente (ARQUIVOS_OFFLOAD), o Django só valida o caminho e
+monta os cabeçalhos; o envio dos bytes fica com o proxy:
+
+    x-accel-redirect  nginx: ARQUIVOS_ACCEL_PREFIXO + static/ ou media/ + caminho,
+                      servido por uma location `internal` com alias para a pasta
+    x-sendfile        Apache (mod_xsendfile) e outros: caminho absoluto do arquivo
+"""
+
+import gzip
+import mimetypes
+import os
+from functools import cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import content_disposition_header, http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CACHE_IMUTAVEL = 'public, max-age=31536000, immutable'
+BLOCO_LEITURA = 64 * 1024
+
+
+class EstaticosComprimidos(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que também grava as versões .gz e .br dos arquivos com hash."""
+
+    extensoes_comprimiveis = ('.css', '.js', '.mjs', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+                              '.ico', '.ttf', '.otf', '.eot', '.wasm')
+    # Abaixo disso o cabeçalho de compressão come o ganho
+    tamanho_minimo = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for nome in set(self.hashed_files.values()):
+            if nome.endswith(self.extensoes_comprimiveis):
+                self.comprimir(nome)
+
+    def comprimir(self, nome):
+        with self.open(nome) as arquivo:
+            dados = arquivo.read()
+        if len(dados) < self.tamanho_minimo:
+            return
+        versoes = {'.gz': gzip.compress(dados, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            versoes['.br'] = brotli.compress(dados, quality=11)
+        for extensao, comprimido in versoes.items():
+            # Só vale a pena se economizar pelo menos 5%
+            if len(comprimido) < len(dados) * 0.95:
+                if self.exists(nome + extensao):
+                    self.delete(nome + extensao)
+                self._save(nome + extensao, ContentFile(comprimido))
+
+
+@cache
+def nomes_com_hash():
+    """Nomes com hash do manifest do collectstatic (vazio sem ManifestStaticFilesStorage)."""
+    return frozenset(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def intervalo_pedido(cabecalho, tamanho):
+    """
+    Interpreta um cabeçalho Range de um único intervalo de bytes.
+
+    Returns:
+        tuple (inicio, fim) inclusivo; None se o cabeçalho deve ser ignorado
+        (inválido ou com vários intervalos: responde o arquivo inteiro);
+        False se o intervalo está fora do arquivo (416).
+    """
+    unidade, _, especificacao = cabecalho.partition('=')
+    if unidade.strip().lower() != 'bytes' or ',' in especificacao:
+        return None
+    inicio, _, fim = especificacao.strip().partition('-')
+    try:
+        if not inicio:
+            # bytes=-N: os últimos N bytes
+            sufixo = int(fim)
+            if sufixo <= 0 or tamanho == 0:
+                return False
+            return max(tamanho - sufixo, 0), tamanho - 1
+        inicio = int(inicio)
+        fim = int(fim) if fim else tamanho - 1
+    except ValueError:
+        return None
+    if inicio >= tamanho:
+        return False
+    if fim < inicio:
+        return None
+    return inicio, min(fim, tamanho - 1)
+
+
+def ler_intervalo(caminho, inicio, tamanho):
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(inicio)
+        restante = tamanho
+        while restante > 0:
+            dados = arquivo.read(min(BLOCO_LEITURA, restante))
+            if not dados:
+                break
+            restante -= len(dados)
+            yield dados
+
+
+async def ler_intervalo_async(caminho, inicio, tamanho):
+    """Versão assíncrona de `ler_intervalo`: as leituras rodam fora do event loop."""
+    arquivo = await sync_to_async(open, thread_sensitive=False)(caminho, 'rb')
+    try:
+        arquivo.seek(inicio)
+        restante = tamanho
+        while restante > 0:
+            dados = await sync_to_async(arquivo.read, thread_sensitive=False)(min(BLOCO_LEITURA, restante))
+            if not dados:
+                break
+            restante -= len(dados)
+            yield dados
+    finally:
+        arquivo.close()
+
+
+def escolher_codificacao(request, caminho):
+    """
+    Versão pré-comprimida aceita pelo cliente, preferindo brotli.
+
+    Returns:
+        tuple: (caminho a enviar, Content-Encoding ou None, se há versões comprimidas)
+    """
+    aceitas = {
+        parte.split(';')[0].strip().lower()
+        for parte in request.headers.get('Accept-Encoding', '').split(',')
+    }
+    comprimido = False
+    for codificacao, extensao in (('br', '.br'), ('gzip', '.gz')):
+        if os.path.exists(caminho + extensao):
+            comprimido = True
+            if codificacao in aceitas:
+                return caminho + extensao, codificacao, True
+    return caminho, None, comprimido
+
+
+def servir_arquivo(request, raiz, caminho, cache_control, prefixo, comprimidos=False):
+    """
+    Responde com o arquivo `caminho` dentro de `raiz`.
+
+    Args:
+        raiz: pasta servida (STATIC_ROOT ou MEDIA_ROOT)
+        caminho: caminho relativo pedido na URL
+        cache_control: valor do cabeçalho Cache-Control
+        prefixo: subpasta da URL interna do X-Accel-Redirect ('static' ou 'media')
+        comprimidos: procura versões .br/.gz geradas pelo collectstatic
+    """
+    try:
+        completo = safe_join(raiz, caminho)
+    except SuspiciousFileOperation:
+        raise Http404('Arquivo não encontrado')
+    if not caminho or caminho.endswith(('.gz', '.br')) or not os.path.isfile(completo):
+        raise Http404('Arquivo não encontrado')
+
+    estado = os.stat(completo)
+    ultima_modificacao = http_date(estado.st_mtime)
+    if not was_modified_since(request.headers.get('If-Modified-Since'), estado.st_mtime):
+        resposta = HttpResponseNotModified()
+        resposta['Last-Modified'] = ultima_modificacao
+        resposta['Cache-Control'] = cache_control
+        return resposta
+
+    tipo, _ = mimetypes.guess_type(completo)
+    tipo = tipo or 'application/octet-stream'
+    offload = settings.ARQUIVOS_OFFLOAD
+    tem_versoes = False
+    if offload:
+        # O proxy cuida de Range e compressão (no nginx, gzip_static/brotli_static)
+        resposta = HttpResponse(content_type=tipo)
+        if offload == 'x-accel-redirect':
+            resposta['X-Accel-Redirect'] = f'{settings.ARQUIVOS_ACCEL_PREFIXO}{prefixo}/{caminho}'
+        else:
+            resposta['X-Sendfile'] = completo
+    else:
+        enviar, codificacao, tem_versoes = (
+            escolher_codificacao(request, completo) if comprimidos else (completo, None, False)
+        )
+        intervalo = None
+        cabecalho_range = request.headers.get('Range')
+        if cabecalho_range and codificacao is None and request.headers.get('If-Range', ultima_modificacao) == ultima_modificacao:
+            intervalo = intervalo_pedido(cabecalho_range, estado.st_size)
+        if intervalo is False:
+            resposta = HttpResponse(status=416)
+            resposta['Content-Range'] = f'bytes */{estado.st_size}'
+            return resposta
+        assincrono = isinstance(request, ASGIRequest)
+        if intervalo:
+            inicio, fim = intervalo
+            leitor = ler_intervalo_async if assincrono else ler_intervalo
+            resposta = StreamingHttpResponse(
+                leitor(completo, inicio, fim - inicio + 1), status=206, content_type=tipo
+            )
+            resposta['Content-Range'] = f'bytes {inicio}-{fim}/{estado.st_size}'
+            resposta['Content-Length'] = fim - inicio + 1
+        elif assincrono:
+            tamanho = os.path.getsize(enviar)
+            resposta = StreamingHttpResponse(ler_intervalo_async(enviar, 0, tamanho), content_type=tipo)
+            resposta['Content-Length'] = tamanho
+            resposta['Content-Disposition'] = content_disposition_header(False, os.path.basename(completo))
+        else:
+            resposta = FileResponse(open(enviar, 'rb'), content_type=tipo, filename=os.path.basename(completo))
+        if codificacao:
+            resposta['Content-Encoding'] = codificacao
+        else:
+            resposta['Accept-Ranges'] = 'bytes'
+
+    if tem_versoes:
+        resposta['Vary'] = 'Accept-Encoding'
+    resposta['Last-Modified'] = ultima_modificacao
+    resposta['Cache-Control'] = cache_control
+    return resposta
+
+
+@require_safe
+def servir_estatico(request, caminho):
+    """Arquivos do STATIC_ROOT; os que têm hash no nome ficam um ano no cache."""
+    cache_control = CACHE_IMUTAVEL if caminho in nomes_com_hash() else 'no-cache'
+    return servir_arquivo(request, settings.STATIC_ROOT, caminho, cache_control, 'static', comprimidos=True)
+
+
+@require_safe
+def servir_media(request, caminho):
+    """Arquivos do MEDIA_ROOT (imagens dos quitutes), com Range e If-Modified-Since."""
+    cache_control = f'public, max-age={settings.ARQUIVOS_MEDIA_MAX_AGE}'
+    return servir_arquivo(request, settings.MEDIA_ROOT, caminho, cache_control, 'media')
@@ -24,7 +24,7 @@ load_dotenv('.env')
 SECRET_KEY = "django-insecure-j_0&)3i7_l&creuh3s#xa%u0ss1k*m!bq_97-$g999jdm9ymk6"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.getenv('DEBUG', 'true').lower() == 'true'
 
 ALLOWED_HOSTS = ["*"]
 
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
+    "consumidor.sessao_cliente.SessaoClienteMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
@@ -75,6 +76,15 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "quitute_nas_nuvens.wsgi.application"
 
+# Usa as versões assíncronas das views de homepage, inscrição e reserva.
+# Só faz sentido servindo pelo ASGI (ex.: uvicorn quitute_nas_nuvens.asgi:application).
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'false').lower() == 'true'
+
+# Estoque ao vivo por SSE (consumidor/estoque_ao_vivo.py): intervalo entre as
+# consultas do monitor compartilhado e entre os keep-alives de cada conexão.
+ESTOQUE_SSE_INTERVALO = float(os.getenv('ESTOQUE_SSE_INTERVALO', '1.0'))
+ESTOQUE_SSE_KEEPALIVE = float(os.getenv('ESTOQUE_SSE_KEEPALIVE', '15'))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -105,6 +115,53 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Com REDIS_URL o cache é compartilhado entre os workers (precisa do pacote redis);
+# sem ela, cada processo mantém o seu próprio cache em memória.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "quitute-nas-nuvens",
+        }
+    }
+
+# Tempo (s) que uma versão renderizada do catálogo fica no cache. A chave inclui
+# a versão do catálogo, então este valor só limita quanto tempo versões antigas
+# ocupam memória.
+CATALOGO_CACHE_TIMEOUT = int(os.getenv('CATALOGO_CACHE_TIMEOUT', '3600'))
+
+
+# Sessões
+# O admin usa a sessão padrão no banco; o comprador (email e carrinho) usa a
+# sessão de consumidor/sessao_cliente.py: "cookie" (assinado), "cache" ou "db".
+CUSTOMER_SESSION_MODE = os.getenv('CUSTOMER_SESSION_MODE', 'cookie')
+CUSTOMER_SESSION_COOKIE_NAME = 'quitute_cliente'
+
+# Emails inscritos mantidos em memória por processo (consumidor/inscricoes.py),
+# para a homepage não consultar o banco a cada cliente que volta.
+INSCRITOS_CACHE_MAX = int(os.getenv('INSCRITOS_CACHE_MAX', '100000'))
+
+# Backend das vendas (consumidor/vendas.py): "lambda", "orm" (transação no
+# próprio Django) ou "failover" (Lambda, com desvio para o banco quando ela
+# não responde ou fica lenta). O disjuntor abre depois de
+# VENDAS_FALHAS_PARA_ABRIR chamadas seguidas acima de VENDAS_LATENCIA_MAX_MS
+# ou com falha, e fica aberto por VENDAS_CIRCUITO_ABERTO_S segundos.
+VENDAS_BACKEND = os.getenv('VENDAS_BACKEND', 'failover')
+VENDAS_LATENCIA_MAX_MS = float(os.getenv('VENDAS_LATENCIA_MAX_MS', '1500'))
+VENDAS_FALHAS_PARA_ABRIR = int(os.getenv('VENDAS_FALHAS_PARA_ABRIR', '5'))
+VENDAS_CIRCUITO_ABERTO_S = float(os.getenv('VENDAS_CIRCUITO_ABERTO_S', '30'))
+
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -142,11 +199,30 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 STATICFILES_DIRS = [BASE_DIR / "static"]
+STATIC_ROOT = os.getenv('STATIC_ROOT', BASE_DIR / "staticfiles")
 
 # Media files (User uploads)
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Em produção (DEBUG=false) o collectstatic grava os estáticos com hash no
+# nome e versões .gz/.br, e o próprio Django serve /static/ e /media/
+# (quitute_nas_nuvens/arquivos.py). Desligue SERVIR_ARQUIVOS se o proxy
+# servir as pastas direto. Com ARQUIVOS_OFFLOAD ("x-accel-redirect" para o
+# nginx ou "x-sendfile") o Django só responde os cabeçalhos e o proxy envia o
+# arquivo; no nginx, ARQUIVOS_ACCEL_PREFIXO aponta para locations internal.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage" if DEBUG
+        else "quitute_nas_nuvens.arquivos.EstaticosComprimidos",
+    },
+}
+SERVIR_ARQUIVOS = os.getenv('SERVIR_ARQUIVOS', 'true').lower() == 'true'
+ARQUIVOS_OFFLOAD = os.getenv('ARQUIVOS_OFFLOAD', '').lower()
+ARQUIVOS_ACCEL_PREFIXO = os.getenv('ARQUIVOS_ACCEL_PREFIXO', '/_arquivos/')
+ARQUIVOS_MEDIA_MAX_AGE = int(os.getenv('ARQUIVOS_MEDIA_MAX_AGE', '86400'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -16,14 +16,21 @@ Including another URLconf
 """
 
 from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import HomepageView, SubscribeView
+from .arquivos import servir_estatico, servir_media
+from .views import HomepageView, SubscribeView, AsyncHomepageView, AsyncSubscribeView
+
+# Com ASYNC_VIEWS=true, homepage e inscrição usam as views assíncronas
+homepage_view = AsyncHomepageView if settings.ASYNC_VIEWS else HomepageView
+subscribe_view = AsyncSubscribeView if settings.ASYNC_VIEWS else SubscribeView
 
 urlpatterns = [
-    path("", HomepageView.as_view(), name='homepage'),
-    path("subscribe/", SubscribeView.as_view(), name='subscribe'),
+    path("", homepage_view.as_view(), name='homepage'),
+    path("subscribe/", subscribe_view.as_view(), name='subscribe'),
     path("admin/", admin.site.urls),
     path("quitutes/", include("consumidor.urls")),
 ]
@@ -31,4 +38,10 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATICFILES_DIRS[0])
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+elif settings.SERVIR_ARQUIVOS:
+    # Produção: estáticos do collectstatic (com hash e pré-comprimidos) e mídias
+    urlpatterns += [
+        re_path(rf"^{re.escape(settings.STATIC_URL.lstrip('/'))}(?P<caminho>.*)$", servir_estatico),
+        re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<caminho>.*)$", servir_media),
+    ]
 
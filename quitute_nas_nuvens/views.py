@@ -4,8 +4,8 @@ Views principais do projeto Quitute nas Nuvens.
 
 from django.shortcuts import render, redirect
 from django.views import View
-from consumidor.models import Item, EmailSubscription
-from consumidor.lambda_integration import subscribe_email_to_sns
+from consumidor.inscricoes import inscritos, registrar_inscricao, aregistrar_inscricao
+from consumidor.models import Item
 
 
 class HomepageView(View):
@@ -13,7 +13,10 @@ class HomepageView(View):
     View da página inicial que captura o e-mail do comprador.
 
     GET: Exibe o formulário para entrada de e-mail
-    POST: Armazena o e-mail na sessão, inscreve no SNS e redireciona para lista de quitutes
+    POST: Armazena o e-mail na sessão, registra a inscrição no SNS e redireciona para lista de quitutes
+
+    A inscrição é feita em segundo plano pelo worker `inscrever_emails`, então
+    o redirecionamento não espera a Lambda subscribe_email.
     """
 
     template_name = 'items/homepage.html'
@@ -23,37 +26,20 @@ class HomepageView(View):
         return render(request, self.template_name)
 
     def post(self, request):
-        """Processa o formulário de e-mail e inscreve no SNS via Lambda."""
+        """Processa o formulário de e-mail e coloca a inscrição na fila."""
         email = request.POST.get('email')
 
         if email:
             # Salvar email na sessão
-            request.session['customer_email'] = email
-
-            # Verificar se email já está inscrito (evitar chamadas desnecessárias)
-            subscription, created = EmailSubscription.objects.get_or_create(
-                email=email,
-                defaults={'subscribed': False}
-            )
-
-            # Se é novo ou não está inscrito, chamar Lambda
-            if created or not subscription.subscribed:
-                print(f"📧 Inscrevendo email {email} no SNS via Lambda...")
-
-                result = subscribe_email_to_sns(email)
-
-                if result['success']:
-                    # Atualizar status local
-                    subscription.subscription_arn = result.get('subscription_arn')
-                    subscription.subscribed = True
-                    subscription.save()
-                    print(f"✅ Email {email} inscrito com sucesso!")
-                else:
-                    print(f"⚠️ Falha ao inscrever {email}: {result['message']}")
-                    # Não bloqueia o fluxo - usuário continua navegando
-            else:
+            request.sessao_cliente['customer_email'] = email
+
+            # Cliente que volta já inscrito: nem banco nem Lambda
+            if inscritos.contem(email):
                 print(f"ℹ️ Email {email} já está inscrito no SNS")
+                return redirect('item_list')
 
+            # Só grava a inscrição pendente; o worker chama a Lambda
+            registrar_inscricao(email)
             return redirect('item_list')
 
         return render(request, self.template_name)
@@ -70,20 +56,11 @@ class SubscribeView(View):
             return None
 
         # Save email in session for user flow
-        request.session['customer_email'] = email
-
-        subscription, created = EmailSubscription.objects.get_or_create(
-            email=email,
-            defaults={'subscribed': False}
-        )
+        request.sessao_cliente['customer_email'] = email
 
-        if created or not subscription.subscribed:
-            result = subscribe_email_to_sns(email)
-            if result.get('success'):
-                subscription.subscription_arn = result.get('subscription_arn')
-                subscription.subscribed = True
-                subscription.save()
-        return subscription
+        if inscritos.contem(email):
+            return None
+        return registrar_inscricao(email)
 
     def get(self, request):
         email = request.GET.get('email')
@@ -95,3 +72,58 @@ class SubscribeView(View):
         self._subscribe_email(request, email)
         return redirect('item_list')
 
+
+class AsyncHomepageView(View):
+    """
+    Versão assíncrona de `HomepageView` (usada quando ASYNC_VIEWS=true).
+
+    As consultas ao banco são aguardadas sem ocupar uma thread do worker.
+    """
+
+    template_name = 'items/homepage.html'
+
+    async def get(self, request):
+        """Renderiza a página inicial."""
+        return render(request, self.template_name)
+
+    async def post(self, request):
+        """Processa o formulário de e-mail e coloca a inscrição na fila."""
+        email = request.POST.get('email')
+
+        if email:
+            await request.sessao_cliente.aset('customer_email', email)
+
+            if await inscritos.acontem(email):
+                print(f"ℹ️ Email {email} já está inscrito no SNS")
+                return redirect('item_list')
+
+            await aregistrar_inscricao(email)
+            return redirect('item_list')
+
+        return render(request, self.template_name)
+
+
+class AsyncSubscribeView(View):
+    """
+    Versão assíncrona de `SubscribeView` (usada quando ASYNC_VIEWS=true).
+    """
+
+    async def _subscribe_email(self, request, email: str):
+        if not email:
+            return None
+
+        await request.sessao_cliente.aset('customer_email', email)
+
+        if await inscritos.acontem(email):
+            return None
+        return await aregistrar_inscricao(email)
+
+    async def get(self, request):
+        email = request.GET.get('email')
+        await self._subscribe_email(request, email)
+        return redirect('item_list')
+
+    async def post(self, request):
+        email = request.POST.get('email')
+        await self._subscribe_email(request, email)
+        return redirect('item_list')
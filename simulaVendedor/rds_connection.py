@@ -0,0 +1,140 @@
+"""
+Conexão com o RDS MySQL reaproveitada entre invocações da Lambda.
+
+Enquanto o container da Lambda estiver quente, a mesma conexão é usada em
+todas as invocações, evitando um novo handshake TCP + autenticação MySQL a
+cada venda. Antes de reutilizar, a conexão é verificada com um ping (apenas
+se ficou ociosa por mais de DB_PING_INTERVAL segundos) e qualquer transação
+esquecida aberta é desfeita. Se a conexão caiu, uma nova é aberta de forma
+transparente.
+
+Cada pacote de Lambda (vendaProduto, subscribeEmail, simulaVendedor,
+enviaEmailInteressados) leva uma cópia idêntica deste módulo, já que os zips
+são publicados separadamente.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+# RDS MySQL connection details
+host = os.getenv('DB_HOST')
+user = os.getenv('DB_USER')
+password = os.getenv('DB_PASSWORD')
+database = os.getenv('DB_NAME')
+port = int(os.getenv('DB_PORT', '3306'))
+
+# Conexões usadas há menos tempo que isso (em segundos) são reutilizadas sem ping
+PING_INTERVAL = float(os.getenv('DB_PING_INTERVAL', '10'))
+
+# Uma conexão por thread: na Lambda há uma única thread por container, mas
+# handlers que processam registros em paralelo (e os benchmarks) não podem
+# compartilhar a mesma conexão MySQL.
+_local = threading.local()
+_lock = threading.Lock()
+
+estatisticas = {
+    'conexoes_novas': 0,
+    'reusos': 0,
+    'reconexoes': 0,
+}
+
+
+def _incrementar(chave):
+    with _lock:
+        estatisticas[chave] += 1
+
+
+def _conectar():
+    connection = pymysql.connect(
+        host=host,
+        user=user,
+        password=password,
+        database=database,
+        port=port,
+        connect_timeout=5
+    )
+    _incrementar('conexoes_novas')
+    return connection
+
+
+def _fechar(connection):
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+
+def obter_conexao():
+    """
+    Retorna a conexão da thread atual, abrindo ou reabrindo se necessário.
+    """
+    connection = getattr(_local, 'connection', None)
+
+    if connection is not None and connection.open:
+        ociosa = time.monotonic() - _local.ultimo_uso
+        try:
+            if ociosa > PING_INTERVAL:
+                connection.ping(reconnect=False)
+            # Desfaz qualquer transação deixada aberta por uma invocação anterior
+            if connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                connection.rollback()
+            _incrementar('reusos')
+        except pymysql.MySQLError as e:
+            print(f"⚠️ Conexão com o RDS perdida, reconectando: {e}")
+            _fechar(connection)
+            connection = None
+            _incrementar('reconexoes')
+    else:
+        connection = None
+
+    if connection is None:
+        connection = _conectar()
+        _local.connection = connection
+
+    _local.ultimo_uso = time.monotonic()
+    return connection
+
+
+def descartar_conexao():
+    """Fecha a conexão da thread atual; a próxima chamada abre uma nova."""
+    connection = getattr(_local, 'connection', None)
+    _local.connection = None
+    if connection is not None:
+        _fechar(connection)
+
+
+@contextmanager
+def conexao():
+    """
+    Context manager que entrega a conexão reaproveitável.
+
+    A conexão não é fechada ao sair. Erros de rede/protocolo descartam a
+    conexão para que a próxima invocação reconecte, e transações não
+    finalizadas são desfeitas.
+    """
+    connection = obter_conexao()
+    try:
+        yield connection
+    except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+        descartar_conexao()
+        raise
+    finally:
+        if connection.open and connection.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            try:
+                connection.rollback()
+            except pymysql.MySQLError:
+                descartar_conexao()
+        _local.ultimo_uso = time.monotonic()
+
+
+def estatisticas_conexao():
+    """Retorna os contadores de conexões novas x reutilizadas e a taxa de reuso."""
+    with _lock:
+        dados = dict(estatisticas)
+    total = dados['conexoes_novas'] + dados['reusos']
+    dados['taxa_reuso'] = round(dados['reusos'] / total, 3) if total else 0.0
+    return dados
@@ -2,14 +2,10 @@ import json
 import boto3
 import pymysql
 import random
-import os
 from datetime import datetime
 
-# RDS MySQL connection details
-host = os.getenv('DB_HOST')
-user = os.getenv('DB_USER')
-password = os.getenv('DB_PASSWORD')
-database = os.getenv('DB_NAME')
+from rds_connection import obter_conexao, descartar_conexao, estatisticas_conexao
+
 # Cliente Lambda para chamar a função de envio de emails
 lambda_client = boto3.client('lambda')
 
@@ -63,123 +59,148 @@ def adicionar_produtos_aleatorios(num_produtos=None):
     return produtos_para_adicionar
 
 
-def verificar_e_notificar_interessados(produto_id, connection):
+def incrementar_versao_catalogo(connection, cursor):
+    """
+    Incrementa a versão global do catálogo, usada pelo Django como chave do
+    cache da página de produtos. Roda em uma transação própria, logo depois
+    do commit do estoque: dentro da transação da entrega, o lock da linha única de
+    versão enfileiraria todas as vendas. Uma falha aqui só adia a renovação do
+    cache, sem desfazer a alteração de estoque.
+    """
+    try:
+        cursor.execute(
+            """
+            INSERT INTO consumidor_catalogoversao (id, versao, atualizado_em)
+            VALUES (1, 1, NOW(6))
+            ON DUPLICATE KEY UPDATE versao = versao + 1, atualizado_em = NOW(6)
+            """
+        )
+        connection.commit()
+    except pymysql.MySQLError as e:
+        print(f"⚠️ Erro ao incrementar a versão do catálogo: {e}")
+        connection.rollback()
+
+
+def verificar_e_notificar_interessados(produto_ids, connection):
     """
-    Verifica se há clientes interessados no produto e invoca Lambda de notificação
-    :param produto_id: ID do produto que chegou
+    Verifica quais produtos têm clientes interessados e invoca a Lambda de notificação
+    :param produto_ids: IDs dos produtos que voltaram ao estoque
     :param connection: conexão com o banco de dados
+    :returns: lista de IDs de produtos com clientes aguardando notificação
     """
+    if not produto_ids:
+        return []
+
     try:
         with connection.cursor() as cursor:
-            # Busca clientes interessados que ainda não foram notificados
+            # Uma única consulta agrupada para todos os produtos reabastecidos
+            marcadores = ', '.join(['%s'] * len(produto_ids))
             cursor.execute(
-                """
-                SELECT COUNT(*) as total
-                FROM consumidor_notificacao 
-                WHERE item_id = %s AND notificado = FALSE
+                f"""
+                SELECT item_id, COUNT(*) as total
+                FROM consumidor_notificacao
+                WHERE notificado = FALSE AND item_id IN ({marcadores})
+                GROUP BY item_id
                 """,
-                (produto_id,)
+                list(produto_ids)
             )
-            result = cursor.fetchone()
-            
-            if result and result[0] > 0:
-                print(f"Encontrados {result[0]} clientes interessados no produto ID {produto_id}")
-                
-                # Invoca a Lambda de envio de emails
-                try:
-                    response = lambda_client.invoke(
-                        FunctionName='envia_email_interessados',
-                        InvocationType='Event',  # Assíncrono
-                        Payload=json.dumps({
-                            'produto_id': produto_id
-                        })
-                    )
-                    print(f"Lambda envia_email_interessados invocada para produto ID {produto_id}")
-                except Exception as e:
-                    print(f"Erro ao invocar Lambda de emails: {e}")
-                    
+            interessados = {item_id: total for item_id, total in cursor.fetchall()}
     except Exception as e:
         print(f"Erro ao verificar interessados: {e}")
+        return []
+
+    if not interessados:
+        return []
+
+    for produto_id, total in interessados.items():
+        print(f"Encontrados {total} clientes interessados no produto ID {produto_id}")
+
+    # Invoca a Lambda de envio de emails uma única vez para todos os produtos
+    try:
+        lambda_client.invoke(
+            FunctionName='envia_email_interessados',
+            InvocationType='Event',  # Assíncrono
+            Payload=json.dumps({
+                'produto_ids': sorted(interessados)
+            })
+        )
+        print(f"Lambda envia_email_interessados invocada para produtos {sorted(interessados)}")
+    except Exception as e:
+        print(f"Erro ao invocar Lambda de emails: {e}")
+
+    return sorted(interessados)
 
 
 def armazena_produtos_rds(produtos: list) -> dict:
     """
     Armazena os produtos no banco de dados RDS MySQL e notifica interessados
+    A entrega inteira usa um número constante de round trips: uma consulta do
+    estado anterior, um upsert multi-linha, o incremento da versão do catálogo e
+    uma consulta agrupada de interessados.
     :param produtos: lista de produtos da padaria
     :returns: dicionário com contagem de produtos inseridos/atualizados
     """
+    if not produtos:
+        return {'inseridos': 0, 'atualizados': 0, 'notificacoes_enviadas': 0}
+
     try:
-        # Conecta com RDS MySQL
-        connection = pymysql.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
+        # Reaproveita a conexão com o RDS MySQL do container quente
+        connection = obter_conexao()
 
-        produtos_inseridos = 0
-        produtos_atualizados = 0
-        produtos_com_interessados = []
+        ids = sorted({produto['id'] for produto in produtos})
+        marcadores = ', '.join(['%s'] * len(ids))
 
         with connection.cursor() as cursor:
-            # Armazena os produtos no banco de dados
-            for produto in produtos:
-                try:
-                    # Verifica se o produto estava indisponível antes
-                    cursor.execute(
-                        "SELECT quantidade_estoque, disponivel FROM consumidor_item WHERE id = %s",
-                        (produto['id'],)
-                    )
-                    resultado_anterior = cursor.fetchone()
-                    estava_indisponivel = resultado_anterior and (resultado_anterior[0] == 0 or not resultado_anterior[1])
-                    
-                    # Insere ou atualiza o produto
-                    cursor.execute(
-                        """
-                        INSERT INTO consumidor_item (id, nome, quantidade_estoque, disponivel)
-                        VALUES (%s, %s, %s, %s)
-                        ON DUPLICATE KEY UPDATE
-                            quantidade_estoque = quantidade_estoque + %s,
-                            disponivel = %s
-                        """,
-                        (
-                            produto['id'],
-                            produto['nome'],
-                            produto['quantidade'],
-                            True,
-                            produto['quantidade'],
-                            True
-                        )
-                    )
-
-                    if cursor.rowcount == 1:
-                        produtos_inseridos += 1
-                    else:
-                        produtos_atualizados += 1
-                    
-                    # Se estava indisponível e agora está disponível, marca para notificar
-                    if estava_indisponivel:
-                        produtos_com_interessados.append(produto['id'])
-
-                except pymysql.MySQLError as e:
-                    print(f"Erro ao inserir produto {produto['nome']}: {e}")
-                    continue
-
-            connection.commit()
+            # Estado anterior de todos os produtos entregues em uma única consulta
+            cursor.execute(
+                f"SELECT id, quantidade_estoque, disponivel FROM consumidor_item WHERE id IN ({marcadores})",
+                ids
+            )
+            anteriores = {row[0]: row for row in cursor.fetchall()}
+
+            # executemany agrupa tudo em um único INSERT multi-linha
+            cursor.executemany(
+                """
+                INSERT INTO consumidor_item (id, nome, quantidade_estoque, disponivel)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    quantidade_estoque = quantidade_estoque + VALUES(quantidade_estoque),
+                    disponivel = VALUES(disponivel),
+                    versao = versao + 1
+                """,
+                [(produto['id'], produto['nome'], produto['quantidade'], True) for produto in produtos]
+            )
+
+        connection.commit()
+        with connection.cursor() as cursor:
+            incrementar_versao_catalogo(connection, cursor)
+
+        produtos_inseridos = len([produto_id for produto_id in ids if produto_id not in anteriores])
+        produtos_atualizados = len(ids) - produtos_inseridos
+
+        # Produtos que estavam indisponíveis e voltaram ao estoque
+        reabastecidos = [
+            produto_id for produto_id, (_, quantidade_estoque, disponivel) in anteriores.items()
+            if quantidade_estoque == 0 or not disponivel
+        ]
 
         # Notifica interessados para produtos que voltaram ao estoque
-        for produto_id in produtos_com_interessados:
-            verificar_e_notificar_interessados(produto_id, connection)
+        com_interessados = verificar_e_notificar_interessados(reabastecidos, connection)
 
-        connection.close()
         print(f"Dados armazenados no RDS com sucesso! Inseridos: {produtos_inseridos}, Atualizados: {produtos_atualizados}")
+        print(f"Conexões RDS: {estatisticas_conexao()}")
 
         return {
             'inseridos': produtos_inseridos,
             'atualizados': produtos_atualizados,
-            'notificacoes_enviadas': len(produtos_com_interessados)
+            'notificacoes_enviadas': len(com_interessados)
         }
 
+    except pymysql.MySQLError as e:
+        print(f"Erro ao armazenar dados no RDS: {str(e)}")
+        # A conexão pode ter caído no meio da entrega: a próxima invocação reconecta
+        descartar_conexao()
+        raise
     except Exception as e:
         print(f"Erro ao armazenar dados no RDS: {str(e)}")
         raise
@@ -0,0 +1,66 @@
+/*
+ * Estoque ao vivo: atualiza as quantidades na página com os eventos SSE de
+ * /quitutes/estoque/eventos/ (ver consumidor/estoque_ao_vivo.py).
+ *
+ * Elementos com data-estoque-item="<id>" mostram a quantidade no formato de
+ * data-estoque-formato ("disponíveis" ou "unidades"); data-estoque-botao="<id>"
+ * alterna o botão de reserva da lista. Na página do item, os blocos
+ * data-estoque-com-estoque="<id>" (formulários de reserva) e
+ * data-estoque-esgotado="<id>" são mostrados ou escondidos no lugar, sem
+ * recarregar: um reabastecimento não dispara um reload de cada aba aberta.
+ */
+(function () {
+    var script = document.currentScript;
+    if (!window.EventSource || !script) {
+        return;
+    }
+
+    function atualizarQuantidade(elemento, delta) {
+        var quantidade = delta.quantidade_estoque;
+        var span = document.createElement('span');
+        span.className = elemento.getAttribute('data-estoque-classe') || 'font-semibold';
+        if (quantidade > 0) {
+            span.classList.add('text-green-600');
+            span.textContent = quantidade + ' ' + elemento.getAttribute('data-estoque-formato');
+        } else {
+            span.classList.add('text-red-600');
+            span.textContent = 'Esgotado';
+        }
+        elemento.replaceChildren(span);
+    }
+
+    function atualizarBotao(botao, delta) {
+        var disponivel = delta.quantidade_estoque > 0;
+        botao.textContent = disponivel ? 'Reservar' : 'Indisponível';
+        botao.classList.toggle('bg-amber-600', disponivel);
+        botao.classList.toggle('text-white', disponivel);
+        botao.classList.toggle('hover:bg-amber-700', disponivel);
+        botao.classList.toggle('bg-gray-300', !disponivel);
+        botao.classList.toggle('text-gray-500', !disponivel);
+        botao.classList.toggle('cursor-not-allowed', !disponivel);
+    }
+
+    function aplicar(evento) {
+        JSON.parse(evento.data).forEach(function (delta) {
+            document.querySelectorAll('[data-estoque-item="' + delta.item_id + '"]').forEach(function (elemento) {
+                atualizarQuantidade(elemento, delta);
+            });
+            document.querySelectorAll('[data-estoque-botao="' + delta.item_id + '"]').forEach(function (botao) {
+                atualizarBotao(botao, delta);
+            });
+            document.querySelectorAll('[data-estoque-com-estoque="' + delta.item_id + '"]').forEach(function (bloco) {
+                bloco.hidden = delta.quantidade_estoque <= 0;
+            });
+            document.querySelectorAll('[data-estoque-esgotado="' + delta.item_id + '"]').forEach(function (bloco) {
+                bloco.hidden = delta.quantidade_estoque > 0;
+            });
+        });
+    }
+
+    var fonte = new EventSource(script.getAttribute('data-url'));
+    fonte.addEventListener('snapshot', aplicar);
+    fonte.addEventListener('estoque', aplicar);
+    window.addEventListener('pagehide', function () {
+        fonte.close();
+    });
+})();
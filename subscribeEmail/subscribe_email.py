@@ -2,12 +2,16 @@ import json
 import boto3
 import pymysql
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-# RDS MySQL connection details
-host = os.getenv('DB_HOST')
-user = os.getenv('DB_USER')
-password = os.getenv('DB_PASSWORD')
-database = os.getenv('DB_NAME')
+from rds_connection import conexao, estatisticas_conexao
+from sns_topic import TopicoNaoEncontrado, obter_cliente_sns, resolver_topic_arn
+
+# Registros de um mesmo lote SQS são independentes e processados em paralelo.
+# O pool vive no módulo para que suas threads (e as conexões RDS de cada uma)
+# sejam reaproveitadas entre invocações do container quente.
+SQS_MAX_WORKERS = int(os.getenv('SQS_MAX_WORKERS', '8'))
+_executor = ThreadPoolExecutor(max_workers=SQS_MAX_WORKERS)
 
 def lambda_handler(event, context):
     """
@@ -17,7 +21,7 @@ def lambda_handler(event, context):
     
     # Detectar origem do evento
     if 'Records' in event:
-        # === TRIGGER SQS (caso queira usar no futuro) ===
+        # === TRIGGER SQS ===
         return process_sqs_messages(event)
     else:
         # === FUNCTION URL (HTTP) ou Teste Manual ===
@@ -89,46 +93,59 @@ def process_http_request(event):
         }
 
 
+def process_sqs_record(record):
+    """
+    Processa um registro SQS.
+
+    Returns:
+        bool: True se o email foi inscrito com sucesso
+    """
+    try:
+        message_body = json.loads(record['body'])
+        email = message_body.get('email')
+
+        if not email:
+            print(f"❌ Email não encontrado na mensagem: {record['body']}")
+            return False
+
+        print(f"📧 Processando email: {email}")
+
+        result = subscribe_to_sns(email)
+
+        if result['success']:
+            print(f"✅ Email {email} inscrito com sucesso")
+            return True
+
+        print(f"❌ Falha ao inscrever {email}: {result['message']}")
+        return False
+
+    except Exception as e:
+        print(f"❌ Erro ao processar mensagem {record['messageId']}: {e}")
+        return False
+
+
 def process_sqs_messages(event):
-    """Processa mensagens SQS (para usar com Trigger SQS no futuro)"""
-    successful_messages = []
-    failed_messages = []
-    
-    for record in event['Records']:
-        try:
-            message_body = json.loads(record['body'])
-            email = message_body.get('email')
-            
-            if not email:
-                print(f"❌ Email não encontrado na mensagem: {record['body']}")
-                failed_messages.append(record['messageId'])
-                continue
-            
-            print(f"📧 Processando email: {email}")
-            
-            result = subscribe_to_sns(email)
-            
-            if result['success']:
-                successful_messages.append(record['messageId'])
-                print(f"✅ Email {email} inscrito com sucesso")
-            else:
-                failed_messages.append(record['messageId'])
-                print(f"❌ Falha ao inscrever {email}: {result['message']}")
-                
-        except Exception as e:
-            print(f"❌ Erro ao processar mensagem {record['messageId']}: {e}")
-            failed_messages.append(record['messageId'])
-    
-    if failed_messages:
-        raise Exception(f"Failed to process {len(failed_messages)} messages")
-    
+    """
+    Processa mensagens SQS (Trigger SQS) em paralelo.
+
+    Retorna `batchItemFailures` com apenas os registros que falharam, então o
+    SQS reentrega só esses (requer ReportBatchItemFailures no trigger) e os
+    emails já inscritos no lote não são processados de novo.
+    """
+    records = event['Records']
+    resultados = list(_executor.map(process_sqs_record, records))
+
+    failed_messages = [
+        record['messageId'] for record, sucesso in zip(records, resultados) if not sucesso
+    ]
+
+    print(
+        f"Lote SQS: {len(records)} mensagens, "
+        f"{len(records) - len(failed_messages)} inscritas, {len(failed_messages)} falhas"
+    )
+
     return {
-        'statusCode': 200,
-        'body': json.dumps({
-            'total_messages': len(event['Records']),
-            'successful': len(successful_messages),
-            'failed': len(failed_messages)
-        })
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_messages]
     }
 
 
@@ -139,14 +156,13 @@ def subscribe_to_sns(email):
     Returns:
         dict: {'success': bool, 'message': str, 'subscription_arn': str}
     """
+    alertTopic = 'EnviaEmail'
     try:
         # Connect to SNS
-        sns = boto3.client('sns')
-        alertTopic = 'EnviaEmail'
+        sns = obter_cliente_sns()
         
-        # Get SNS topic ARN
-        snsTopicArn = [t['TopicArn'] for t in sns.list_topics()['Topics']
-                      if t['TopicArn'].lower().endswith(':' + alertTopic.lower())][0]
+        # Get SNS topic ARN (cache em memória, ver sns_topic.py)
+        snsTopicArn = resolver_topic_arn(alertTopic, sns)
         
         # Subscribe email to SNS
         response = sns.subscribe(
@@ -158,52 +174,52 @@ def subscribe_to_sns(email):
         
         subscription_arn = response.get('SubscriptionArn')
         
-        # Save to database
-        connection = pymysql.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
-        
-        try:
-            with connection.cursor() as cursor:
-                # Create table if not exists
-                cursor.execute(
-                    """
-                    CREATE TABLE IF NOT EXISTS consumidor_emailsubscription (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        email VARCHAR(254) UNIQUE NOT NULL,
-                        subscription_arn VARCHAR(255),
-                        subscribed BOOLEAN DEFAULT FALSE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                    """
+        # Save to database (conexão reaproveitada entre invocações)
+        with conexao() as connection, connection.cursor() as cursor:
+            # Create table if not exists
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS consumidor_emailsubscription (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    email VARCHAR(254) UNIQUE NOT NULL,
+                    subscription_arn VARCHAR(255),
+                    subscribed BOOLEAN DEFAULT FALSE,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    inscrito_em DATETIME(6) NULL,
+                    proxima_tentativa DATETIME(6) NOT NULL,
+                    tentativas INT UNSIGNED NOT NULL DEFAULT 0,
+                    ultimo_erro LONGTEXT NOT NULL
                 )
-                
-                # Insert or update subscription
-                cursor.execute(
-                    """
-                    INSERT INTO consumidor_emailsubscription (email, subscription_arn, subscribed)
-                    VALUES (%s, %s, %s)
-                    ON DUPLICATE KEY UPDATE
-                        subscription_arn = %s,
-                        subscribed = %s
-                    """,
-                    (email, subscription_arn, True, subscription_arn, True)
-                )
-                
-                connection.commit()
-        finally:
-            connection.close()
-        
+                """
+            )
+
+            # Insert or update subscription. Com o trigger SQS é aqui que a
+            # inscrição pendente gravada pelo site passa a inscrita.
+            cursor.execute(
+                """
+                INSERT INTO consumidor_emailsubscription
+                    (email, subscription_arn, subscribed, inscrito_em, proxima_tentativa, tentativas, ultimo_erro)
+                VALUES (%s, %s, %s, NOW(6), NOW(6), 0, '')
+                ON DUPLICATE KEY UPDATE
+                    subscription_arn = COALESCE(%s, subscription_arn),
+                    subscribed = %s,
+                    inscrito_em = COALESCE(inscrito_em, NOW(6)),
+                    ultimo_erro = ''
+                """,
+                (email, subscription_arn, True, subscription_arn, True)
+            )
+
+            connection.commit()
+
+        print(f"Conexões RDS: {estatisticas_conexao()}")
+
         return {
             'success': True,
             'message': f'Email {email} subscrito com sucesso! Um email de confirmação foi enviado.',
             'subscription_arn': subscription_arn
         }
         
-    except IndexError:
+    except TopicoNaoEncontrado:
         return {
             'success': False,
             'message': f'SNS Topic "{alertTopic}" não encontrado'
@@ -0,0 +1,349 @@
+#!/usr/bin/env python
+"""
+Benchmark de concorrência da Lambda venda_de_produtos.
+
+Cenário "oversell" (padrão): dispara centenas de invocações paralelas do
+lambda_handler contra um único produto "quente" e compara com o fluxo antigo
+(SELECT, verificação em Python e UPDATE com valor absoluto). Para cada fluxo
+mostra vendas/s e verifica se houve venda acima do estoque (oversell).
+
+Cenário "checkout": compara pedidos com vários itens vendidos linha a linha
+(uma invocação por item, como o Django fazia) com o pedido inteiro em uma
+única invocação e transação.
+
+Cenário "contencao": pedidos com vários itens disputando poucos produtos
+"quentes", vendidos com VENDA_MODO=lock (SELECT ... FOR UPDATE) e com
+VENDA_MODO=cas (sem lock na leitura, refazendo o pedido quando a versão de um
+item muda). Mostra vazão, latências, conflitos e pedidos que esgotaram as
+tentativas, e confere o estoque final contra as reservas.
+
+Precisa de um MySQL com o schema do Django (python manage.py migrate) e das
+mesmas variáveis de ambiente da Lambda: DB_HOST, DB_USER, DB_PASSWORD, DB_NAME.
+
+Uso:
+    python vendaProduto/benchmark_venda.py --invocacoes 500 --concorrencia 64 --estoque 200
+    python vendaProduto/benchmark_venda.py --cenario checkout --pedidos 300 --itens-por-pedido 3
+    python vendaProduto/benchmark_venda.py --cenario contencao --produtos 3 --itens-por-pedido 2 --concorrencia 32
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pymysql
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import rds_connection  # noqa: E402
+import venda_de_produtos  # noqa: E402
+
+# O benchmark mede só o caminho do banco: o email de retirada é desligado
+venda_de_produtos.enviar_email_retirada = lambda *args, **kwargs: None
+venda_de_produtos.enviar_email_retirada_pedido = lambda *args, **kwargs: None
+
+
+def conectar():
+    return pymysql.connect(
+        host=rds_connection.host,
+        user=rds_connection.user,
+        password=rds_connection.password,
+        database=rds_connection.database,
+        port=rds_connection.port
+    )
+
+
+def preparar_produto(produto_id, estoque):
+    """Cria (ou reinicia) o produto quente e apaga as reservas anteriores dele."""
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM consumidor_reserva WHERE item_id = %s", (produto_id,))
+            cursor.execute(
+                """
+                INSERT INTO consumidor_item (id, nome, quantidade_estoque, disponivel)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE quantidade_estoque = %s, disponivel = %s
+                """,
+                (produto_id, 'produto benchmark', estoque, True, estoque, True)
+            )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def resultado_final(produto_id):
+    """Retorna (estoque final, unidades vendidas segundo consumidor_reserva)."""
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT quantidade_estoque FROM consumidor_item WHERE id = %s", (produto_id,))
+            estoque_final = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT COALESCE(SUM(quantidade), 0) FROM consumidor_reserva WHERE item_id = %s",
+                (produto_id,)
+            )
+            vendidos = int(cursor.fetchone()[0])
+        return estoque_final, vendidos
+    finally:
+        connection.close()
+
+
+def venda_legada(produto_id, quantidade, email):
+    """Reproduz o fluxo antigo da Lambda: lê o estoque, decide em Python e grava o valor absoluto."""
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT id, nome, quantidade_estoque, disponivel FROM consumidor_item WHERE id = %s",
+                (produto_id,)
+            )
+            _, _, quantidade_estoque, _ = cursor.fetchone()
+            if quantidade_estoque < quantidade:
+                return 400
+            nova_quantidade = quantidade_estoque - quantidade
+            cursor.execute(
+                "UPDATE consumidor_item SET quantidade_estoque = %s, disponivel = %s WHERE id = %s",
+                (nova_quantidade, nova_quantidade > 0, produto_id)
+            )
+            cursor.execute(
+                """
+                INSERT INTO consumidor_reserva (item_id, email_cliente, quantidade, confirmado)
+                VALUES (%s, %s, %s, %s)
+                """,
+                (produto_id, email, quantidade, True)
+            )
+        connection.commit()
+        return 200
+    finally:
+        connection.close()
+
+
+def venda_atual(produto_id, quantidade, email):
+    """Invoca o lambda_handler atual como a Function URL faria."""
+    event = {'body': json.dumps({'produto_id': produto_id, 'quantidade': quantidade, 'email': email})}
+    return venda_de_produtos.lambda_handler(event, None)['statusCode']
+
+
+def executar(nome, venda, args):
+    preparar_produto(args.produto_id, args.estoque)
+
+    def invocar(i):
+        try:
+            return venda(args.produto_id, args.quantidade, f'bench-{i}@example.com')
+        except Exception:
+            return 500
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        status = list(executor.map(invocar, range(args.invocacoes)))
+    duracao = time.perf_counter() - inicio
+
+    estoque_final, vendidos = resultado_final(args.produto_id)
+    vendas_ok = status.count(200)
+    return {
+        'fluxo': nome,
+        'invocacoes': args.invocacoes,
+        'vendas_confirmadas': vendas_ok,
+        'recusadas_sem_estoque': status.count(400),
+        'erros': len(status) - vendas_ok - status.count(400),
+        'duracao_s': round(duracao, 3),
+        'vendas_por_segundo': round(vendas_ok / duracao, 1) if duracao else None,
+        'unidades_vendidas': vendidos,
+        'estoque_inicial': args.estoque,
+        'estoque_final': estoque_final,
+        # Oversell: unidades registradas em reservas além do estoque inicial,
+        # ou estoque final que não bate com o que foi vendido (lost update)
+        'oversell': max(0, vendidos - args.estoque) + abs(args.estoque - vendidos - estoque_final),
+    }
+
+
+def preparar_catalogo(primeiro_id, quantidade_produtos, estoque):
+    """Cria (ou reinicia) os produtos usados no cenário de checkout."""
+    ids = list(range(primeiro_id, primeiro_id + quantidade_produtos))
+    connection = conectar()
+    try:
+        with connection.cursor() as cursor:
+            cursor.executemany("DELETE FROM consumidor_reserva WHERE item_id = %s", [(i,) for i in ids])
+            cursor.executemany(
+                """
+                INSERT INTO consumidor_item (id, nome, quantidade_estoque, disponivel)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE quantidade_estoque = VALUES(quantidade_estoque), disponivel = TRUE
+                """,
+                [(i, f'produto benchmark {i}', estoque, True) for i in ids]
+            )
+        connection.commit()
+    finally:
+        connection.close()
+    return ids
+
+
+def pedido_linha_a_linha(linhas, email):
+    """Uma invocação da Lambda por item do pedido."""
+    status = [venda_atual(linha['produto_id'], linha['quantidade'], email) for linha in linhas]
+    return 200 if all(s == 200 for s in status) else 400
+
+
+def pedido_em_lote(linhas, email):
+    """O pedido inteiro em uma única invocação."""
+    event = {'body': json.dumps({'itens': linhas, 'email': email})}
+    return venda_de_produtos.lambda_handler(event, None)['statusCode']
+
+
+def executar_checkout(nome, processar_pedido, args):
+    ids = preparar_catalogo(args.produto_id, args.produtos, args.estoque)
+    aleatorio = random.Random(42)
+    pedidos = [
+        [{'produto_id': produto_id, 'quantidade': args.quantidade}
+         for produto_id in aleatorio.sample(ids, min(args.itens_por_pedido, len(ids)))]
+        for _ in range(args.pedidos)
+    ]
+
+    def invocar(i):
+        try:
+            return processar_pedido(pedidos[i], f'bench-{i}@example.com')
+        except Exception:
+            return 500
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        status = list(executor.map(invocar, range(len(pedidos))))
+    duracao = time.perf_counter() - inicio
+
+    pedidos_ok = status.count(200)
+    return {
+        'fluxo': nome,
+        'pedidos': len(pedidos),
+        'itens_por_pedido': args.itens_por_pedido,
+        'pedidos_confirmados': pedidos_ok,
+        'falhas': len(pedidos) - pedidos_ok,
+        'duracao_s': round(duracao, 3),
+        'pedidos_por_segundo': round(pedidos_ok / duracao, 1) if duracao else None,
+        'itens_por_segundo': round(pedidos_ok * args.itens_por_pedido / duracao, 1) if duracao else None,
+    }
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(int(len(valores) * p), len(valores) - 1)] if valores else None
+
+
+def estado_catalogo(ids):
+    """Retorna (estoque total, unidades vendidas segundo consumidor_reserva) dos produtos."""
+    connection = conectar()
+    marcadores = ', '.join(['%s'] * len(ids))
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(SUM(quantidade_estoque), 0) FROM consumidor_item WHERE id IN ({marcadores})", ids)
+            estoque = int(cursor.fetchone()[0])
+            cursor.execute(f"SELECT COALESCE(SUM(quantidade), 0) FROM consumidor_reserva WHERE item_id IN ({marcadores})", ids)
+            vendidos = int(cursor.fetchone()[0])
+        return estoque, vendidos
+    finally:
+        connection.close()
+
+
+def executar_contencao(modo, args):
+    """Vende os mesmos pedidos no modo indicado e mede vazão, latência e conflitos."""
+    ids = preparar_catalogo(args.produto_id, args.produtos, args.estoque)
+    aleatorio = random.Random(42)
+    pedidos = [
+        [{'produto_id': produto_id, 'quantidade': args.quantidade}
+         for produto_id in aleatorio.sample(ids, min(args.itens_por_pedido, len(ids)))]
+        for _ in range(args.pedidos)
+    ]
+    venda_de_produtos.VENDA_MODO = modo
+    venda_de_produtos.estatisticas_cas.update(conflitos=0, esgotadas=0)
+
+    def invocar(i):
+        inicio = time.perf_counter()
+        try:
+            status = pedido_em_lote(pedidos[i], f'bench-{i}@example.com')
+        except Exception:
+            status = 500
+        return status, (time.perf_counter() - inicio) * 1000
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        resultados = list(executor.map(invocar, range(len(pedidos))))
+    duracao = time.perf_counter() - inicio
+
+    status = [codigo for codigo, _ in resultados]
+    latencias = [ms for codigo, ms in resultados if codigo == 200]
+    estoque_final, vendidos = estado_catalogo(ids)
+    estoque_inicial = args.estoque * len(ids)
+    pedidos_ok = status.count(200)
+    return {
+        'modo': modo,
+        'pedidos': len(pedidos),
+        'produtos_disputados': len(ids),
+        'pedidos_confirmados': pedidos_ok,
+        'recusados_sem_estoque': status.count(400),
+        'conflito_apos_tentativas': status.count(409),
+        'erros': status.count(500),
+        'conflitos_de_versao': venda_de_produtos.estatisticas_cas['conflitos'],
+        'duracao_s': round(duracao, 3),
+        'pedidos_por_segundo': round(pedidos_ok / duracao, 1) if duracao else None,
+        'latencia_ms': {
+            'p50': round(percentil(latencias, 0.50), 1) if latencias else None,
+            'p95': round(percentil(latencias, 0.95), 1) if latencias else None,
+            'p99': round(percentil(latencias, 0.99), 1) if latencias else None,
+        },
+        # Estoque final + vendido deve fechar com o estoque inicial nos dois modos
+        'consistente': estoque_final + vendidos == estoque_inicial,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cenario', choices=['oversell', 'checkout', 'contencao'], default='oversell')
+    parser.add_argument('--invocacoes', type=int, default=500)
+    parser.add_argument('--concorrencia', type=int, default=64)
+    parser.add_argument('--estoque', type=int, default=200)
+    parser.add_argument('--quantidade', type=int, default=1)
+    parser.add_argument('--produto-id', type=int, default=9999)
+    parser.add_argument('--pedidos', type=int, default=300, help='cenários checkout e contencao')
+    parser.add_argument('--itens-por-pedido', type=int, default=3, help='cenários checkout e contencao')
+    parser.add_argument('--produtos', type=int, default=20, help='cenários checkout e contencao')
+    args = parser.parse_args()
+
+    if args.cenario == 'checkout':
+        # Estoque folgado: o cenário mede vazão, não falta de estoque
+        args.estoque = max(args.estoque, args.pedidos * args.quantidade * 2)
+        resultados = [
+            executar_checkout('linha a linha (uma invocação por item)', pedido_linha_a_linha, args),
+            executar_checkout('em lote (uma invocação e transação por pedido)', pedido_em_lote, args),
+        ]
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        print(f"Conexões RDS: {rds_connection.estatisticas_conexao()}")
+        return
+
+    if args.cenario == 'contencao':
+        args.estoque = max(args.estoque, args.pedidos * args.quantidade * 2)
+        resultados = [executar_contencao('lock', args), executar_contencao('cas', args)]
+        print(json.dumps(resultados, indent=2, ensure_ascii=False))
+        if not all(resultado['consistente'] for resultado in resultados):
+            print("❌ Estoque final não fecha com as reservas!")
+            sys.exit(1)
+        print("✅ Estoque consistente nos dois modos")
+        return
+
+    resultados = [
+        executar('legado (SELECT + UPDATE absoluto)', venda_legada, args),
+        executar('atual (UPDATE condicional)', venda_atual, args),
+    ]
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+    print(f"Conexões RDS do fluxo atual: {rds_connection.estatisticas_conexao()}")
+
+    if resultados[1]['oversell']:
+        print("❌ O fluxo atual vendeu acima do estoque!")
+        sys.exit(1)
+    print("✅ Nenhum oversell no fluxo atual")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Resolução do ARN de tópicos SNS com cache em memória.
+
+Em vez de chamar `sns.list_topics()` a cada email, o ARN é resolvido uma vez
+(percorrendo todas as páginas de tópicos da conta) e mantido em cache por
+SNS_TOPIC_CACHE_TTL segundos. O ARN também pode ser fixado por variável de
+ambiente, por exemplo SNS_TOPIC_ARN_ENVIAEMAIL para o tópico EnviaEmail, e
+então nenhuma chamada de listagem é feita.
+
+Uma cópia idêntica deste módulo existe em cada pacote que publica no SNS
+(vendaProduto, subscribeEmail, enviaEmailInteressados e consumidor).
+"""
+import os
+import threading
+import time
+
+import boto3
+
+AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+CACHE_TTL = float(os.getenv('SNS_TOPIC_CACHE_TTL', '300'))
+
+_lock = threading.Lock()
+_cache = {}  # nome do tópico (minúsculo) -> (arn, expira_em)
+_sns_client = None
+
+estatisticas = {
+    'consultas': 0,
+    'cache_hits': 0,
+    'fixados_por_env': 0,
+    'paginas_list_topics': 0,
+}
+
+
+class TopicoNaoEncontrado(LookupError):
+    """O tópico não existe na conta/região configurada."""
+
+
+def obter_cliente_sns():
+    """Retorna o cliente SNS do processo, criado uma única vez."""
+    global _sns_client
+    if _sns_client is None:
+        _sns_client = boto3.client('sns', region_name=AWS_REGION)
+    return _sns_client
+
+
+def _incrementar(chave, valor=1):
+    with _lock:
+        estatisticas[chave] += valor
+
+
+def resolver_topic_arn(nome='EnviaEmail', sns=None):
+    """
+    Retorna o ARN do tópico `nome`.
+
+    Ordem de resolução: variável SNS_TOPIC_ARN_<NOME>, cache em memória e,
+    por fim, listagem paginada dos tópicos da conta.
+
+    Raises:
+        TopicoNaoEncontrado: se nenhum tópico com esse nome existir
+    """
+    _incrementar('consultas')
+
+    arn_fixo = os.getenv(f'SNS_TOPIC_ARN_{nome.upper()}')
+    if arn_fixo:
+        _incrementar('fixados_por_env')
+        return arn_fixo
+
+    chave = nome.lower()
+    agora = time.monotonic()
+    with _lock:
+        em_cache = _cache.get(chave)
+        if em_cache and em_cache[1] > agora:
+            estatisticas['cache_hits'] += 1
+            return em_cache[0]
+
+    sns = sns or obter_cliente_sns()
+    encontrados = {}
+    paginator = sns.get_paginator('list_topics')
+    for pagina in paginator.paginate():
+        _incrementar('paginas_list_topics')
+        for topico in pagina.get('Topics', []):
+            arn = topico['TopicArn']
+            encontrados[arn.rsplit(':', 1)[-1].lower()] = arn
+        if chave in encontrados:
+            break
+
+    # Aproveita a listagem para guardar todos os tópicos vistos
+    expira_em = agora + CACHE_TTL
+    with _lock:
+        for nome_topico, arn in encontrados.items():
+            _cache[nome_topico] = (arn, expira_em)
+
+    if chave not in encontrados:
+        raise TopicoNaoEncontrado(f'SNS Topic "{nome}" não encontrado')
+    return encontrados[chave]
+
+
+def invalidar_topico(nome=None):
+    """Remove um tópico (ou todos, se `nome` for None) do cache."""
+    with _lock:
+        if nome is None:
+            _cache.clear()
+        else:
+            _cache.pop(nome.lower(), None)
+
+
+def estatisticas_topicos():
+    """Retorna os contadores do resolvedor, incluindo quantas listagens o cache evitou."""
+    with _lock:
+        dados = dict(estatisticas)
+    dados['list_topics_evitados'] = dados['cache_hits'] + dados['fixados_por_env']
+    return dados
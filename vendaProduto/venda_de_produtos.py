@@ -2,15 +2,348 @@ import json
 import boto3
 import pymysql
 import os
+import random
+import time
+
+from rds_connection import conexao, estatisticas_conexao
+from sns_topic import obter_cliente_sns, resolver_topic_arn, invalidar_topico
 
 # Cria cliente Lambda
 lambda_client = boto3.client('lambda')
 
-# RDS MySQL connection details
-host = os.getenv('DB_HOST')
-user = os.getenv('DB_USER')
-password = os.getenv('DB_PASSWORD')
-database = os.getenv('DB_NAME')
+# Modo de venda de pedidos com vários itens: "lock" (SELECT ... FOR UPDATE) ou
+# "cas" (sem travar na leitura; refaz o pedido se a versão de um item mudou)
+VENDA_MODO = os.getenv('VENDA_MODO', 'lock')
+VENDA_CAS_TENTATIVAS = int(os.getenv('VENDA_CAS_TENTATIVAS', '8'))
+VENDA_CAS_ESPERA_MS = float(os.getenv('VENDA_CAS_ESPERA_MS', '5'))
+
+# Contadores do modo cas neste container (aparecem no log e no benchmark)
+estatisticas_cas = {'conflitos': 0, 'esgotadas': 0}
+
+# Nomes dos produtos já vendidos por este container. A venda de um item não
+# relê a linha depois do UPDATE; o nome só é consultado (depois do commit) na
+# primeira venda do produto. Um produto renomeado no admin aparece com o nome
+# antigo nos emails até o container ser reciclado.
+_nomes = {}
+MAX_NOMES = 1000
+
+
+def eh_inteiro(valor):
+    """int de verdade: bool é subclasse de int, mas `true` no JSON não é uma quantidade."""
+    return isinstance(valor, int) and not isinstance(valor, bool)
+
+
+def nome_produto(cursor, produto_id):
+    """Nome do produto, do cache do container ou do banco."""
+    nome = _nomes.get(produto_id)
+    if nome is None:
+        cursor.execute("SELECT nome FROM consumidor_item WHERE id = %s", (produto_id,))
+        nome = cursor.fetchone()[0]
+        if len(_nomes) >= MAX_NOMES:
+            _nomes.clear()
+        _nomes[produto_id] = nome
+    return nome
+
+
+def enviar_email_retirada(email, nome, quantidade, estoque_restante):
+    """
+    Envia o email de retirada do pedido via SNS.
+    Falhas são apenas registradas no log: a venda já foi confirmada no banco.
+    """
+    alertTopic = 'EnviaEmail'
+    try:
+        sns = obter_cliente_sns()
+        snsTopicArn = resolver_topic_arn(alertTopic, sns)
+
+        subject = f'Seu pedido está pronto para retirada - {nome}'
+        message = f"""
+Olá,
+
+Seu pedido foi confirmado com sucesso!
+
+Detalhes do pedido:
+- Produto: {nome}
+- Quantidade: {quantidade}
+- Estoque restante: {estoque_restante}
+
+Você pode retirar seu produto na padaria agora mesmo.
+
+Atenciosamente,
+Quitute nas Nuvens
+"""
+        response = sns.publish(
+            TopicArn=snsTopicArn,
+            Message=message,
+            Subject=subject
+        )
+        print(f"📧 Email de retirada enviado via SNS para {email}: {response}")
+    except Exception as e:
+        print(f"❌ Erro ao enviar email de retirada para {email}: {e}")
+        # O tópico pode ter sido recriado: a próxima venda resolve o ARN de novo
+        invalidar_topico(alertTopic)
+
+
+def enviar_email_retirada_pedido(email, linhas):
+    """
+    Envia um único email de retirada para um pedido com vários itens.
+    Falhas são apenas registradas no log: a venda já foi confirmada no banco.
+    """
+    alertTopic = 'EnviaEmail'
+    try:
+        sns = obter_cliente_sns()
+        snsTopicArn = resolver_topic_arn(alertTopic, sns)
+
+        detalhes = "\n".join(f"- {linha['produto']}: {linha['quantidade_vendida']}" for linha in linhas)
+        subject = 'Seu pedido está pronto para retirada'
+        message = f"""
+Olá,
+
+Seu pedido foi confirmado com sucesso!
+
+Itens do pedido:
+{detalhes}
+
+Você pode retirar seus produtos na padaria agora mesmo.
+
+Atenciosamente,
+Quitute nas Nuvens
+"""
+        response = sns.publish(
+            TopicArn=snsTopicArn,
+            Message=message,
+            Subject=subject
+        )
+        print(f"📧 Email de retirada do pedido enviado via SNS para {email}: {response}")
+    except Exception as e:
+        print(f"❌ Erro ao enviar email de retirada para {email}: {e}")
+        invalidar_topico(alertTopic)
+
+
+def incrementar_versao_catalogo(connection, cursor):
+    """
+    Incrementa a versão global do catálogo, usada pelo Django como chave do
+    cache da página de produtos. Roda em uma transação própria, logo depois
+    do commit do estoque: dentro da transação da venda, o lock da linha única de
+    versão enfileiraria todas as vendas. Uma falha aqui só adia a renovação do
+    cache, sem desfazer a alteração de estoque.
+    """
+    try:
+        cursor.execute(
+            """
+            INSERT INTO consumidor_catalogoversao (id, versao, atualizado_em)
+            VALUES (1, 1, NOW(6))
+            ON DUPLICATE KEY UPDATE versao = versao + 1, atualizado_em = NOW(6)
+            """
+        )
+        connection.commit()
+    except pymysql.MySQLError as e:
+        print(f"⚠️ Erro ao incrementar a versão do catálogo: {e}")
+        connection.rollback()
+
+
+def normalizar_itens(itens):
+    """
+    Valida as linhas do pedido e junta linhas repetidas do mesmo produto.
+
+    Returns:
+        dict: produto_id -> quantidade total, ou None se alguma linha for inválida
+    """
+    if not isinstance(itens, list) or not itens:
+        return None
+
+    quantidades = {}
+    for linha in itens:
+        if not isinstance(linha, dict):
+            return None
+        produto_id = linha.get('produto_id')
+        quantidade = linha.get('quantidade', 1)
+        if not eh_inteiro(produto_id) or not eh_inteiro(quantidade) or quantidade <= 0:
+            return None
+        quantidades[produto_id] = quantidades.get(produto_id, 0) + quantidade
+    return quantidades
+
+
+class ConflitoVersao(Exception):
+    """Outro pedido alterou um dos produtos entre a leitura e a gravação (modo cas)."""
+
+
+def reservar_itens(connection, cursor, ids, quantidades, email, otimista):
+    """
+    Baixa o estoque e registra as reservas de um pedido na transação corrente.
+
+    Modo lock: as linhas são travadas com SELECT ... FOR UPDATE (em ordem de id).
+    Modo cas: a leitura não trava nada e o UPDATE só acontece se nenhuma linha
+    mudou de versão desde a leitura; caso contrário levanta ConflitoVersao.
+
+    Returns:
+        tuple: (resposta de erro ou None, {produto_id: (nome, estoque, versao)})
+    """
+    marcadores = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f"""
+        SELECT id, nome, quantidade_estoque, versao
+        FROM consumidor_item
+        WHERE id IN ({marcadores})
+        ORDER BY id
+        {'' if otimista else 'FOR UPDATE'}
+        """,
+        ids
+    )
+    produtos = {row[0]: (row[1], row[2], row[3]) for row in cursor.fetchall()}
+
+    nao_encontrados = [produto_id for produto_id in ids if produto_id not in produtos]
+    if nao_encontrados:
+        connection.rollback()
+        return {
+            'statusCode': 404,
+            'body': json.dumps({
+                'message': f'Produtos não encontrados: {nao_encontrados}',
+                'produtos_nao_encontrados': nao_encontrados
+            })
+        }, produtos
+
+    faltantes = [
+        {
+            'produto_id': produto_id,
+            'produto': produtos[produto_id][0],
+            'quantidade_solicitada': quantidades[produto_id],
+            'quantidade_disponivel': produtos[produto_id][1]
+        }
+        for produto_id in ids if produtos[produto_id][1] < quantidades[produto_id]
+    ]
+    if faltantes:
+        connection.rollback()
+        nomes = ', '.join(f['produto'] for f in faltantes)
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'message': f'Estoque insuficiente para: {nomes}.',
+                'itens_sem_estoque': faltantes
+            })
+        }, produtos
+
+    # Um único UPDATE para todas as linhas (travadas acima, ou conferidas pela versão)
+    casos = ' '.join(['WHEN %s THEN %s'] * len(ids))
+    parametros = [valor for produto_id in ids for valor in (produto_id, quantidades[produto_id])]
+    condicao_versao = ''
+    if otimista:
+        condicao_versao = f"AND versao = CASE id {casos} END"
+        parametros_versao = [valor for produto_id in ids for valor in (produto_id, produtos[produto_id][2])]
+    cursor.execute(
+        f"""
+        UPDATE consumidor_item
+        SET quantidade_estoque = quantidade_estoque - CASE id {casos} END,
+            disponivel = quantidade_estoque > 0,
+            versao = versao + 1
+        WHERE id IN ({marcadores}) {condicao_versao}
+        """,
+        parametros + ids + (parametros_versao if otimista else [])
+    )
+    if otimista and cursor.rowcount != len(ids):
+        raise ConflitoVersao()
+
+    # executemany agrupa as reservas em um único INSERT multi-linha
+    cursor.executemany(
+        """
+        INSERT INTO consumidor_reserva (item_id, email_cliente, quantidade, confirmado)
+        VALUES (%s, %s, %s, %s)
+        """,
+        [(produto_id, email, quantidades[produto_id], True) for produto_id in ids]
+    )
+
+    connection.commit()
+    incrementar_versao_catalogo(connection, cursor)
+    return None, produtos
+
+
+def vender_itens(itens, email):
+    """
+    Processa um pedido com vários itens em uma única transação (tudo ou nada).
+
+    No modo lock (padrão), as linhas dos produtos são travadas com
+    SELECT ... FOR UPDATE sempre em ordem crescente de id, então dois pedidos
+    concorrentes com os mesmos produtos nunca entram em deadlock.
+
+    No modo cas (VENDA_MODO=cas), nada é travado na leitura: a gravação
+    confere a versão de cada produto e, se outro pedido chegou antes, a
+    transação é desfeita e o pedido é refeito do zero, até
+    VENDA_CAS_TENTATIVAS vezes.
+    """
+    quantidades = normalizar_itens(itens)
+    if quantidades is None or not email:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({
+                'message': 'itens (lista de produto_id e quantidade > 0) e email são obrigatórios.',
+                'email': email
+            })
+        }
+
+    ids = sorted(quantidades)
+    otimista = VENDA_MODO == 'cas'
+    tentativas = VENDA_CAS_TENTATIVAS if otimista else 1
+
+    try:
+        for tentativa in range(1, tentativas + 1):
+            try:
+                with conexao() as connection, connection.cursor() as cursor:
+                    erro, produtos = reservar_itens(connection, cursor, ids, quantidades, email, otimista)
+                break
+            except ConflitoVersao:
+                # A transação já foi desfeita pelo context manager da conexão
+                estatisticas_cas['conflitos'] += 1
+                if tentativa == tentativas:
+                    estatisticas_cas['esgotadas'] += 1
+                    return {
+                        'statusCode': 409,
+                        'body': json.dumps({
+                            'message': 'Muitos pedidos simultâneos para estes produtos, tente novamente.',
+                            'tentativas': tentativas
+                        })
+                    }
+                time.sleep(random.uniform(0, VENDA_CAS_ESPERA_MS * tentativa) / 1000)
+        if erro:
+            return erro
+
+        linhas = []
+        for produto_id in ids:
+            nome, estoque_anterior, _ = produtos[produto_id]
+            estoque_restante = estoque_anterior - quantidades[produto_id]
+            linhas.append({
+                'produto_id': produto_id,
+                'produto': nome,
+                'quantidade_vendida': quantidades[produto_id],
+                'estoque_restante': estoque_restante,
+                'disponivel': estoque_restante > 0
+            })
+
+        print(f"Pedido processado: {len(linhas)} itens para {email}")
+        enviar_email_retirada_pedido(email, linhas)
+
+    except pymysql.MySQLError as e:
+        print(f"Error connecting to MySQL: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps(f"MySQL connection error: {str(e)}")
+        }
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return {
+            'statusCode': 500,
+            'body': json.dumps(f"Error: {str(e)}")
+        }
+    finally:
+        print(f"Conexões RDS: {estatisticas_conexao()}")
+
+    return {
+        'statusCode': 200,
+        'body': json.dumps({
+            'message': 'Pedido processado com sucesso!',
+            'itens': linhas,
+            'email': email
+        })
+    }
+
 
 def lambda_handler(event, context):
     """
@@ -32,6 +365,11 @@ def lambda_handler(event, context):
         log = json.loads(event["body"])
     else:
         log = event
+
+    # Pedido com vários itens: {"itens": [{"produto_id": 1, "quantidade": 2}, ...], "email": ...}
+    if 'itens' in log:
+        return vender_itens(log.get('itens'), log.get('email'))
+
     produto_id = log.get('produto_id')
     quantidade = log.get('quantidade', 1)  # Default 1 unidade
     email = log.get('email')
@@ -46,7 +384,7 @@ def lambda_handler(event, context):
             })
         }
 
-    if quantidade <= 0:
+    if not eh_inteiro(quantidade) or quantidade <= 0:
         return {
             'statusCode': 400,
             'body': json.dumps({
@@ -56,34 +394,43 @@ def lambda_handler(event, context):
         }
 
     try:
-        # Connect to RDS MySQL
-        connection = pymysql.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database
-        )
-
-        with connection.cursor() as cursor:
-            # Busca o produto e verifica estoque
+        # Reaproveita a conexão com o RDS MySQL do container quente
+        with conexao() as connection, connection.cursor() as cursor:
+            # Diminui o estoque de forma atômica: a condição no WHERE garante que
+            # duas vendas concorrentes nunca deixem o estoque negativo.
+            # O MySQL avalia o SET da esquerda para a direita, então `disponivel`
+            # já enxerga a quantidade decrementada. LAST_INSERT_ID(expr) devolve
+            # a nova quantidade no pacote OK do UPDATE (cursor.lastrowid), sem
+            # outra consulta.
             cursor.execute(
-                "SELECT id, nome, quantidade_estoque, disponivel FROM consumidor_item WHERE id = %s",
-                (produto_id,)
+                """
+                UPDATE consumidor_item
+                SET quantidade_estoque = LAST_INSERT_ID(quantidade_estoque - %s),
+                    disponivel = quantidade_estoque > 0,
+                    versao = versao + 1
+                WHERE id = %s AND quantidade_estoque >= %s
+                """,
+                (quantidade, produto_id, quantidade)
             )
-            result = cursor.fetchone()
 
-            if not result:
-                return {
-                    'statusCode': 404,
-                    'body': json.dumps({
-                        'message': f'Produto com ID {produto_id} não encontrado.'
-                    })
-                }
+            if cursor.rowcount == 0:
+                # Nenhuma linha afetada: produto inexistente ou estoque insuficiente
+                cursor.execute(
+                    "SELECT nome, quantidade_estoque FROM consumidor_item WHERE id = %s",
+                    (produto_id,)
+                )
+                result = cursor.fetchone()
+                connection.rollback()
 
-            produto_id_db, nome, quantidade_estoque, disponivel = result
+                if not result:
+                    return {
+                        'statusCode': 404,
+                        'body': json.dumps({
+                            'message': f'Produto com ID {produto_id} não encontrado.'
+                        })
+                    }
 
-            # Verifica se tem estoque suficiente
-            if quantidade_estoque < quantidade:
+                nome, quantidade_estoque = result
                 return {
                     'statusCode': 400,
                     'body': json.dumps({
@@ -94,19 +441,10 @@ def lambda_handler(event, context):
                     })
                 }
 
-            # Atualiza o estoque (diminui a quantidade)
-            nova_quantidade = quantidade_estoque - quantidade
+            # Lido antes do INSERT, que troca o lastrowid pelo id da reserva
+            nova_quantidade = cursor.lastrowid
             novo_status_disponivel = nova_quantidade > 0
 
-            cursor.execute(
-                """
-                UPDATE consumidor_item
-                SET quantidade_estoque = %s, disponivel = %s
-                WHERE id = %s
-                """,
-                (nova_quantidade, novo_status_disponivel, produto_id)
-            )
-
             # Registra a reserva/venda
             cursor.execute(
                 """
@@ -117,42 +455,13 @@ def lambda_handler(event, context):
             )
 
             connection.commit()
+            nome = nome_produto(cursor, produto_id)
+            incrementar_versao_catalogo(connection, cursor)
 
             print(f"Venda processada: {quantidade}x {nome} para {email}")
 
-            # Envia email de retirada via SNS
-            try:
-                sns = boto3.client('sns', region_name=os.getenv('AWS_REGION', 'us-east-1'))
-                alertTopic = 'EnviaEmail'
-                snsTopicArn = [t['TopicArn'] for t in sns.list_topics()['Topics']
-                              if t['TopicArn'].lower().endswith(':' + alertTopic.lower())][0]
-
-                subject = f'Seu pedido está pronto para retirada - {nome}'
-                message = f"""
-Olá,
-
-Seu pedido foi confirmado com sucesso!
-
-Detalhes do pedido:
-- Produto: {nome}
-- Quantidade: {quantidade}
-- Estoque restante: {nova_quantidade}
-
-Você pode retirar seu produto na padaria agora mesmo.
-
-Atenciosamente,
-Quitute nas Nuvens
-"""
-                response = sns.publish(
-                    TopicArn=snsTopicArn,
-                    Message=message,
-                    Subject=subject
-                )
-                print(f"📧 Email de retirada enviado via SNS para {email}: {response}")
-            except Exception as e:
-                print(f"❌ Erro ao enviar email de retirada para {email}: {e}")
-
-
+        # Envia email de retirada via SNS
+        enviar_email_retirada(email, nome, quantidade, nova_quantidade)
 
     except pymysql.MySQLError as e:
         print(f"Error connecting to MySQL: {e}")
@@ -173,7 +482,7 @@ Quitute nas Nuvens
             'body': json.dumps(f"Error: {str(e)}")
         }
     finally:
-        connection.close()
+        print(f"Conexões RDS: {estatisticas_conexao()}")
 
     return {
         'statusCode': 200,